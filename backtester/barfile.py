@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from backtester.bars import TIME_FIELD, BarStore
+from backtester.data import ArrayDataHandler
+from backtester.fetcher import BAR_FIELDS
+
+FORMAT_VERSION = 1
+META_FILE = 'meta.json'
+OFFSETS_FILE = 'offsets.bin'
+
+
+def _column_file(path: str, field: str) -> str:
+    return os.path.join(path, f"{field}.bin")
+
+
+# 磁盘上的定长列式K线文件，目录布局与 BarStore 一一对应：
+#   date.bin       int64 纳秒时间戳（小端）
+#   <field>.bin    每个字段一个定长数组，float32 或 float64
+#   offsets.bin    int64，第 i 个品种的行区间为 offsets[i]:offsets[i + 1]
+#   meta.json      版本、品种列表、字段及其 dtype、总行数
+# 品种逐个追加写入，写入过程中内存里只有当前品种的数据，适合转换超出内存的全市场分钟线
+class BarFileWriter:
+    def __init__(self, path: str, fields: Optional[List[str]] = None, dtype: str = 'float64'):
+        if np.dtype(dtype) not in (np.dtype('float32'), np.dtype('float64')):
+            raise ValueError(f"Unsupported price dtype {dtype!r}, expected float32 or float64")
+        self.path = path
+        self.fields = list(fields) if fields is not None else list(BAR_FIELDS)
+        self.dtypes = {TIME_FIELD: np.dtype('<i8')}
+        self.dtypes.update({field: np.dtype(dtype).newbyteorder('<') for field in self.fields})
+        self.symbols: List[str] = []
+        self.offsets = [0]
+        os.makedirs(path, exist_ok=True)
+        # 覆盖已有文件时先删掉旧的 meta.json，写入中途失败不会被当作完整文件打开
+        if os.path.exists(os.path.join(path, META_FILE)):
+            os.remove(os.path.join(path, META_FILE))
+        self._files = {field: open(_column_file(path, field), 'wb') for field in self.dtypes}
+
+    def append(self, symbol: str, frame: pd.DataFrame):
+        if symbol in self.symbols:
+            raise ValueError(f"Symbol {symbol} has already been written")
+        index = pd.DatetimeIndex(pd.to_datetime(frame.index))
+        frame = frame.set_axis(index)[~index.duplicated(keep='last')].sort_index()
+        times = frame.index.values.astype('M8[ns]').view('int64')
+        self._files[TIME_FIELD].write(times.astype(self.dtypes[TIME_FIELD]).tobytes())
+        for field in self.fields:
+            self._files[field].write(frame[field].to_numpy().astype(self.dtypes[field]).tobytes())
+        self.symbols.append(symbol)
+        self.offsets.append(self.offsets[-1] + len(frame))
+
+    def close(self):
+        if self._files is None:
+            return
+        for f in self._files.values():
+            f.close()
+        self._files = None
+        np.asarray(self.offsets, dtype='<i8').tofile(os.path.join(self.path, OFFSETS_FILE))
+        meta = {
+            'version': FORMAT_VERSION,
+            'symbols': self.symbols,
+            'fields': {field: dtype.str for field, dtype in self.dtypes.items()},
+            'rows': self.offsets[-1],
+        }
+        # meta.json 最后写入，存在即表示文件完整
+        tmp = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, META_FILE))
+
+    def abort(self):
+        # 放弃写入：只关闭文件句柄，不写 offsets.bin 和 meta.json，目录中的残留文件无法被 open_bar_file 打开
+        if self._files is None:
+            return
+        for f in self._files.values():
+            f.close()
+        self._files = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_bar_file(path: str, frames: Union[Dict[str, pd.DataFrame], Iterable[Tuple[str, pd.DataFrame]]],
+                   fields: Optional[List[str]] = None, dtype: str = 'float64'):
+    items = frames.items() if isinstance(frames, dict) else frames
+    with BarFileWriter(path, fields, dtype) as writer:
+        for symbol, frame in items:
+            writer.append(symbol, frame)
+
+
+def write_bar_store(path: str, store: BarStore, dtype: str = 'float64'):
+    with BarFileWriter(path, store.fields, dtype) as writer:
+        for symbol in store.symbols:
+            writer.append(symbol, store.frame(symbol))
+
+
+def open_bar_file(path: str, mode: str = 'r') -> BarStore:
+    # 以 numpy.memmap 打开各列，数据由操作系统按需分页载入，不会整体读入内存
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported bar file version {meta.get('version')!r} in {path}")
+    rows = meta['rows']
+    columns = {}
+    for field, dtype in meta['fields'].items():
+        if rows:
+            columns[field] = np.memmap(_column_file(path, field), dtype=np.dtype(dtype), mode=mode, shape=(rows,))
+        else:
+            columns[field] = np.empty(0, dtype=np.dtype(dtype))
+    offsets = np.fromfile(os.path.join(path, OFFSETS_FILE), dtype='<i8')
+    return BarStore(meta['symbols'], columns, offsets)
+
+
+def _read_csv(source: str, date_column: str, symbol_column: Optional[str] = None) -> pd.DataFrame:
+    # 品种代码按字符串读取，保留 000001 这样的前导零
+    dtype = {symbol_column: str} if symbol_column is not None else None
+    data = pd.read_csv(source, parse_dates=[date_column], dtype=dtype)
+    return data.set_index(date_column)
+
+
+def import_csv(sources: Union[str, List[str]], path: str, symbol_column: Optional[str] = None,
+               date_column: str = 'date', fields: Optional[List[str]] = None, dtype: str = 'float64'):
+    # sources 可以是目录（每个 <symbol>.csv 一个品种）、文件列表，或包含 symbol_column 列的单个长表文件。
+    # 按品种分文件时逐个读取写入；长表需要一次读入内存后按品种分组
+    if isinstance(sources, str) and os.path.isdir(sources):
+        sources = sorted(os.path.join(sources, name) for name in os.listdir(sources) if name.endswith('.csv'))
+    elif isinstance(sources, str):
+        sources = [sources]
+
+    def frames():
+        for source in sources:
+            data = _read_csv(source, date_column, symbol_column)
+            if symbol_column is None:
+                yield os.path.splitext(os.path.basename(source))[0], data
+            else:
+                for symbol, group in data.groupby(symbol_column, sort=False):
+                    yield symbol, group.drop(columns=symbol_column)
+
+    write_bar_file(path, frames(), fields, dtype)
+
+
+# 直接读取磁盘K线文件的数据处理类：列是 memmap，get_latest_data 返回的窗口同样是零拷贝视图
+class MemmapDataHandler(ArrayDataHandler):
+    def __init__(self, path: str, symbol_list: Optional[List[str]] = None, forward_fill: bool = True):
+        self.path = path
+        super().__init__(open_bar_file(path), symbol_list, forward_fill)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert CSV bars into a memory-mapped bar file.")
+    parser.add_argument('sources', nargs='+', help="CSV files or a directory of <symbol>.csv files")
+    parser.add_argument('output', help="output bar file directory")
+    parser.add_argument('--symbol-column', default=None, help="symbol column of a long-format CSV")
+    parser.add_argument('--date-column', default='date')
+    parser.add_argument('--fields', nargs='+', default=None)
+    parser.add_argument('--dtype', choices=['float32', 'float64'], default='float64')
+    args = parser.parse_args(argv)
+    sources = args.sources[0] if len(args.sources) == 1 else args.sources
+    import_csv(sources, args.output, args.symbol_column, args.date_column, args.fields, args.dtype)
+
+
+if __name__ == '__main__':
+    main()
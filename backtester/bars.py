@@ -0,0 +1,173 @@
+from collections.abc import Mapping, Sequence
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+TIME_FIELD = 'date'
+
+
+# 所有品种的K线按列连续存放：每个字段一个一维数组，品种之间首尾相接，
+# offsets[i]:offsets[i + 1] 是第 i 个品种的行区间，date 列为 int64 纳秒时间戳
+class BarStore:
+    def __init__(self, symbols: List[str], columns: Dict[str, np.ndarray], offsets: np.ndarray):
+        if TIME_FIELD not in columns:
+            raise ValueError(f"BarStore requires a '{TIME_FIELD}' column.")
+        self.symbols = list(symbols)
+        self.columns = columns
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame], fields: Optional[List[str]] = None) -> 'BarStore':
+        symbols = list(frames)
+        if fields is None:
+            fields = list(frames[symbols[0]].columns) if symbols else []
+        lengths = [len(frames[symbol]) for symbol in symbols]
+        offsets = np.zeros(len(symbols) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)
+
+        columns = {TIME_FIELD: np.empty(offsets[-1], dtype=np.int64)}
+        for field in fields:
+            columns[field] = np.empty(offsets[-1], dtype=np.float64)
+        for i, symbol in enumerate(symbols):
+            frame = frames[symbol]
+            lo, hi = offsets[i], offsets[i + 1]
+            columns[TIME_FIELD][lo:hi] = pd.DatetimeIndex(frame.index).values.astype('M8[ns]').view('int64')
+            for field in fields:
+                columns[field][lo:hi] = frame[field].to_numpy(dtype=np.float64)
+        return cls(symbols, columns, offsets)
+
+    @property
+    def fields(self) -> List[str]:
+        return [field for field in self.columns if field != TIME_FIELD]
+
+    def index(self, symbol: str) -> int:
+        return self._index[symbol]
+
+    def bounds(self, symbol: str):
+        i = self._index[symbol]
+        return int(self.offsets[i]), int(self.offsets[i + 1])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def window(self, symbol: str, lo: int, hi: int) -> 'BarWindow':
+        return BarWindow(self, symbol, lo, hi)
+
+    def frame(self, symbol: str) -> pd.DataFrame:
+        lo, hi = self.bounds(symbol)
+        return self.window(symbol, lo, hi).to_frame()
+
+
+# 单根K线的只读视图，按 bar['close'] 的方式访问，行为与原来的 dict 一致
+class Bar(Mapping):
+    __slots__ = ('store', 'symbol', 'row')
+
+    def __init__(self, store: BarStore, symbol: str, row: int):
+        self.store = store
+        self.symbol = symbol
+        self.row = row
+
+    def __getitem__(self, key):
+        if key == 'symbol':
+            return self.symbol
+        if key == TIME_FIELD:
+            return pd.Timestamp(int(self.store.columns[TIME_FIELD][self.row]))
+        return self.store.columns[key][self.row]
+
+    def __iter__(self):
+        yield 'symbol'
+        yield from self.store.columns
+
+    def __len__(self):
+        return len(self.store.columns) + 1
+
+    def __repr__(self):
+        return f"Bar({dict(self)})"
+
+
+# 一段连续K线的零拷贝视图：window[-1] 返回 Bar，window['close'] 返回数组视图
+class BarWindow(Sequence):
+    __slots__ = ('store', 'symbol', 'lo', 'hi')
+
+    def __init__(self, store: BarStore, symbol: str, lo: int, hi: int):
+        self.store = store
+        self.symbol = symbol
+        self.lo = lo
+        self.hi = hi
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            values = self.store.columns[key][self.lo:self.hi]
+            return values.view('M8[ns]') if key == TIME_FIELD else values
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("BarWindow only supports contiguous slices.")
+            return BarWindow(self.store, self.symbol, self.lo + start, self.lo + max(start, stop))
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("BarWindow index out of range")
+        return Bar(self.store, self.symbol, self.lo + key)
+
+    def to_frame(self) -> pd.DataFrame:
+        index = pd.DatetimeIndex(self[TIME_FIELD], name=TIME_FIELD)
+        return pd.DataFrame({field: self[field] for field in self.store.fields}, index=index)
+
+    def __repr__(self):
+        return f"BarWindow(symbol={self.symbol!r}, bars={len(self)})"
+
+
+# 某个时间戳上所有品种的K线快照，随 MarketEvent 下发。rows 为各品种最新一根K线的行号，
+# snapshot['close'] 按需一次性取出所有品种的数组（按数据处理类的 forward_fill 规则，缺失为 NaN），
+# snapshot.filled('close') 总是沿用最近一根K线；updated 标记本时间戳有新K线的品种
+class BarSnapshot:
+    __slots__ = ('store', 'symbols', 'timestamp', 'rows', 'has_data', 'updated', 'forward_fill', '_values')
+
+    def __init__(self, store: BarStore, symbols: List[str], timestamp: int, rows: np.ndarray,
+                 has_data: np.ndarray, updated: np.ndarray, forward_fill: bool = True):
+        self.store = store
+        self.symbols = symbols
+        self.timestamp = timestamp
+        self.rows = rows
+        self.has_data = has_data
+        self.updated = updated
+        self.forward_fill = forward_fill
+        self._values = {}
+
+    @property
+    def datetime(self) -> pd.Timestamp:
+        return pd.Timestamp(int(self.timestamp))
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self.has_data if self.forward_fill else self.updated
+
+    def filled(self, field: str) -> np.ndarray:
+        values = self._values.get(field)
+        if values is None:
+            values = self.store.columns[field][np.maximum(self.rows, 0)].astype(np.float64)
+            values[~self.has_data] = np.nan
+            self._values[field] = values
+        return values
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        values = self.filled(field)
+        if self.forward_fill:
+            return values
+        return np.where(self.updated, values, np.nan)
+
+    def bar(self, symbol: str) -> Optional[Bar]:
+        i = self.symbols.index(symbol)
+        return Bar(self.store, symbol, int(self.rows[i])) if self.valid[i] else None
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __repr__(self):
+        return f"BarSnapshot(datetime={self.datetime}, symbols={len(self.symbols)}, updated={int(self.updated.sum())})"
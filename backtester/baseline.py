@@ -0,0 +1,86 @@
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtester.cache import BarCache
+from backtester.fetcher import AKShareIndexFetcher, Fetcher
+
+DEFAULT_BENCHMARK = 'sh000001'
+BENCHMARK_ADJUST = 'index'  # 指数在 BarCache 中的目录，与股票的复权方式目录分开
+WARMUP = pd.Timedelta(days=14)  # 向前多取几天，保证回测第一根K线之前有可沿用的指数点位
+
+# 进程内共享：同一指数同一区间只加载一次，参数扫描中的每次回测都复用
+_LOADED: Dict[Tuple, pd.Series] = {}
+_LOCK = threading.Lock()
+
+
+def _calendar_key(index: pd.DatetimeIndex) -> str:
+    return hashlib.sha1(np.ascontiguousarray(index.asi8).tobytes()).hexdigest()
+
+
+# 基准指数：任意指数代码（默认上证指数），经 BarCache 缓存到本地，只补取缺失的日期区间；
+# align 把指数点位按回测日历对齐一次（停牌/休市沿用上一个点位）并记住结果。
+# 也可以直接给出 series（如合成数据或自定义基准），此时不访问任何数据源
+class Benchmark:
+    def __init__(self, symbol: str = DEFAULT_BENCHMARK, cache: Optional[BarCache] = None,
+                 fetcher: Optional[Fetcher] = None, field: str = 'close', series: Optional[pd.Series] = None):
+        self.symbol = symbol
+        self.cache = cache
+        self.fetcher = fetcher if fetcher is not None else AKShareIndexFetcher()
+        self.field = field
+        self.series = series.sort_index().astype(np.float64) if series is not None else None
+        self._aligned: Dict[str, pd.Series] = {}
+
+    def load(self, start, end) -> pd.Series:
+        if self.series is not None:
+            return self.series.loc[pd.Timestamp(start):pd.Timestamp(end)]
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        key = (self.symbol, self.field, self.cache.root if self.cache is not None else None, start, end)
+        with _LOCK:
+            series = _LOADED.get(key)
+            if series is None:
+                start_date, end_date = start.strftime('%Y%m%d'), end.strftime('%Y%m%d')
+                if self.cache is not None:
+                    data = self.cache.get(self.symbol, start_date, end_date, BENCHMARK_ADJUST, fetcher=self.fetcher)
+                else:
+                    data = self.fetcher.fetch(self.symbol, start_date, end_date, BENCHMARK_ADJUST)
+                series = data[self.field].astype(np.float64).rename(self.symbol)
+                _LOADED[key] = series
+        return series
+
+    def align(self, index) -> pd.Series:
+        # 对齐到回测日历的指数点位，首个点位之前为 NaN
+        index = pd.DatetimeIndex(index)
+        key = _calendar_key(index)
+        aligned = self._aligned.get(key)
+        if aligned is None:
+            if len(index) == 0:
+                aligned = pd.Series(np.empty(0), index=index, name=self.symbol)
+            else:
+                series = self.load(index[0] - WARMUP, index[-1])
+                series = series[~series.index.duplicated(keep='last')]
+                values = series.reindex(series.index.union(index)).ffill().reindex(index)
+                aligned = pd.Series(values.to_numpy(dtype=np.float64), index=index, name=self.symbol)
+            self._aligned[key] = aligned
+        return aligned
+
+    def returns(self, index) -> pd.Series:
+        aligned = self.align(index)
+        return aligned / aligned.shift(1) - 1.0
+
+    def normalized(self, index) -> pd.Series:
+        # 以第一个有效点位为 1 的基准净值，可与策略的 equity_curve 直接比较
+        aligned = self.align(index)
+        valid = aligned.dropna()
+        return aligned / valid.iloc[0] if len(valid) else aligned
+
+    def frame(self, index, name: str = 'Baseline') -> pd.DataFrame:
+        return pd.DataFrame({name: self.normalized(index)})
+
+
+def clear_benchmark_cache():
+    with _LOCK:
+        _LOADED.clear()
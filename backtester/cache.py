@@ -0,0 +1,118 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtester.fetcher import BAR_FIELDS, Fetcher, empty_bars, normalize_bars
+
+DATE_FORMAT = '%Y%m%d'
+ONE_DAY = pd.Timedelta(days=1)
+
+
+def _to_timestamp(date) -> pd.Timestamp:
+    return pd.Timestamp(date).normalize()
+
+
+def _to_str(date: pd.Timestamp) -> str:
+    return date.strftime(DATE_FORMAT)
+
+
+# 本地列式缓存：<root>/<adjust>/<symbol>/ 下每个字段一个 .npy 文件，
+# meta.json 记录已经请求过的日期区间，只补取缺失的部分
+class BarCache:
+    def __init__(self, root: str):
+        self.root = root
+
+    def _symbol_dir(self, symbol: str, adjust: str) -> str:
+        return os.path.join(self.root, adjust or 'none', symbol)
+
+    def _read_meta(self, symbol: str, adjust: str) -> Optional[Dict]:
+        path = os.path.join(self._symbol_dir(symbol, adjust), 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def coverage(self, symbol: str, adjust: str = "hfq") -> Optional[Tuple[str, str]]:
+        meta = self._read_meta(symbol, adjust)
+        if meta is None:
+            return None
+        return meta['start'], meta['end']
+
+    def missing_ranges(self, symbol: str, start_date: str, end_date: str,
+                       adjust: str = "hfq") -> List[Tuple[str, str]]:
+        start, end = _to_timestamp(start_date), _to_timestamp(end_date)
+        covered = self.coverage(symbol, adjust)
+        if covered is None:
+            return [(_to_str(start), _to_str(end))]
+
+        covered_start, covered_end = _to_timestamp(covered[0]), _to_timestamp(covered[1])
+        ranges = []
+        if start < covered_start:
+            ranges.append((_to_str(start), _to_str(covered_start - ONE_DAY)))
+        if end > covered_end:
+            # 与已缓存区间之间的空档一并补齐，保证缓存区间连续
+            ranges.append((_to_str(covered_end + ONE_DAY), _to_str(end)))
+        return ranges
+
+    def load_arrays(self, symbol: str, adjust: str = "hfq") -> Dict[str, np.ndarray]:
+        # 以内存映射方式读取，不拷贝数据
+        meta = self._read_meta(symbol, adjust)
+        if meta is None:
+            return {}
+        directory = self._symbol_dir(symbol, adjust)
+        return {field: np.load(os.path.join(directory, field + '.npy'), mmap_mode='r')
+                for field in ['date'] + meta['fields']}
+
+    def load(self, symbol: str, adjust: str = "hfq") -> pd.DataFrame:
+        arrays = self.load_arrays(symbol, adjust)
+        if not arrays:
+            return empty_bars()
+        index = pd.DatetimeIndex(arrays.pop('date').view('M8[ns]'), name='date')
+        return pd.DataFrame(arrays, index=index)
+
+    def store(self, symbol: str, data: pd.DataFrame, start_date: str, end_date: str, adjust: str = "hfq"):
+        directory = self._symbol_dir(symbol, adjust)
+        os.makedirs(directory, exist_ok=True)
+        data = normalize_bars(data)
+        columns = {'date': data.index.values.astype('M8[ns]').view('int64')}
+        columns.update({field: data[field].to_numpy() for field in BAR_FIELDS})
+        for field, values in columns.items():
+            tmp_path = os.path.join(directory, field + '.tmp.npy')
+            np.save(tmp_path, values)
+            os.replace(tmp_path, os.path.join(directory, field + '.npy'))
+
+        # meta.json 最后写入，中途失败时旧的区间记录仍然与文件一致
+        meta = {'start': _to_str(_to_timestamp(start_date)), 'end': _to_str(_to_timestamp(end_date)),
+                'fields': BAR_FIELDS}
+        tmp_path = os.path.join(directory, 'meta.tmp.json')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(directory, 'meta.json'))
+
+    def get(self, symbol: str, start_date: str, end_date: str, adjust: str = "hfq",
+            fetcher: Optional[Fetcher] = None) -> pd.DataFrame:
+        start, end = _to_timestamp(start_date), _to_timestamp(end_date)
+        ranges = self.missing_ranges(symbol, start_date, end_date, adjust)
+        # 当天及以后的数据可能还不完整，不计入已缓存区间
+        last_complete = pd.Timestamp.today().normalize() - ONE_DAY
+        ranges = [(lo, hi) for lo, hi in ranges if _to_timestamp(lo) <= last_complete]
+
+        if ranges:
+            if fetcher is None:
+                raise LookupError(f"{symbol} is not fully cached and no fetcher is available.")
+            frames = [self.load(symbol, adjust)]
+            for lo, hi in ranges:
+                frames.append(fetcher.fetch(symbol, lo, hi, adjust))
+            frames = [frame for frame in frames if not frame.empty]
+            data = normalize_bars(pd.concat(frames)) if frames else empty_bars()
+
+            covered = self.coverage(symbol, adjust)
+            new_start = min(start, _to_timestamp(covered[0])) if covered else start
+            new_end = min(max(end, _to_timestamp(covered[1])) if covered else end, last_complete)
+            self.store(symbol, data, _to_str(new_start), _to_str(new_end), adjust)
+
+        data = self.load(symbol, adjust)
+        return data.loc[start:end + ONE_DAY - pd.Timedelta(1)]
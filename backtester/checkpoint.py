@@ -0,0 +1,176 @@
+import os
+import pickle
+from typing import Dict, List
+
+import numpy as np
+
+CHECKPOINT_VERSION = 2
+STATE_FILE = 'state.pkl'
+LEDGER_FILES = ('timestamps', 'positions', 'holdings')
+JOURNAL_COMPONENTS = ('portfolio', 'strategy')
+
+
+# 序列化时把引擎组件和K线存储替换成占位符，恢复时再指向新构建的对象，
+# 这样策略、挂单等状态里对它们的引用不会把整份数据一起写进检查点
+class _Pickler(pickle.Pickler):
+    def __init__(self, file, refs: Dict[str, object]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._refs = {id(obj): name for name, obj in refs.items() if obj is not None}
+
+    def persistent_id(self, obj):
+        return self._refs.get(id(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, refs: Dict[str, object]):
+        super().__init__(file)
+        self._refs = refs
+
+    def persistent_load(self, pid):
+        return self._refs[pid]
+
+
+# 断点续跑：每 every 根K线在两根K线之间保存一次引擎状态到 path 目录。
+#   state.pkl                   数据游标与指标、未处理事件、组合现金与持仓、执行端挂单和策略状态
+#   timestamps/positions/holdings.bin  账本的原始行，每次只追加上次检查点之后的新行
+#   portfolio/strategy.journal  组件 journals() 给出的只追加记录（成交、信号等），每次追加一条只含新增条目的 pickle
+# state.pkl 通过临时文件原子替换，记录了有效的账本行数和日志字节数；恢复时多余的部分会被截掉。
+# 这样每次保存的开销只与两次检查点之间的新增内容有关，不随回测长度增长。
+# 恢复时需要用与原回测相同的参数重新构建数据、组合、策略和执行端，再传给 backtest(..., resume=True)
+class Checkpointer:
+    def __init__(self, path: str, every: int = 1000):
+        if every <= 0:
+            raise ValueError("every must be positive")
+        self.path = path
+        self.every = every
+        self.saved_rows = 0
+        self.saves = 0
+        self._journal_counts: Dict[str, Dict[str, int]] = {}  # 各日志已写入的条目数
+        self._journal_sizes: Dict[str, int] = {}  # 各日志文件的有效字节数
+        os.makedirs(path, exist_ok=True)
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.path, STATE_FILE))
+
+    def _refs(self, data, portfolio, strategy, broker, events) -> Dict[str, object]:
+        return {'data': data, 'portfolio': portfolio, 'strategy': strategy, 'broker': broker, 'events': events,
+                'store': getattr(data, 'store', None)}
+
+    def _ledger_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _write_ledger(self, ledger):
+        if ledger.size < self.saved_rows:
+            raise RuntimeError("Ledger shrank since the last checkpoint")
+        mode = 'ab' if self.saved_rows else 'wb'
+        for name in LEDGER_FILES:
+            rows = getattr(ledger, name)[self.saved_rows:ledger.size]
+            with open(self._ledger_path(name), mode) as f:
+                f.write(np.ascontiguousarray(rows).tobytes())
+        self.saved_rows = ledger.size
+
+    def _read_ledger(self, ledger, rows: int):
+        arrays = []
+        for name in LEDGER_FILES:
+            template = getattr(ledger, name)
+            width = int(np.prod(template.shape[1:]))
+            path = self._ledger_path(name)
+            values = np.fromfile(path, dtype=template.dtype, count=rows * width) if rows else \
+                np.empty(0, dtype=template.dtype)
+            if len(values) != rows * width:
+                raise ValueError(f"Checkpoint ledger file {path} is truncated")
+            arrays.append(values.reshape((rows,) + template.shape[1:]))
+            # 截掉上次保存 state.pkl 之前崩溃时多写的行
+            with open(path, 'r+b') as f:
+                f.truncate(rows * width * template.dtype.itemsize)
+        ledger.load(*arrays)
+        self.saved_rows = rows
+
+    def _journal_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.journal")
+
+    def _write_journal(self, name: str, journals: Dict[str, List]):
+        written = self._journal_counts.setdefault(name, {})
+        new = {}
+        for key, entries in journals.items():
+            start = written.get(key, 0)
+            if len(entries) < start:
+                raise RuntimeError(f"Journal {name}/{key} shrank since the last checkpoint")
+            if len(entries) > start:
+                new[key] = entries[start:]
+                written[key] = len(entries)
+        with open(self._journal_path(name), 'ab' if name in self._journal_sizes else 'wb') as f:
+            if new:
+                pickle.dump(new, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._journal_sizes[name] = f.tell()
+
+    def _read_journal(self, name: str, journals: Dict[str, List], size: int):
+        for entries in journals.values():
+            del entries[:]
+        path = self._journal_path(name)
+        with open(path, 'r+b') as f:
+            while f.tell() < size:
+                for key, entries in pickle.load(f).items():
+                    journals[key].extend(entries)
+            if f.tell() != size:
+                raise ValueError(f"Checkpoint journal {path} is truncated")
+            f.truncate(size)
+        self._journal_counts[name] = {key: len(entries) for key, entries in journals.items()}
+        self._journal_sizes[name] = size
+
+    def save(self, data, portfolio, strategy, broker, events):
+        ledger = getattr(portfolio, 'ledger', None)
+        if ledger is not None:
+            self._write_ledger(ledger)
+        components = {'portfolio': portfolio, 'strategy': strategy}
+        for name in JOURNAL_COMPONENTS:
+            self._write_journal(name, components[name].journals())
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'data': data.get_state(),
+            'portfolio': portfolio.get_state(),
+            'strategy': strategy.get_state(),
+            'broker': broker.get_state(),
+            'events': list(events),
+            'ledger_rows': self.saved_rows,
+            'journals': dict(self._journal_sizes),
+        }
+        tmp = os.path.join(self.path, STATE_FILE + '.tmp')
+        with open(tmp, 'wb') as f:
+            _Pickler(f, self._refs(data, portfolio, strategy, broker, events)).dump(state)
+        os.replace(tmp, os.path.join(self.path, STATE_FILE))
+        self.saves += 1
+
+    def maybe_save(self, data, portfolio, strategy, broker, events, bar: int):
+        if bar % self.every == 0:
+            self.save(data, portfolio, strategy, broker, events)
+
+    def restore(self, data, portfolio, strategy, broker, events):
+        with open(os.path.join(self.path, STATE_FILE), 'rb') as f:
+            state = _Unpickler(f, self._refs(data, portfolio, strategy, broker, events)).load()
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {state.get('version')!r}")
+        data.set_state(state['data'])
+        portfolio.set_state(state['portfolio'])
+        strategy.set_state(state['strategy'])
+        broker.set_state(state['broker'])
+        events.clear()
+        for event in state['events']:
+            events.put(event)
+        ledger = getattr(portfolio, 'ledger', None)
+        if ledger is not None:
+            self._read_ledger(ledger, state['ledger_rows'])
+        components = {'portfolio': portfolio, 'strategy': strategy}
+        for name in JOURNAL_COMPONENTS:
+            self._read_journal(name, components[name].journals(), state['journals'][name])
+
+    def clear(self):
+        files = (STATE_FILE,) + tuple(f"{name}.bin" for name in LEDGER_FILES) + \
+            tuple(f"{name}.journal" for name in JOURNAL_COMPONENTS)
+        for name in files:
+            path = os.path.join(self.path, name)
+            if os.path.exists(path):
+                os.remove(path)
+        self.saved_rows = 0
+        self._journal_counts.clear()
+        self._journal_sizes.clear()
@@ -1,45 +1,201 @@
-import queue
+import math
+from typing import TYPE_CHECKING, Optional, Union
 
+import numpy as np
 import pandas as pd
 
 from backtester.data import DataHandler
-from backtester.event import EventType
-from backtester.event_manager import EventManager
+from backtester.event import EventType, calculate_ib_commissions
+from backtester.event_manager import EventBus
 from backtester.execution import ExecutionHandler
+from backtester.kernels import kernel_inputs, run_kernel
+from backtester.ledger import HOLDINGS_COLUMNS, Ledger
 from backtester.portfolio import Portfolio
 from backtester.strategy import Strategy
 
+if TYPE_CHECKING:
+    # 只用于类型注解：插桩（cProfile/pstats）、检查点和结果读取模块在真正用到时才由调用方导入
+    from backtester.checkpoint import Checkpointer
+    from backtester.instrumentation import Instrumentation
+    from backtester.results import ResultReader
+
+
+def connect_components(data: DataHandler, portfolio: Portfolio, strategy: Strategy, broker: ExecutionHandler,
+                       events: Optional[EventBus] = None) -> EventBus:
+    # 把各组件接到同一条事件总线上；回测引擎和实盘运行时共用这套订阅关系
+    events = events if events is not None else EventBus()
+    for component in (data, portfolio, strategy, broker):
+        component.events = events
+
+    events.subscribe(EventType.MARKET, broker.on_market)
+    events.subscribe(EventType.MARKET, strategy.calculate_signals)
+    events.subscribe(EventType.MARKET, portfolio.update_time_index)
+    events.subscribe(EventType.SIGNAL, portfolio.update_signal)
+    events.subscribe(EventType.ORDER, broker.execute_order)
+    events.subscribe(EventType.FILL, portfolio.update_fill)
+    events.subscribe(EventType.SIGNAL_BATCH, portfolio.update_signal)
+    events.subscribe(EventType.ORDER_BATCH, broker.execute_order)
+    events.subscribe(EventType.FILL_BATCH, portfolio.update_fill)
+    events.subscribe(EventType.TARGET, portfolio.update_target)
+    return events
+
 
 def backtest(
     data: DataHandler,
     portfolio: Portfolio,
     strategy: Strategy,
-    broker: ExecutionHandler
-) -> pd.DataFrame:
-    while True:
-        data.update_latest_data()
-        if not data.continue_backtest:
-            break
+    broker: ExecutionHandler,
+    verbose: bool = True,
+    events: Optional[EventBus] = None,
+    instrumentation: Optional['Instrumentation'] = None,
+    checkpoint: Optional['Checkpointer'] = None,
+    resume: bool = False
+) -> Union[pd.DataFrame, 'ResultReader']:
+    # 每次回测使用独立的事件总线（也可以传入一个新的 EventBus），多个回测可以在不同线程中同时运行。
+    # 传入 instrumentation 时改用其插桩事件总线，回测结束后报告保存在 instrumentation.report。
+    # 传入 checkpoint 时每隔 checkpoint.every 根K线保存一次状态；resume=True 且已有检查点时，
+    # 先把新构建的各组件恢复到检查点，再从下一根K线继续。
+    # 组合带有 ResultWriter（流式输出）时返回读取磁盘结果的 ResultReader，而不是内存中的净值曲线
+    streaming = getattr(portfolio, 'writer', None) is not None
+    if streaming and checkpoint is not None:
+        raise ValueError("Streaming results cannot be combined with checkpoints")
+    if instrumentation is not None:
+        if events is not None:
+            raise ValueError("Pass either events or instrumentation, not both")
+        events = instrumentation.events
+    events = connect_components(data, portfolio, strategy, broker, events)
+
+    bar = 0
+    if checkpoint is not None:
+        if resume and checkpoint.exists():
+            checkpoint.restore(data, portfolio, strategy, broker, events)
+            bar = data.get_state()['time_index']
+        else:
+            checkpoint.clear()
+
+    if instrumentation is None and checkpoint is None:
+        while True:
+            data.update_latest_data()
+            if not data.continue_backtest:
+                break
 
+            events.dispatch()
+    else:
+        update_data = instrumentation.update_data if instrumentation is not None else \
+            lambda handler: handler.update_latest_data()
+        if instrumentation is not None:
+            instrumentation.start()
         while True:
-            try:
-                event = EventManager().get(block=False)
-            except queue.Empty:
+            update_data(data)
+            if not data.continue_backtest:
                 break
 
-            if event is not None:
-                if event.type == EventType.MARKET:
-                    strategy.calculate_signals(event)
-                    portfolio.update_time_index(event)
-                elif event.type == EventType.SIGNAL:
-                    portfolio.update_signal(event)
-                elif event.type == EventType.ORDER:
-                    broker.execute_order(event)
-                elif event.type == EventType.FILL:
-                    portfolio.update_fill(event)
-
-    stats = portfolio.summary_stats()
-    print(stats)
+            events.dispatch()
+            bar += 1
+            if checkpoint is not None:
+                checkpoint.maybe_save(data, portfolio, strategy, broker, events, bar)
+        if instrumentation is not None:
+            instrumentation.finish()
+
+    if streaming:
+        results = portfolio.flush_results()
+        if verbose:
+            print(results.summary_stats())
+        return results
+
+    if verbose:
+        stats = portfolio.summary_stats()
+        print(stats)
     temp_df = portfolio.create_equity_curve_dataframe()
 
     return temp_df
+
+
+def vectorized_backtest(
+    data: DataHandler,
+    strategy: Strategy,
+    initial_capital: float = 1.0,
+    zero_cost_fills: bool = True
+) -> pd.DataFrame:
+    # 与 backtest 相同的成交规则：方向变化的当根K线以收盘价成交，开仓数量为 floor(现金 / 价格)，
+    # 同一根K线上的所有开仓都按该K线成交前的现金计算。
+    # zero_cost_fills 对应 SimulateExecutionHandler 回报 fill_cost=0，此时 IB 佣金为 0
+    dates, close = data.get_field_matrix(data.price_col)
+    signals = np.array(strategy.calculate_vectorized_signals(close), dtype=np.float64)
+    n_bars, n_symbols = close.shape
+    # 没有价格（未上市或停牌）的K线上无法成交，沿用之前的方向
+    signals[np.isnan(close)] = np.nan
+    signals = pd.DataFrame(signals).ffill().fillna(0.0).to_numpy()
+
+    previous = np.vstack([np.zeros((1, n_symbols)), signals[:-1]])
+    trade_rows = np.flatnonzero(np.any(signals != previous, axis=1))
+
+    # 只在发生交易的K线上循环，其余全部由累计运算得到
+    trades = np.zeros((n_bars, n_symbols))
+    commissions = np.zeros((n_bars, n_symbols))
+    position = np.zeros(n_symbols)
+    cash = initial_capital
+    for t in trade_rows:
+        changed = signals[t] != previous[t]
+        trade = np.where(changed, -position, 0.0)
+        opening = changed & (signals[t] != 0)
+        if opening.any():
+            size = np.array([math.floor(cash / price) for price in close[t, opening]], dtype=np.float64)
+            trade[opening] += np.sign(signals[t, opening]) * size
+        fill_cost = 0.0 if zero_cost_fills else close[t]
+        commission = np.where(trade != 0, calculate_ib_commissions(trade, fill_cost), 0.0)
+        cash -= np.sum(np.where(trade != 0, trade * close[t], 0.0) + commission)
+        position += trade
+        trades[t] = trade
+        commissions[t] = commission
+
+    cash_flow = np.sum(np.where(trades != 0, trades * close, 0.0) + commissions, axis=1)
+
+    # 记录的是每根K线成交前的持仓与现金，按当根收盘价估值，与 NaivePortfolio.update_time_index 一致
+    positions_before = np.zeros_like(trades)
+    positions_before[1:] = np.cumsum(trades, axis=0)[:-1]
+    cash_before = np.full(n_bars, float(initial_capital))
+    cash_before[1:] -= np.cumsum(cash_flow)[:-1]
+    commission_before = np.zeros(n_bars)
+    commission_before[1:] = np.cumsum(commissions.sum(axis=1))[:-1]
+
+    # 估值与组合一样用向前填充的价格：停牌的持仓按最近收盘价计市值；未填充的 close 只用于信号和成交
+    marks = close if data.forward_fill else data.get_field_matrix(data.price_col, forward_fill=True)[1]
+    market_value = np.where(positions_before != 0, positions_before * marks, 0.0)
+    curve = pd.DataFrame(market_value, columns=list(data.symbol_list),
+                         index=pd.DatetimeIndex(dates.view('M8[ns]'), name='datetime'))
+    curve['cash'] = cash_before
+    curve['commission'] = commission_before
+    curve['total'] = cash_before + market_value.sum(axis=1)
+    curve['returns'] = curve['total'].pct_change()
+    curve['equity_curve'] = (1.0 + curve['returns']).cumprod()
+    return curve
+
+
+def kernel_backtest(
+    data: DataHandler,
+    strategy: Strategy,
+    initial_capital: float = 1.0,
+    zero_cost_fills: bool = True,
+    jit: Optional[bool] = None
+) -> pd.DataFrame:
+    # 路径相关策略的编译执行路径：策略的逐K线内核（Strategy.bar_kernel，签名见 backtester.kernels）、
+    # 成交和账本记账在同一个循环中完成，numba 可用时整体编译（jit=False 强制纯 Python，jit=True 要求 numba）。
+    # 成交规则与 backtest + SimulateExecutionHandler 相同，返回与事件引擎一致的净值曲线
+    kernel, params, state = strategy.bar_kernel()
+    dates, close, previous = kernel_inputs(data, data.price_col)
+    positions, cash, commission = run_kernel(kernel, close, previous, state, params, initial_capital,
+                                             zero_cost_fills, jit)
+
+    # 与 NaivePortfolio.update_time_index 相同：按当根收盘价（停牌沿用最近价格）估值，没有价格的市值记为 0
+    market_value = positions * close
+    market_value[np.isnan(market_value)] = 0.0
+    n = len(data.symbol_list)
+    holdings = np.empty((len(dates), n + len(HOLDINGS_COLUMNS)))
+    holdings[:, :n] = market_value
+    holdings[:, n] = cash
+    holdings[:, n + 1] = commission
+    holdings[:, n + 2] = cash + market_value.sum(axis=1)
+    ledger = Ledger(data.symbol_list, max(len(dates), 1))
+    ledger.load(np.asarray(dates, dtype=np.int64), positions, holdings)
+    return ledger.equity_curve()
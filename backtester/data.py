@@ -1,13 +1,18 @@
 # 导入必要的模块
 from abc import ABC, abstractmethod  # 用于创建抽象基类
 from enum import Enum, auto  # 用于创建枚举类型
-from typing import List, Dict  # 用于类型注解
+from typing import Callable, List, Dict, Optional, Union  # 用于类型注解
 
-import akshare as ak  # 导入akshare库用于获取股票数据
+import numpy as np  # 导入numpy用于数组存储
 import pandas as pd  # 导入pandas用于数据处理
 
+from backtester.bars import Bar, BarSnapshot, BarStore, BarWindow  # 导入列式K线存储
+from backtester.baseline import DEFAULT_BENCHMARK, Benchmark  # 导入基准指数
+from backtester.cache import BarCache  # 导入本地列式缓存
 from backtester.event import MarketEvent  # 导入自定义的MarketEvent
-from backtester.event_manager import EventManager  # 导入自定义的EventManager
+from backtester.event_manager import EventEmitter  # 导入事件总线的注入基类
+from backtester.fetcher import Fetcher, AKShareFetcher, fetch_all  # 导入数据获取接口
+from backtester.indicators import Indicator  # 导入流式指标
 
 
 # 定义数据源枚举类
@@ -17,7 +22,7 @@ class DataSource(Enum):
 
 
 # 定义抽象基类DataHandler
-class DataHandler(ABC):
+class DataHandler(EventEmitter, ABC):
     @abstractmethod
     def get_latest_data(self, symbol: str, num: int = 1) -> List[Dict]:
         pass
@@ -26,75 +31,189 @@ class DataHandler(ABC):
     def update_latest_data(self) -> None:
         pass
 
+    def get_state(self) -> dict:
+        raise NotImplementedError(f"{type(self).__name__} does not support checkpointing.")
+
+    def set_state(self, state: dict):
+        raise NotImplementedError(f"{type(self).__name__} does not support checkpointing.")
+
     @property
     @abstractmethod
     def continue_backtest(self) -> bool:
         pass
 
+    def get_latest_values(self, field: str = "close", forward_fill: Optional[bool] = None) -> np.ndarray:
+        # 所有品种最新一根K线的某个字段，没有数据的品种为 NaN
+        values = np.full(len(self.symbol_list), np.nan)
+        for i, symbol in enumerate(self.symbol_list):
+            latest_data = self.get_latest_data(symbol, num=1)
+            if latest_data:
+                values[i] = latest_data[-1][field]
+        return values
 
-# 实现AKShare数据处理类
-class AKShareDataHandler(DataHandler):
-    def __init__(self, symbol_list: List[str], start_date: str, end_date: str):
-        self.symbol_list = symbol_list
-        self.start_date = start_date
-        self.end_date = end_date
+    def get_latest_datetime(self):
+        for symbol in self.symbol_list:
+            latest_data = self.get_latest_data(symbol, num=1)
+            if latest_data:
+                return latest_data[-1][self.time_col]
+        return None
+
+
+# 基于连续 NumPy 数组的数据处理类，每个品种一个游标，取最近数据返回零拷贝视图。
+# 所有品种按时间戳合并到一条并集日历上，每个时间戳推送一次 MarketEvent，
+# 全部品种的数据耗尽后才结束；当前时间戳没有K线的品种（未上市、停牌）
+# 在 forward_fill=True 时沿用上一根K线，否则视为缺失。
+# start/end（含两端）把回测限制在一段时间内，只移动各品种的行区间，不拷贝数据
+class ArrayDataHandler(DataHandler):
+    benchmark: Optional[Benchmark] = None  # 可选的基准指数，见 create_baseline_dataframe
+
+    def __init__(self, store: BarStore, symbol_list: Optional[List[str]] = None, forward_fill: bool = True,
+                 start=None, end=None):
+        self.store = store
+        self.symbol_list = list(symbol_list) if symbol_list is not None else list(store.symbols)
+        self.forward_fill = forward_fill
+        self.start = start  # 构造时给出的回测区间，sweep 等在子进程中按同样的区间重建数据处理器
+        self.end = end
 
         self.time_col = "date"
         self.price_col = "close"
 
-        self.symbol_data: Dict[str, pd.DataFrame] = {}
-        self.latest_symbol_data: Dict[str, List[Dict]] = {symbol: [] for symbol in symbol_list}
-        self.all_data: Dict[str, pd.DataFrame] = {}  # 存储所有数据
+        self._symbol_index = {symbol: i for i, symbol in enumerate(self.symbol_list)}
+        rows = np.array([store.index(symbol) for symbol in self.symbol_list], dtype=np.int64)
+        self._start = store.offsets[rows]  # 每个品种在列数组中的起始行
+        self._end = store.offsets[rows + 1]  # 每个品种在列数组中的结束行（不含）
+        if start is not None or end is not None:
+            self._restrict(start, end)
+        self._cursors = self._start.copy()  # 已经推送出去的数据的结束行（不含）
+        self._build_calendar()
         self._continue_backtest = True  # 控制回测是否继续的标志
+        self.indicators: Dict[str, Dict[str, Indicator]] = {symbol: {} for symbol in self.symbol_list}
 
-        self._load_akshare_data()  # 加载数据
-        self._generators = {symbol: self._get_new_bar(symbol) for symbol in self.symbol_list}  # 创建数据生成器
+    def _restrict(self, start, end):
+        times = self.store.columns[self.time_col]
+        lower = pd.Timestamp(start).value if start is not None else None
+        upper = pd.Timestamp(end).value if end is not None else None
+        for i, (lo, hi) in enumerate(zip(self._start.tolist(), self._end.tolist())):
+            if lower is not None:
+                self._start[i] = lo + np.searchsorted(times[lo:hi], lower, side='left')
+            if upper is not None:
+                self._end[i] = lo + np.searchsorted(times[lo:hi], upper, side='right')
+        self._end = np.maximum(self._end, self._start)
 
-    def _load_akshare_data(self):
-        # 从 AKShare 加载数据并进行预处理
-        for symbol in self.symbol_list:
-            data = ak.stock_zh_a_hist(symbol=symbol, start_date=self.start_date, end_date=self.end_date, adjust="hfq")
-            data.set_index(keys='日期', inplace=True)
-            data.index = pd.to_datetime(data.index)
-            data = data[['收盘']]
-            data.columns = ['close']
-            self.symbol_data[symbol] = data[data['close'] > 0.0]
-            self.all_data[symbol] = data
-
-    def _get_new_bar(self, symbol: str):
-        # 生成器函数，用于逐个返回数据条目
-        for index, row in self.symbol_data[symbol].iterrows():
-            yield {"symbol": symbol, "date": index, "close": row["close"]}
-
-    def get_latest_data(self, symbol: str, num: int = 1):
-        # 获取最新的数据
+    def _build_calendar(self):
+        # 预先计算并集日历，以及每个时间戳上有K线的品种，推进一个时间戳的开销与该时刻的K线数成正比
+        times = self.store.columns[self.time_col]
+        per_symbol = [times[lo:hi] for lo, hi in zip(self._start, self._end)]
+        self.calendar = np.unique(np.concatenate(per_symbol)) if per_symbol else np.empty(0, np.int64)
+        calendar_rows = np.concatenate([np.searchsorted(self.calendar, t) for t in per_symbol]) \
+            if per_symbol else np.empty(0, np.int64)
+        symbol_ids = np.repeat(np.arange(len(self.symbol_list)), self._end - self._start)
+        order = np.argsort(calendar_rows, kind='stable')
+        self._calendar_symbols = symbol_ids[order]
+        self._calendar_bounds = np.searchsorted(calendar_rows[order], np.arange(len(self.calendar) + 1))
+        self._time_index = 0  # 下一个要推送的日历位置
+
+    def register_indicator(self, name: str, factory: Callable[[], Indicator],
+                           symbols: Optional[List[str]] = None):
+        # 为每个品种创建一个指标实例，随 update_latest_data 逐根更新；已推送的历史会先回放一遍
+        for symbol in symbols if symbols is not None else self.symbol_list:
+            if name in self.indicators[symbol]:
+                continue
+            indicator = factory()
+            i = self._symbol_index[symbol]
+            for row in range(int(self._start[i]), int(self._cursors[i])):
+                indicator.on_bar(Bar(self.store, symbol, row))
+            self.indicators[symbol][name] = indicator
+
+    def get_indicator(self, symbol: str, name: str) -> Indicator:
+        return self.indicators[symbol][name]
+
+    def _update_indicators(self, advanced: np.ndarray):
+        for i in advanced:
+            symbol = self.symbol_list[i]
+            indicators = self.indicators[symbol]
+            if indicators:
+                bar = Bar(self.store, symbol, int(self._cursors[i]) - 1)
+                for indicator in indicators.values():
+                    indicator.on_bar(bar)
+
+    def _is_current(self, i: int) -> bool:
+        row = self._cursors[i] - 1
+        return row >= self._start[i] and self.store.columns[self.time_col][row] == self.calendar[self._time_index - 1]
+
+    def get_latest_data(self, symbol: str, num: int = 1) -> BarWindow:
+        # 获取最新的 num 根K线，num <= 0 时返回全部历史
         try:
-            return self.latest_symbol_data[symbol][-num:]
+            i = self._symbol_index[symbol]
         except KeyError:
             print(f"{symbol} is not a valid symbol.")
             return []
+        hi = int(self._cursors[i])
+        if not self.forward_fill and not self._is_current(i):
+            return BarWindow(self.store, symbol, hi, hi)
+        lo = int(self._start[i]) if num <= 0 else max(int(self._start[i]), hi - num)
+        return BarWindow(self.store, symbol, lo, hi)
+
+    def get_latest_values(self, field: str = "close", forward_fill: Optional[bool] = None) -> np.ndarray:
+        rows = self._cursors - 1
+        safe_rows = np.maximum(rows, 0)
+        values = self.store.columns[field][safe_rows].astype(np.float64, copy=True)
+        missing = rows < self._start
+        if not (self.forward_fill if forward_fill is None else forward_fill) and self._time_index > 0:
+            missing |= self.store.columns[self.time_col][safe_rows] != self.calendar[self._time_index - 1]
+        values[missing] = np.nan
+        return values
+
+    def get_latest_datetime(self):
+        if self._time_index == 0:
+            return None
+        return pd.Timestamp(int(self.calendar[self._time_index - 1]))
+
+    def get_field_matrix(self, field: str = "close", forward_fill: Optional[bool] = None):
+        # 按并集日历对齐的 (时间戳, 时间 x 品种矩阵)，缺失处按 forward_fill（缺省取 self.forward_fill）处理
+        matrix = np.full((len(self.calendar), len(self.symbol_list)), np.nan)
+        times = self.store.columns[self.time_col]
+        for i, (lo, hi) in enumerate(zip(self._start, self._end)):
+            matrix[np.searchsorted(self.calendar, times[lo:hi]), i] = self.store.columns[field][lo:hi]
+        if self.forward_fill if forward_fill is None else forward_fill:
+            matrix = pd.DataFrame(matrix).ffill().to_numpy()
+        return self.calendar, matrix
+
+    def iter_rows(self):
+        # 按并集日历逐个时间戳给出 (纳秒时间戳, 有K线的品种下标, 这些K线在存储中的行号)，不移动游标
+        cursors = self._start.copy()
+        for t, timestamp in enumerate(self.calendar.tolist()):
+            advanced = self._calendar_symbols[self._calendar_bounds[t]:self._calendar_bounds[t + 1]]
+            rows = cursors[advanced]
+            cursors[advanced] += 1
+            yield timestamp, advanced, rows
 
     def update_latest_data(self):
-        # 更新最新数据并触发市场事件
-        for symbol in self.symbol_list:
-            try:
-                bar = next(self._generators[symbol])
-                self.latest_symbol_data[symbol].append(bar)
-            except StopIteration:
-                self._continue_backtest = False
-
-        EventManager().put(MarketEvent())
-
-    @staticmethod
-    def create_baseline_dataframe():
-        # 创建基准数据框（例如，上证指数）
-        baseline_symbol = 'sh000001'
-        baseline_data = ak.stock_zh_index_daily(symbol=baseline_symbol)
-        baseline_data.set_index(keys='date', inplace=True)
-        baseline_data.index = pd.to_datetime(baseline_data.index)
-        baseline_data = baseline_data[['close']]
-        baseline_data.columns = ['Baseline']
-        return baseline_data
+        if self._time_index >= len(self.calendar):
+            self._continue_backtest = False
+            return
+
+        lo, hi = self._calendar_bounds[self._time_index], self._calendar_bounds[self._time_index + 1]
+        advanced = self._calendar_symbols[lo:hi]
+        self._cursors[advanced] += 1
+        self._time_index += 1
+        self._update_indicators(advanced)
+        self.put_event(MarketEvent(self.get_latest_datetime(), self.get_snapshot(advanced)))
+
+    def get_snapshot(self, advanced: Optional[np.ndarray] = None) -> BarSnapshot:
+        # 当前时间戳的K线快照；advanced 为本时间戳推进了的品种，未给出时按时间戳比对
+        rows = self._cursors - 1
+        has_data = rows >= self._start
+        if advanced is None:
+            updated = has_data.copy()
+            if self._time_index > 0:
+                updated &= self.store.columns[self.time_col][np.maximum(rows, 0)] == \
+                    self.calendar[self._time_index - 1]
+        else:
+            updated = np.zeros(len(self.symbol_list), dtype=bool)
+            updated[advanced] = True
+        timestamp = int(self.calendar[self._time_index - 1]) if self._time_index > 0 else 0
+        return BarSnapshot(self.store, self.symbol_list, timestamp, rows, has_data, updated, self.forward_fill)
 
     @property
     def continue_backtest(self) -> bool:
@@ -104,14 +223,83 @@ class AKShareDataHandler(DataHandler):
     def continue_backtest(self, value: bool):
         self._continue_backtest = value
 
+    def create_baseline_dataframe(self, index=None) -> pd.DataFrame:
+        # 对齐到回测日历并以 1 为起点的基准净值（Baseline 列），对齐结果由 Benchmark 缓存
+        if self.benchmark is None:
+            raise ValueError(f"{type(self).__name__} has no benchmark configured")
+        if index is None:
+            index = pd.DatetimeIndex(self.calendar.view('M8[ns]'))
+        return self.benchmark.frame(index)
+
+    def get_state(self) -> dict:
+        # 断点续跑用：游标、日历位置和各品种指标的内部状态；K线数据本身不保存
+        return {'symbols': list(self.symbol_list), 'calendar': len(self.calendar), 'cursors': self._cursors.copy(),
+                'time_index': self._time_index, 'continue_backtest': self._continue_backtest,
+                'indicators': self.indicators}
+
+    def set_state(self, state: dict):
+        if state['symbols'] != list(self.symbol_list) or state['calendar'] != len(self.calendar):
+            raise ValueError("Checkpoint was taken on different data")
+        self._cursors[:] = state['cursors']
+        self._time_index = state['time_index']
+        self._continue_backtest = state['continue_backtest']
+        self.indicators = state['indicators']
+
+
+# 实现AKShare数据处理类
+class AKShareDataHandler(ArrayDataHandler):
+    def __init__(self, symbol_list: List[str], start_date: str, end_date: str, adjust: str = "hfq",
+                 cache: Optional[BarCache] = None, fetcher: Optional[Fetcher] = None,
+                 max_workers: int = 8, retries: int = 3, backoff: float = 0.5,
+                 benchmark: Union[str, Benchmark, None] = DEFAULT_BENCHMARK):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.adjust = adjust
+        self.cache = cache  # 为 None 时每次都从数据源下载
+        self.fetcher = fetcher if fetcher is not None else AKShareFetcher()
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        # 基准指数与行情共用同一个本地缓存
+        self.benchmark = Benchmark(benchmark, cache=cache) if isinstance(benchmark, str) else benchmark
+
+        self.failed_symbols: Dict[str, Exception] = {}  # 下载失败的品种及原因
+
+        # 下载的 DataFrame 只在构建 BarStore 时使用，之后每个品种只在列式存储中保留一份
+        symbol_data = self._load_akshare_data(symbol_list)
+        loaded = [symbol for symbol in symbol_list if symbol in symbol_data]
+        super().__init__(BarStore.from_frames(symbol_data), loaded)
+
+    def _load_symbol(self, symbol: str) -> pd.DataFrame:
+        if self.cache is not None:
+            return self.cache.get(symbol, self.start_date, self.end_date, self.adjust, fetcher=self.fetcher)
+        return self.fetcher.fetch(symbol, self.start_date, self.end_date, self.adjust)
+
+    def _load_akshare_data(self, symbol_list: List[str]) -> Dict[str, pd.DataFrame]:
+        # 从 AKShare 并发加载数据并进行预处理（剔除收盘价非正的K线），配置了缓存时只下载缺失的日期区间
+        frames, self.failed_symbols = fetch_all(self._load_symbol, symbol_list, self.max_workers,
+                                                self.retries, self.backoff)
+        for symbol, error in self.failed_symbols.items():
+            print(f"Failed to load {symbol}: {error!r}")
+        if not frames:
+            raise ValueError("No data could be loaded for any symbol")
+
+        symbol_data = {}
+        for symbol in symbol_list:
+            if symbol in frames:
+                data = frames.pop(symbol)
+                symbol_data[symbol] = data[data['close'] > 0.0]
+        return symbol_data
+
 
 # 数据加载器类
 class DataLoader:
-    def __init__(self, symbol_list: List[str], start_date: str, end_date: str, source: DataSource):
+    def __init__(self, symbol_list: List[str], start_date: str, end_date: str, source: DataSource, **kwargs):
         self.symbol_list = symbol_list
         self.start_date = start_date
         self.end_date = end_date
         self.source = source
+        self.kwargs = kwargs  # 透传给具体的DataHandler，例如 cache/fetcher/adjust
         self.data_handler = self._load_data_handler()
 
     def __call__(self) -> DataHandler:
@@ -120,7 +308,7 @@ class DataLoader:
     def _load_data_handler(self) -> DataHandler:
         # 根据指定的数据源创建相应的DataHandler
         if self.source == DataSource.AKSHARE:
-            return AKShareDataHandler(self.symbol_list, self.start_date, self.end_date)
+            return AKShareDataHandler(self.symbol_list, self.start_date, self.end_date, **self.kwargs)
         elif self.source == DataSource.YFINANCE:
             # 实现YahooDataHandler
             pass
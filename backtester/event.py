@@ -2,7 +2,11 @@ from abc import ABC
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum, auto
-from typing import Optional
+from typing import Optional, Sequence
+
+import numpy as np
+
+from backtester.bars import BarSnapshot
 
 
 class EventType(Enum):
@@ -10,6 +14,10 @@ class EventType(Enum):
     SIGNAL = auto()
     ORDER = auto()
     FILL = auto()
+    SIGNAL_BATCH = auto()
+    ORDER_BATCH = auto()
+    FILL_BATCH = auto()
+    TARGET = auto()
 
 
 class SignalType(Enum):
@@ -29,40 +37,49 @@ class OrderDirection(Enum):
     SELL = auto()
 
 
+# 事件都是带 __slots__ 的不可变数据类：没有实例 __dict__，创建和访问更快，分发过程中也不会被意外修改
 class Event(ABC):
+    __slots__ = ()
     type: EventType
 
 
-@dataclass
+# bars 为当前时间戳所有品种的K线快照（BarSnapshot），消费者不必再逐个品种查询数据
+@dataclass(frozen=True, slots=True)
 class MarketEvent(Event):
+    datetime: Optional[datetime] = None
+    bars: Optional[BarSnapshot] = None
     type: EventType = EventType.MARKET
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SignalEvent(Event):
     symbol: str
     datetime: datetime
     signal_type: SignalType
     quantity: int
+    order_type: OrderType = OrderType.MARKET
+    price: Optional[float] = None  # LIMIT/STOP 订单的限价或触发价
     type: EventType = EventType.SIGNAL
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class OrderEvent(Event):
     symbol: str
     order_type: OrderType
     quantity: int
     direction: OrderDirection
+    price: Optional[float] = None  # LIMIT 为限价，STOP 为触发价，MARKET 忽略
     type: EventType = EventType.ORDER
 
     def print_order(self):
+        price = f", Price={self.price}" if self.price is not None else ""
         print(
             f"Order: Symbol={self.symbol}, Type={self.order_type.name}, "
-            f"Quantity={self.quantity}, Direction={self.direction.name}"
+            f"Quantity={self.quantity}, Direction={self.direction.name}{price}"
         )
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FillEvent(Event):
     time_index: datetime
     symbol: str
@@ -74,8 +91,10 @@ class FillEvent(Event):
     type: EventType = EventType.FILL
 
     def __post_init__(self):
+        # 只在未给出佣金时计算一次；成本为 0 的模拟成交佣金必为 0，直接跳过
         if self.commission is None:
-            self.commission = self.calculate_ib_commission()
+            commission = self.calculate_ib_commission() if self.fill_cost else 0.0
+            object.__setattr__(self, 'commission', commission)
 
     def calculate_ib_commission(self) -> float:
         if self.quantity <= 500:
@@ -83,3 +102,64 @@ class FillEvent(Event):
         else:
             full_cost = max(1.3, 0.008 * self.quantity)
         return min(full_cost, 0.005 * self.quantity * self.fill_cost)
+
+
+# 批量事件：一个事件携带整个品种列表的信号/订单/成交，数组与 symbols（数据处理类的 symbol_list）逐位对齐。
+# 横截面策略每根K线只需发出一个事件，组合和执行端按数组整体处理
+
+# signal_types 为 SignalType.value 的整数数组，0 表示该品种没有信号
+@dataclass(frozen=True, slots=True)
+class SignalBatchEvent(Event):
+    symbols: Sequence[str]
+    datetime: datetime
+    signal_types: np.ndarray
+    quantities: np.ndarray
+    type: EventType = EventType.SIGNAL_BATCH
+
+
+# quantities 为带符号的下单数量，正数买入、负数卖出，0 表示不下单
+@dataclass(frozen=True, slots=True)
+class OrderBatchEvent(Event):
+    symbols: Sequence[str]
+    order_type: OrderType
+    quantities: np.ndarray
+    type: EventType = EventType.ORDER_BATCH
+
+
+# quantities 为带符号的成交数量，commissions 未给出时按 calculate_ib_commissions 一次性计算
+@dataclass(frozen=True, slots=True)
+class FillBatchEvent(Event):
+    time_index: datetime
+    symbols: Sequence[str]
+    exchange: str
+    quantities: np.ndarray
+    fill_costs: np.ndarray
+    commissions: Optional[np.ndarray] = None
+    type: EventType = EventType.FILL_BATCH
+
+    def __post_init__(self):
+        if self.commissions is None:
+            object.__setattr__(self, 'commissions', calculate_ib_commissions(self.quantities, self.fill_costs))
+
+
+class TargetKind(Enum):
+    POSITIONS = auto()  # 目标持股数量
+    WEIGHTS = auto()  # 目标市值占组合总权益的比例
+
+
+# 横截面策略的目标：targets 与 symbols 逐位对齐，NaN 表示该品种维持现状
+@dataclass(frozen=True, slots=True)
+class TargetEvent(Event):
+    symbols: Sequence[str]
+    datetime: datetime
+    targets: np.ndarray
+    kind: TargetKind = TargetKind.WEIGHTS
+    type: EventType = EventType.TARGET
+
+
+def calculate_ib_commissions(quantity, fill_cost):
+    # FillEvent.calculate_ib_commission 的向量化版本，quantity/fill_cost 为等长数组
+    quantity = np.abs(np.asarray(quantity, dtype=np.float64))
+    rate = np.where(quantity <= 500, 0.013, 0.008)
+    full_cost = np.maximum(1.3, rate * quantity)
+    return np.minimum(full_cost, 0.005 * quantity * np.asarray(fill_cost, dtype=np.float64))
@@ -1,4 +1,5 @@
 import queue
+from collections import deque
 
 
 class EventManager:
@@ -23,3 +24,61 @@ class EventManager:
 
     def empty(self):
         return self._queue.empty()
+
+    def clear(self):
+        while True:
+            try:
+                self._queue.get(block=False)
+            except queue.Empty:
+                break
+
+
+# 单个引擎私有的事件总线：普通 deque 加按事件类型索引的分发表，单线程循环无需加锁
+class EventBus:
+    def __init__(self):
+        self._events = deque()
+        self._handlers = {}
+
+    def put(self, event):
+        self._events.append(event)
+
+    def get(self, block=False, timeout=None):
+        try:
+            return self._events.popleft()
+        except IndexError:
+            raise queue.Empty
+
+    def empty(self):
+        return not self._events
+
+    def clear(self):
+        self._events.clear()
+
+    def __len__(self):
+        return len(self._events)
+
+    def __iter__(self):
+        return iter(self._events)
+
+    def subscribe(self, event_type, handler):
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    def dispatch(self):
+        events = self._events
+        handlers = self._handlers
+        while events:
+            event = events.popleft()
+            if event is not None:
+                for handler in handlers.get(event.type, ()):
+                    handler(event)
+
+
+# 数据、策略、组合和执行组件的公共基类：引擎注入 events，未注入时退回全局 EventManager
+class EventEmitter:
+    events = None
+
+    def put_event(self, event):
+        if self.events is None:
+            EventManager().put(event)
+        else:
+            self.events.put(event)
@@ -0,0 +1,337 @@
+import heapq
+import math
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from backtester.event import (EventType, FillBatchEvent, FillEvent, OrderDirection, OrderType,
+                              calculate_ib_commissions)
+from backtester.execution import ExecutionHandler
+
+
+# 滑点模型：price 为参考成交价，quantity 为带符号的成交数量（买入为正），volume 为该K线成交量。
+# 参数既可以是标量也可以是等长数组，返回含滑点的成交价
+class SlippageModel(ABC):
+    @abstractmethod
+    def apply(self, price, quantity, volume):
+        pass
+
+
+class NoSlippage(SlippageModel):
+    def apply(self, price, quantity, volume):
+        return price
+
+
+# 每股固定滑点，买入加价、卖出减价
+class FixedSlippage(SlippageModel):
+    def __init__(self, amount: float = 0.01):
+        self.amount = amount
+
+    def apply(self, price, quantity, volume):
+        return price + np.sign(quantity) * self.amount
+
+
+# 按价格比例的滑点
+class PercentSlippage(SlippageModel):
+    def __init__(self, rate: float = 0.001):
+        self.rate = rate
+
+    def apply(self, price, quantity, volume):
+        return price * (1.0 + np.sign(quantity) * self.rate)
+
+
+# 市场冲击随成交量占比平方增长：price * (1 ± impact * (|quantity| / volume) ** 2)
+class VolumeShareSlippage(SlippageModel):
+    def __init__(self, impact: float = 0.1):
+        self.impact = impact
+
+    def apply(self, price, quantity, volume):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = np.where(np.asarray(volume) > 0, np.abs(quantity) / volume, 0.0)
+        return price * (1.0 + np.sign(quantity) * self.impact * share ** 2)
+
+
+# 佣金模型：quantity 为成交数量（可带符号），price 为成交价，标量或等长数组
+class CommissionModel(ABC):
+    @abstractmethod
+    def calculate(self, quantity, price):
+        pass
+
+
+class NoCommission(CommissionModel):
+    def calculate(self, quantity, price):
+        return np.zeros_like(np.asarray(quantity, dtype=np.float64))
+
+
+class IBCommission(CommissionModel):
+    def calculate(self, quantity, price):
+        return calculate_ib_commissions(quantity, price)
+
+
+# 每股固定费用，可设最低收费
+class PerShareCommission(CommissionModel):
+    def __init__(self, cost: float = 0.005, minimum: float = 0.0):
+        self.cost = cost
+        self.minimum = minimum
+
+    def calculate(self, quantity, price):
+        quantity = np.abs(np.asarray(quantity, dtype=np.float64))
+        return np.where(quantity > 0, np.maximum(self.minimum, self.cost * quantity), 0.0)
+
+
+# 按成交金额比例收费，可设最低收费（如 A 股万三、最低 5 元）
+class PercentCommission(CommissionModel):
+    def __init__(self, rate: float = 0.0003, minimum: float = 5.0):
+        self.rate = rate
+        self.minimum = minimum
+
+    def calculate(self, quantity, price):
+        value = np.abs(np.asarray(quantity, dtype=np.float64)) * np.asarray(price, dtype=np.float64)
+        return np.where(value > 0, np.maximum(self.minimum, self.rate * value), 0.0)
+
+
+class RestingOrder:
+    __slots__ = ('order_id', 'symbol', 'order_type', 'direction', 'price', 'remaining', 'active')
+
+    def __init__(self, order_id: int, symbol: str, order_type: OrderType, direction: OrderDirection,
+                 price: Optional[float], quantity: int):
+        self.order_id = order_id
+        self.symbol = symbol
+        self.order_type = order_type
+        self.direction = direction
+        self.price = price
+        self.remaining = quantity
+        self.active = True
+
+    def __repr__(self):
+        return (f"RestingOrder(id={self.order_id}, symbol={self.symbol!r}, type={self.order_type.name}, "
+                f"direction={self.direction.name}, price={self.price}, remaining={self.remaining})")
+
+
+# 单个品种的挂单簿。四个堆按最先可能成交的价格排序，同价按下单顺序：
+#   买入限价单按价格从高到低，卖出限价单从低到高；买入止损单按触发价从低到高，卖出止损单从高到低。
+# 每根K线只需看堆顶，成交或触发 k 个订单的开销为 O(k log n)。撤单只做标记，出堆时跳过
+class OrderBook:
+    def __init__(self):
+        self.market: List[RestingOrder] = []
+        self.buy_limits = []
+        self.sell_limits = []
+        self.buy_stops = []
+        self.sell_stops = []
+        self.size = 0
+
+    def add(self, order: RestingOrder, seq: int):
+        buy = order.direction == OrderDirection.BUY
+        if order.order_type == OrderType.MARKET:
+            self.market.append(order)
+        elif order.order_type == OrderType.LIMIT:
+            heap, key = (self.buy_limits, -order.price) if buy else (self.sell_limits, order.price)
+            heapq.heappush(heap, (key, seq, order))
+        else:
+            heap, key = (self.buy_stops, order.price) if buy else (self.sell_stops, -order.price)
+            heapq.heappush(heap, (key, seq, order))
+        self.size += 1
+
+    @staticmethod
+    def _top(heap):
+        # 丢弃堆顶已撤销或已完成的订单
+        while heap and not heap[0][2].active:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+
+# 模拟交易所执行端：市价单在下单所在K线按收盘价成交，限价单和止损单挂在按品种划分的挂单簿里，
+# 从下一根K线开始用 OHLC 撮合：
+#   买入限价单在 low <= 限价时成交，价格为 min(open, 限价)；卖出限价单在 high >= 限价时以 max(open, 限价) 成交；
+#   买入止损单在 high >= 触发价时触发，按 max(open, 触发价) 成交；卖出止损单在 low <= 触发价时按 min(open, 触发价) 成交。
+# participation 限制每根K线每个品种的成交量不超过该K线成交量的一定比例，超出部分留到后续K线继续成交（部分成交）；
+# 未成交完的市价单在后续K线按开盘价成交。停牌（当前时间戳没有K线）的品种不撮合。
+# 成交价经 slippage 调整，佣金由 commission 计算，成交时间为K线时间
+class SimulatedExchange(ExecutionHandler):
+    def __init__(self, data, slippage: Optional[SlippageModel] = None,
+                 commission: Optional[CommissionModel] = None, participation: Optional[float] = None,
+                 exchange: str = 'SIM', verbose: bool = False):
+        self.data = data
+        self.slippage = slippage if slippage is not None else NoSlippage()
+        self.commission = commission if commission is not None else IBCommission()
+        self.participation = participation
+        self.exchange = exchange
+        self.verbose = verbose
+        self.books: Dict[str, OrderBook] = {}
+        self.orders: Dict[int, RestingOrder] = {}
+        self._next_id = 0
+        self._used_volume: Dict[str, float] = {}
+        self._symbol_index = {symbol: i for i, symbol in enumerate(data.symbol_list)}
+        self._now = None  # 当前K线时间，on_market 时更新
+
+    # ---- 订单管理 ----
+
+    def submit(self, symbol: str, order_type: OrderType, quantity: int, direction: OrderDirection,
+               price: Optional[float] = None) -> Optional[int]:
+        # 返回订单号；数量为 0 的订单直接忽略，负数数量按反方向处理（与 SimulateExecutionHandler 一致）
+        if quantity == 0:
+            return None
+        if quantity < 0:
+            quantity = -quantity
+            direction = OrderDirection.SELL if direction == OrderDirection.BUY else OrderDirection.BUY
+        if order_type != OrderType.MARKET and (price is None or not math.isfinite(price)):
+            raise ValueError(f"{order_type.name} orders require a price")
+        order_id = self._new_id()
+        order = RestingOrder(order_id, symbol, order_type, direction, price, quantity)
+        if order_type == OrderType.MARKET:
+            bar = self._current_bar(symbol)
+            if bar is not None:
+                self._fill(order, bar['close'], bar['volume'])
+            if order.remaining == 0:
+                return order_id
+        self.orders[order_id] = order
+        self.books.setdefault(symbol, OrderBook()).add(order, order_id)
+        return order_id
+
+    def _new_id(self) -> int:
+        order_id = self._next_id
+        self._next_id += 1
+        return order_id
+
+    def cancel(self, order_id: int) -> bool:
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return False
+        order.active = False
+        self.books[order.symbol].size -= 1
+        return True
+
+    def cancel_all(self, symbol: Optional[str] = None):
+        for order_id in [i for i, order in self.orders.items() if symbol is None or order.symbol == symbol]:
+            self.cancel(order_id)
+
+    def open_orders(self, symbol: Optional[str] = None) -> List[RestingOrder]:
+        return [order for order in self.orders.values() if symbol is None or order.symbol == symbol]
+
+    # ---- 事件处理 ----
+
+    def execute_order(self, event):
+        if event.type == EventType.ORDER:
+            if self.verbose:
+                event.print_order()
+            self.submit(event.symbol, event.order_type, event.quantity, event.direction, event.price)
+        elif event.type == EventType.ORDER_BATCH:
+            self._execute_batch(event)
+
+    def on_market(self, event):
+        # 新K线到达：先用这根K线撮合之前挂着的订单，再处理本K线上新下的单
+        self._used_volume.clear()
+        self._now = getattr(event, 'datetime', None) or self.data.get_latest_datetime()
+        bars = getattr(event, 'bars', None)
+        for symbol, book in list(self.books.items()):
+            if book.size == 0:
+                del self.books[symbol]
+                continue
+            bar = self._current_bar(symbol, bars)
+            if bar is not None:
+                self._match(book, bar)
+
+    def _current_bar(self, symbol: str, bars=None):
+        # 该品种在当前时间戳的K线，停牌或尚未上市时返回 None
+        if bars is not None:
+            i = self._symbol_index[symbol]
+            if not bars.updated[i]:
+                return None
+            return {field: bars.filled(field)[i] for field in ('open', 'high', 'low', 'close', 'volume')}
+        latest = self.data.get_latest_data(symbol, num=1)
+        if not latest or latest[-1][self.data.time_col] != self.data.get_latest_datetime():
+            return None
+        return latest[-1]
+
+    def _available_volume(self, symbol: str, volume: float) -> float:
+        if self.participation is None:
+            return np.inf
+        return max(0.0, np.floor(self.participation * volume) - self._used_volume.get(symbol, 0.0))
+
+    def _fill(self, order: RestingOrder, price: float, volume: float) -> int:
+        quantity = int(min(order.remaining, self._available_volume(order.symbol, volume)))
+        if quantity <= 0:
+            return 0
+        signed = quantity if order.direction == OrderDirection.BUY else -quantity
+        fill_price = float(self.slippage.apply(price, signed, volume))
+        commission = float(self.commission.calculate(quantity, fill_price))
+        order.remaining -= quantity
+        self._used_volume[order.symbol] = self._used_volume.get(order.symbol, 0.0) + quantity
+        if order.remaining == 0 and order.order_id in self.orders:
+            order.active = False
+            del self.orders[order.order_id]
+            self.books[order.symbol].size -= 1
+        now = self._now if self._now is not None else self.data.get_latest_datetime()
+        self.put_event(FillEvent(now, order.symbol, self.exchange, quantity, order.direction, fill_price, commission))
+        return quantity
+
+    def _match(self, book: OrderBook, bar):
+        open_, high, low, volume = bar['open'], bar['high'], bar['low'], bar['volume']
+        symbol_exhausted = False
+
+        # 上一根K线没成交完的市价单按开盘价成交
+        for order in list(book.market):
+            if order.active:
+                self._fill(order, open_, volume)
+        book.market = [order for order in book.market if order.active]
+
+        # 止损单触发后按市价成交，未成交完的部分转为市价单
+        for heap, triggered, price_of in ((book.buy_stops, lambda p: high >= p, lambda p: max(open_, p)),
+                                          (book.sell_stops, lambda p: low <= p, lambda p: min(open_, p))):
+            while not symbol_exhausted:
+                order = book._top(heap)
+                if order is None or not triggered(order.price):
+                    break
+                heapq.heappop(heap)
+                self._fill(order, price_of(order.price), volume)
+                if order.active:
+                    order.order_type = OrderType.MARKET
+                    book.market.append(order)
+                    symbol_exhausted = True
+
+        for heap, crossed, price_of in ((book.buy_limits, lambda p: low <= p, lambda p: min(open_, p)),
+                                        (book.sell_limits, lambda p: high >= p, lambda p: max(open_, p))):
+            while not symbol_exhausted:
+                order = book._top(heap)
+                if order is None or not crossed(order.price):
+                    break
+                self._fill(order, price_of(order.price), volume)
+                if order.active:
+                    # 成交量额度用完，剩余部分留在堆顶等下一根K线
+                    symbol_exhausted = True
+                else:
+                    heapq.heappop(heap)
+
+    def _execute_batch(self, event):
+        # 批量市价单：一次性按收盘价成交并回报一个 FillBatchEvent，受成交量限制的剩余部分转为挂单
+        if event.order_type != OrderType.MARKET:
+            raise ValueError("Batch orders only support MARKET orders")
+        quantities = np.asarray(event.quantities, dtype=np.float64)
+        snapshot = self.data.get_snapshot() if hasattr(self.data, 'get_snapshot') else None
+        if snapshot is None:
+            raise TypeError("Batch execution requires a data handler that provides get_snapshot()")
+        tradable = snapshot.updated & (quantities != 0)
+        close = snapshot.filled('close')
+        volume = snapshot.filled('volume')
+        filled = np.where(tradable, quantities, 0.0)
+        if self.participation is not None:
+            used = np.array([self._used_volume.get(symbol, 0.0) for symbol in event.symbols])
+            cap = np.maximum(0.0, np.floor(self.participation * np.nan_to_num(volume)) - used)
+            filled = np.sign(filled) * np.minimum(np.abs(filled), cap)
+        fill_costs = np.where(filled != 0, self.slippage.apply(close, filled, volume), 0.0)
+        commissions = np.where(filled != 0, self.commission.calculate(filled, fill_costs), 0.0)
+
+        for i in np.flatnonzero(filled).tolist():
+            symbol = event.symbols[i]
+            self._used_volume[symbol] = self._used_volume.get(symbol, 0.0) + abs(filled[i])
+        if filled.any():
+            self.put_event(FillBatchEvent(self.data.get_latest_datetime(), event.symbols, self.exchange, filled,
+                                          fill_costs, commissions))
+        for i in np.flatnonzero(quantities != filled).tolist():
+            remaining = quantities[i] - filled[i]
+            direction = OrderDirection.BUY if remaining > 0 else OrderDirection.SELL
+            order = RestingOrder(self._new_id(), event.symbols[i], OrderType.MARKET, direction, None,
+                                 int(abs(remaining)))
+            self.orders[order.order_id] = order
+            self.books.setdefault(order.symbol, OrderBook()).add(order, order.order_id)
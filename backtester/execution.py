@@ -1,15 +1,28 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
 
-from backtester.event import FillEvent, EventType
-from backtester.event_manager import EventManager
+import numpy as np
 
+from backtester.event import FillEvent, FillBatchEvent, EventType
+from backtester.event_manager import EventEmitter
 
-class ExecutionHandler(ABC):
+
+class ExecutionHandler(EventEmitter, ABC):
     @abstractmethod
     def execute_order(self, event):
         pass
 
+    def on_market(self, event):
+        # 每根K线开始时调用，在策略之前；需要撮合挂单的执行端重写此方法
+        pass
+
+    def get_state(self) -> dict:
+        # 断点续跑用：默认保存除数据源和事件总线外的全部属性
+        return {key: value for key, value in vars(self).items() if key not in ('data', 'events')}
+
+    def set_state(self, state: dict):
+        self.__dict__.update(state)
+
 
 class SimulateExecutionHandler(ExecutionHandler):
     def __init__(self, verbose=False):
@@ -20,4 +33,10 @@ class SimulateExecutionHandler(ExecutionHandler):
             if self.verbose:
                 print("Order Executed:", event.symbol, event.quantity, event.direction)
             fill_event = FillEvent(datetime.utcnow(), event.symbol, 'ARCA', event.quantity, event.direction, 0)
-            EventManager().put(fill_event)
+            self.put_event(fill_event)
+        elif event.type == EventType.ORDER_BATCH:
+            if self.verbose:
+                print("Order Batch Executed:", int(np.count_nonzero(event.quantities)), "orders")
+            fill_event = FillBatchEvent(datetime.utcnow(), event.symbols, 'ARCA', event.quantities,
+                                        np.zeros(len(event.quantities)))
+            self.put_event(fill_event)
@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from backtester.bars import BarStore
+from backtester.data import ArrayDataHandler
+from backtester.performance import calculate_metrics, format_summary_metrics
+from backtester.results import ResultReader, ResultWriter
+from backtester.sweep import parameter_grid, run_window
+from backtester.walkforward import store_fingerprint
+
+INDEX_FILE = 'index.sqlite'
+RUNS_DIR = 'runs'
+EQUITY_TABLE = 'equity'
+
+# 索引中可直接排序/筛选的指标列：列名 -> calculate_metrics 的指标名
+METRIC_COLUMNS = {
+    'total_return': 'Total Return',
+    'cagr': 'CAGR',
+    'volatility': 'Volatility',
+    'sharpe_ratio': 'Sharpe Ratio',
+    'sortino_ratio': 'Sortino Ratio',
+    'calmar_ratio': 'Calmar Ratio',
+    'max_drawdown': 'Max Drawdown',
+    'max_drawdown_pct': 'Max Drawdown %',
+    'drawdown_duration': 'Drawdown Duration',
+}
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    key TEXT PRIMARY KEY,
+    strategy TEXT NOT NULL,
+    params TEXT NOT NULL,
+    symbols TEXT NOT NULL,
+    start_date TEXT,
+    end_date TEXT,
+    initial_capital REAL NOT NULL,
+    data_version TEXT NOT NULL,
+    metrics TEXT NOT NULL,
+    {', '.join(f'{column} REAL' for column in METRIC_COLUMNS)},
+    size_bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS run_symbols (
+    key TEXT NOT NULL REFERENCES runs(key) ON DELETE CASCADE,
+    symbol TEXT NOT NULL,
+    PRIMARY KEY (key, symbol)
+);
+CREATE INDEX IF NOT EXISTS runs_strategy ON runs(strategy);
+CREATE INDEX IF NOT EXISTS runs_last_access ON runs(last_access);
+CREATE INDEX IF NOT EXISTS runs_sharpe ON runs(sharpe_ratio);
+CREATE INDEX IF NOT EXISTS run_symbols_symbol ON run_symbols(symbol);
+"""
+
+
+def strategy_name(strategy_cls) -> str:
+    return f"{strategy_cls.__module__}.{strategy_cls.__qualname__}"
+
+
+def _timestamp(value) -> Optional[str]:
+    return None if value is None else str(pd.Timestamp(value))
+
+
+def _number(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def run_key(strategy_cls, params: Dict, symbol_list: Sequence[str], start, end, initial_capital: float,
+            data_version: str, forward_fill: bool = True) -> str:
+    # 完整的运行配置 + 数据版本的哈希，同一配置在任何进程、任何 notebook 中得到同一个键
+    parts = [strategy_name(strategy_cls), json.dumps(params, sort_keys=True, default=repr), list(symbol_list),
+             _timestamp(start), _timestamp(end), repr(float(initial_capital)), data_version, bool(forward_fill)]
+    return hashlib.sha1(json.dumps(parts).encode()).hexdigest()
+
+
+@dataclass
+class Experiment:
+    key: str
+    metrics: Dict
+    # total/returns/equity_curve 列，按时间索引
+    equity_curve: pd.DataFrame
+    # True 表示结果来自实验库，没有重新回测
+    cached: bool
+
+    def summary_stats(self) -> pd.DataFrame:
+        return format_summary_metrics(self.metrics)
+
+
+# 按内容寻址的实验库：SQLite 索引记录每次运行的配置、指标和访问时间，净值曲线用 ResultWriter
+# 写成列式文件（<root>/runs/<key 前两位>/<key>/）。run 命中时直接返回保存的结果；
+# 超过 max_runs 或 max_bytes 时按最近最少使用的顺序淘汰
+class ExperimentStore:
+    def __init__(self, root: str, max_runs: Optional[int] = None, max_bytes: Optional[int] = None,
+                 format: str = 'auto'):
+        self.root = root
+        self.max_runs = max_runs
+        self.max_bytes = max_bytes
+        self.format = format
+        os.makedirs(os.path.join(root, RUNS_DIR), exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(root, INDEX_FILE))
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.executescript(_SCHEMA)
+        self._fingerprints: 'weakref.WeakKeyDictionary[BarStore, str]' = weakref.WeakKeyDictionary()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, RUNS_DIR, key[:2], key)
+
+    def data_version(self, data: ArrayDataHandler) -> str:
+        # 行情内容的指纹，同一个 BarStore 对象只计算一次；按对象弱引用缓存，
+        # 回收后的 BarStore 不会把指纹留给之后分配到同一 id 的新对象
+        store = data.store
+        version = self._fingerprints.get(store)
+        if version is None:
+            version = self._fingerprints[store] = store_fingerprint(store)
+        return version
+
+    def get(self, key: str) -> Optional[Experiment]:
+        row = self.connection.execute('SELECT metrics FROM runs WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        path = self._path(key)
+        if not os.path.isdir(path):
+            self.delete(key)
+            return None
+        with self.connection:
+            self.connection.execute('UPDATE runs SET last_access = ?, hits = hits + 1 WHERE key = ?',
+                                    (time.time(), key))
+        equity_curve = ResultReader(path).read(EQUITY_TABLE).set_index('datetime')
+        equity_curve.index = equity_curve.index.astype('datetime64[ns]')  # CSV 读回的时间精度与回测一致
+        return Experiment(key, json.loads(row[0]), equity_curve, cached=True)
+
+    def put(self, key: str, strategy_cls, params: Dict, symbol_list: Sequence[str], start, end,
+            initial_capital: float, data_version: str, metrics: Dict, equity_curve: pd.DataFrame) -> Experiment:
+        path = self._path(key)
+        shutil.rmtree(path, ignore_errors=True)
+        with ResultWriter(path, self.format) as writer:
+            frame = equity_curve[['total', 'returns', 'equity_curve']].rename_axis('datetime').reset_index()
+            writer.write_frame(EQUITY_TABLE, frame)
+        size = sum(os.path.getsize(os.path.join(directory, name))
+                   for directory, _, names in os.walk(path) for name in names)
+
+        values = calculate_metrics(equity_curve['equity_curve']).iloc[0]
+        now = time.time()
+        columns = ['key', 'strategy', 'params', 'symbols', 'start_date', 'end_date', 'initial_capital', 'data_version',
+                   'metrics', *METRIC_COLUMNS, 'size_bytes', 'created', 'last_access']
+        row = [key, strategy_name(strategy_cls), json.dumps(params, sort_keys=True, default=repr),
+               json.dumps(list(symbol_list)), _timestamp(start), _timestamp(end), float(initial_capital),
+               data_version, json.dumps({name: float(value) for name, value in metrics.items()}),
+               *(_number(values[name]) for name in METRIC_COLUMNS.values()), size, now, now]
+        with self.connection:
+            self.connection.execute(f"INSERT OR REPLACE INTO runs ({', '.join(columns)}) "
+                                    f"VALUES ({', '.join('?' * len(columns))})", row)
+            self.connection.executemany('INSERT OR IGNORE INTO run_symbols (key, symbol) VALUES (?, ?)',
+                                        [(key, symbol) for symbol in symbol_list])
+        self.evict(keep=key)
+        return Experiment(key, metrics, equity_curve[['total', 'returns', 'equity_curve']], cached=False)
+
+    def run(self, data: ArrayDataHandler, strategy_cls, params: Optional[Dict] = None, initial_capital: float = 1.0,
+            start=None, end=None, symbol_list: Optional[List[str]] = None,
+            data_version: Optional[str] = None) -> Experiment:
+        # 命中则直接返回；否则在 data 的行情上回测一次并存入实验库。start/end 缺省取 data 的回测区间，
+        # forward_fill 与 data 相同。data_version 缺省为行情内容的指纹，也可以传入自己的数据版本号以省去哈希
+        params = dict(params or {})
+        symbol_list = list(symbol_list if symbol_list is not None else data.symbol_list)
+        start = start if start is not None else data.start
+        end = end if end is not None else data.end
+        data_version = data_version if data_version is not None else self.data_version(data)
+        key = run_key(strategy_cls, params, symbol_list, start, end, initial_capital, data_version, data.forward_fill)
+        experiment = self.get(key)
+        if experiment is not None:
+            return experiment
+        metrics, equity_curve = run_window(data.store, symbol_list, strategy_cls, params, initial_capital, start, end,
+                                           forward_fill=data.forward_fill)
+        return self.put(key, strategy_cls, params, symbol_list, start, end, initial_capital, data_version,
+                        metrics, equity_curve)
+
+    def run_grid(self, data: ArrayDataHandler, strategy_cls, param_grid, **kwargs) -> pd.DataFrame:
+        # 参数网格中每组参数一行指标，已存过的组合不再回测
+        rows = []
+        for params in parameter_grid(param_grid):
+            experiment = self.run(data, strategy_cls, params, **kwargs)
+            rows.append(dict(params, **experiment.metrics, key=experiment.key, cached=experiment.cached))
+        return pd.DataFrame(rows)
+
+    def delete(self, key: str):
+        with self.connection:
+            self.connection.execute('DELETE FROM runs WHERE key = ?', (key,))
+        shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        # 按 last_access 从旧到新淘汰，直到运行数和磁盘占用都不超过上限；keep 为刚写入、不参与淘汰的键
+        if self.max_runs is None and self.max_bytes is None:
+            return 0
+        count, total = self.connection.execute('SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM runs').fetchone()
+        evicted = 0
+        rows = self.connection.execute('SELECT key, size_bytes FROM runs WHERE key != ? ORDER BY last_access',
+                                       (keep or '',)).fetchall()
+        for key, size in rows:
+            over_runs = self.max_runs is not None and count > self.max_runs
+            over_bytes = self.max_bytes is not None and total > self.max_bytes
+            if not over_runs and not over_bytes:
+                break
+            self.delete(key)
+            count -= 1
+            total -= size
+            evicted += 1
+        return evicted
+
+    def query(self, sql: str, parameters: Sequence = ()) -> pd.DataFrame:
+        # 直接在索引上执行 SQL，表为 runs 和 run_symbols
+        return pd.read_sql_query(sql, self.connection, params=tuple(parameters))
+
+    def runs(self, strategy_cls=None, symbol: Optional[str] = None) -> pd.DataFrame:
+        sql = 'SELECT runs.* FROM runs'
+        conditions, parameters = [], []
+        if symbol is not None:
+            sql += ' JOIN run_symbols USING (key)'
+            conditions.append('run_symbols.symbol = ?')
+            parameters.append(symbol)
+        if strategy_cls is not None:
+            conditions.append('runs.strategy = ?')
+            parameters.append(strategy_name(strategy_cls))
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        return self.query(sql + ' ORDER BY runs.created', parameters)
+
+    def best_per_symbol(self, metric: str = 'sharpe_ratio', strategy_cls=None,
+                        ascending: bool = False) -> pd.DataFrame:
+        # 每个品种在包含它的所有运行中按 metric 取最优的一次，如 best_per_symbol('sharpe_ratio')
+        if metric not in METRIC_COLUMNS:
+            raise ValueError(f"Unknown metric {metric!r}, expected one of {list(METRIC_COLUMNS)}")
+        where, parameters = '', []
+        if strategy_cls is not None:
+            where, parameters = 'WHERE runs.strategy = ?', [strategy_name(strategy_cls)]
+        order = 'ASC' if ascending else 'DESC'
+        sql = f"""
+            SELECT symbol, key, strategy, params, start_date, end_date, {metric} FROM (
+                SELECT run_symbols.symbol, runs.*,
+                       ROW_NUMBER() OVER (PARTITION BY run_symbols.symbol
+                                          ORDER BY runs.{metric} IS NULL, runs.{metric} {order}) AS rank
+                FROM runs JOIN run_symbols USING (key) {where}
+            ) WHERE rank = 1 ORDER BY symbol"""
+        return self.query(sql, parameters).set_index('symbol')
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        return self.connection.execute('SELECT 1 FROM runs WHERE key = ?', (key,)).fetchone() is not None
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
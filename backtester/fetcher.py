@@ -0,0 +1,109 @@
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+BAR_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def empty_bars() -> pd.DataFrame:
+    data = pd.DataFrame({field: pd.Series(dtype='float64') for field in BAR_FIELDS})
+    data.index = pd.DatetimeIndex([], name='date')
+    return data
+
+
+def normalize_bars(data: pd.DataFrame) -> pd.DataFrame:
+    # 统一为 date 索引 + open/high/low/close/volume 的 float64 列
+    if data.empty:
+        return empty_bars()
+    data = data[BAR_FIELDS].astype('float64')
+    data.index = pd.DatetimeIndex(pd.to_datetime(data.index), name='date')
+    data = data[~data.index.duplicated(keep='last')]
+    return data.sort_index()
+
+
+class Fetcher(ABC):
+    @abstractmethod
+    def fetch(self, symbol: str, start_date: str, end_date: str, adjust: str = "hfq") -> pd.DataFrame:
+        pass
+
+
+class AKShareFetcher(Fetcher):
+    columns = {'日期': 'date', '开盘': 'open', '最高': 'high', '最低': 'low', '收盘': 'close', '成交量': 'volume'}
+
+    def fetch(self, symbol: str, start_date: str, end_date: str, adjust: str = "hfq") -> pd.DataFrame:
+        import akshare as ak  # 只在真正从 AKShare 取数时导入，避免拖慢 import backtester
+
+        data = ak.stock_zh_a_hist(symbol=symbol, start_date=start_date, end_date=end_date, adjust=adjust)
+        if data is None or data.empty:
+            return empty_bars()
+        data = data.rename(columns=self.columns)
+        data.set_index(keys='date', inplace=True)
+        return normalize_bars(data)
+
+
+# 指数日线（如 sh000001 上证指数、sz399300 沪深300）。接口一次返回全部历史，这里再按区间截取；
+# 指数没有复权，adjust 被忽略
+class AKShareIndexFetcher(Fetcher):
+    def fetch(self, symbol: str, start_date: str, end_date: str, adjust: str = "") -> pd.DataFrame:
+        import akshare as ak
+
+        data = ak.stock_zh_index_daily(symbol=symbol)
+        if data is None or data.empty:
+            return empty_bars()
+        data = data.set_index(keys='date')
+        data = normalize_bars(data)
+        return data.loc[pd.Timestamp(start_date):pd.Timestamp(end_date)]
+
+
+class LocalFetcher(Fetcher):
+    # 本地替身数据源，用于离线测试；calls 记录每次请求的区间，
+    # latency 模拟网络延迟（秒），failures 指定每个品种前几次请求抛出 ConnectionError
+    def __init__(self, frames: Dict[str, pd.DataFrame], latency: float = 0.0,
+                 failures: Optional[Dict[str, int]] = None):
+        self.frames = {symbol: normalize_bars(frame) for symbol, frame in frames.items()}
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.calls: List[Tuple[str, str, str, str]] = []
+
+    def fetch(self, symbol: str, start_date: str, end_date: str, adjust: str = "hfq") -> pd.DataFrame:
+        self.calls.append((symbol, start_date, end_date, adjust))
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failures.get(symbol, 0) > 0:
+            self.failures[symbol] -= 1
+            raise ConnectionError(f"Simulated failure fetching {symbol}")
+        if symbol not in self.frames:
+            return empty_bars()
+        data = self.frames[symbol]
+        return data.loc[pd.Timestamp(start_date):pd.Timestamp(end_date)]
+
+
+def fetch_with_retry(load: Callable[[str], pd.DataFrame], symbol: str, retries: int = 3,
+                     backoff: float = 0.5) -> pd.DataFrame:
+    # 失败后按 backoff, 2 * backoff, 4 * backoff ... 秒退避重试，最多再试 retries 次
+    for attempt in range(retries + 1):
+        try:
+            return load(symbol)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def fetch_all(load: Callable[[str], pd.DataFrame], symbol_list: List[str], max_workers: int = 8,
+              retries: int = 3, backoff: float = 0.5) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Exception]]:
+    # 用有界线程池并发下载，单个品种失败不会中断其他品种，返回 (成功的数据, 失败原因)
+    frames: Dict[str, pd.DataFrame] = {}
+    failures: Dict[str, Exception] = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {symbol: executor.submit(fetch_with_retry, load, symbol, retries, backoff)
+                   for symbol in symbol_list}
+        for symbol, future in futures.items():
+            try:
+                frames[symbol] = future.result()
+            except Exception as e:
+                failures[symbol] = e
+    return frames, failures
@@ -0,0 +1,234 @@
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+
+# 定长环形缓冲区，append 返回被挤出的旧值（未满时返回 None）
+class RingBuffer:
+    def __init__(self, size: int):
+        self.size = size
+        self._values = np.full(size, np.nan)
+        self._head = 0
+        self._count = 0
+
+    def append(self, value: float) -> Optional[float]:
+        evicted = self._values[self._head] if self._count == self.size else None
+        self._values[self._head] = value
+        self._head = (self._head + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+        return evicted
+
+    def __getitem__(self, i: int) -> float:
+        # 0 为最早的值，-1 为最新的值
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("RingBuffer index out of range")
+        return self._values[(self._head - self._count + i) % self.size]
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        return self._count == self.size
+
+    def to_array(self) -> np.ndarray:
+        return np.roll(self._values, -self._head)[self.size - self._count:]
+
+
+# 流式指标：每根K线 O(1) 更新。source 为另一个指标时，先更新 source 再以其输出作为输入
+class Indicator(ABC):
+    def __init__(self, field: str = 'close', source: Optional['Indicator'] = None):
+        self.field = field
+        self.source = source
+        self.value = np.nan
+
+    def on_bar(self, bar) -> float:
+        value = self.source.on_bar(bar) if self.source is not None else bar[self.field]
+        return self.update(value)
+
+    @abstractmethod
+    def update(self, value: float) -> float:
+        pass
+
+
+class EMA(Indicator):
+    # 与 pandas ewm(span=period, min_periods=period, adjust=False).mean() 一致
+    def __init__(self, period: int, min_periods: Optional[int] = None, field: str = 'close', source=None):
+        super().__init__(field, source)
+        self.period = period
+        self.min_periods = period if min_periods is None else min_periods
+        self.alpha = 2.0 / (period + 1.0)
+        self._ema = np.nan
+        self._count = 0
+
+    def update(self, value: float) -> float:
+        if not math.isnan(value):
+            self._ema = value if self._count == 0 else self.alpha * value + (1.0 - self.alpha) * self._ema
+            self._count += 1
+        self.value = self._ema if self._count >= self.min_periods else np.nan
+        return self.value
+
+
+class RollingMean(Indicator):
+    # 与 pandas rolling(window, min_periods).mean() 一致，窗口内的 NaN 不计数
+    def __init__(self, window: int, min_periods: Optional[int] = None, field: str = 'close', source=None):
+        super().__init__(field, source)
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self._buffer = RingBuffer(window)
+        self._sum = 0.0
+        self._count = 0
+
+    def update(self, value: float) -> float:
+        evicted = self._buffer.append(value)
+        if evicted is not None and not math.isnan(evicted):
+            self._sum -= evicted
+            self._count -= 1
+        if not math.isnan(value):
+            self._sum += value
+            self._count += 1
+        self.value = self._sum / self._count if self._count >= max(self.min_periods, 1) else np.nan
+        return self.value
+
+
+SMA = RollingMean
+
+
+class RollingStd(Indicator):
+    # 增删样本的 Welford 更新，与 pandas rolling(window, min_periods).std(ddof) 一致
+    def __init__(self, window: int, min_periods: Optional[int] = None, ddof: int = 1, field: str = 'close',
+                 source=None):
+        super().__init__(field, source)
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.ddof = ddof
+        self._buffer = RingBuffer(window)
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._count = 0
+
+    def _add(self, x: float):
+        self._count += 1
+        delta = x - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (x - self._mean)
+
+    def _remove(self, x: float):
+        if self._count == 1:
+            self._count, self._mean, self._m2 = 0, 0.0, 0.0
+            return
+        delta = x - self._mean
+        self._count -= 1
+        self._mean -= delta / self._count
+        self._m2 = max(self._m2 - delta * (x - self._mean), 0.0)
+
+    def update(self, value: float) -> float:
+        evicted = self._buffer.append(value)
+        if evicted is not None and not math.isnan(evicted):
+            self._remove(evicted)
+        if not math.isnan(value):
+            self._add(value)
+        if self._count >= max(self.min_periods, 1) and self._count > self.ddof:
+            self.value = math.sqrt(self._m2 / (self._count - self.ddof))
+        else:
+            self.value = np.nan
+        return self.value
+
+
+class _RollingExtreme(Indicator):
+    # 单调队列，均摊 O(1)
+    def __init__(self, window: int, min_periods: Optional[int] = None, field: str = 'close', source=None):
+        super().__init__(field, source)
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self._deque = deque()
+        self._valid = RingBuffer(window)
+        self._count = 0
+        self._t = 0
+
+    @staticmethod
+    @abstractmethod
+    def _dominates(new: float, old: float) -> bool:
+        pass
+
+    def update(self, value: float) -> float:
+        evicted = self._valid.append(0.0 if math.isnan(value) else 1.0)
+        if evicted is not None:
+            self._count -= int(evicted)
+        if not math.isnan(value):
+            self._count += 1
+            while self._deque and self._dominates(value, self._deque[-1][1]):
+                self._deque.pop()
+            self._deque.append((self._t, value))
+        while self._deque and self._deque[0][0] <= self._t - self.window:
+            self._deque.popleft()
+        self._t += 1
+        self.value = self._deque[0][1] if self._deque and self._count >= max(self.min_periods, 1) else np.nan
+        return self.value
+
+
+class RollingMin(_RollingExtreme):
+    @staticmethod
+    def _dominates(new: float, old: float) -> bool:
+        return new <= old
+
+
+class RollingMax(_RollingExtreme):
+    @staticmethod
+    def _dominates(new: float, old: float) -> bool:
+        return new >= old
+
+
+class Returns(Indicator):
+    # 与 pandas pct_change(periods) 一致
+    def __init__(self, period: int = 1, field: str = 'close', source=None):
+        super().__init__(field, source)
+        self.period = period
+        self._buffer = RingBuffer(period + 1)
+
+    def update(self, value: float) -> float:
+        self._buffer.append(value)
+        if self._buffer.full:
+            self.value = value / self._buffer[0] - 1.0
+        else:
+            self.value = np.nan
+        return self.value
+
+
+class ATR(Indicator):
+    # Wilder 平均真实波幅：前 period 根真实波幅取均值，之后按 (prev * (n - 1) + tr) / n 平滑
+    def __init__(self, period: int = 14):
+        super().__init__(field='close')
+        self.period = period
+        self._previous_close = np.nan
+        self._atr = np.nan
+        self._tr_sum = 0.0
+        self._count = 0
+
+    def on_bar(self, bar) -> float:
+        return self.update_ohlc(bar['high'], bar['low'], bar['close'])
+
+    def update(self, value: float) -> float:
+        return self.update_ohlc(value, value, value)
+
+    def update_ohlc(self, high: float, low: float, close: float) -> float:
+        if math.isnan(self._previous_close):
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self._previous_close), abs(low - self._previous_close))
+        self._previous_close = close
+        self._count += 1
+
+        if self._count < self.period:
+            self._tr_sum += true_range
+        elif self._count == self.period:
+            self._atr = (self._tr_sum + true_range) / self.period
+        else:
+            self._atr = (self._atr * (self.period - 1) + true_range) / self.period
+        self.value = self._atr
+        return self.value
@@ -0,0 +1,177 @@
+import cProfile
+import pstats
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtester.event_manager import EventBus
+
+PERCENTILES = (50, 90, 99)
+
+
+def _component_name(handler) -> str:
+    owner = getattr(handler, '__self__', None)
+    name = getattr(handler, '__name__', repr(handler))
+    return f"{type(owner).__name__}.{name}" if owner is not None else name
+
+
+def summarize_latencies(samples: Dict[str, np.ndarray]) -> pd.DataFrame:
+    # 每组耗时样本（秒）一行：count, total, mean, p50, p90, p99, max
+    rows = {}
+    for name, values in samples.items():
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            continue
+        row = {'count': len(values), 'total': values.sum(), 'mean': values.mean()}
+        for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            row[f'p{q}'] = value
+        row['max'] = values.max()
+        rows[name] = row
+    return pd.DataFrame.from_dict(
+        rows, orient='index', columns=['count', 'total', 'mean'] + [f'p{q}' for q in PERCENTILES] + ['max'])
+
+
+# 记录每个事件的处理耗时、每个处理函数的累计耗时和每根K线内的最大队列深度。
+# 只有传入 Instrumentation 时引擎才会使用它，普通回测仍走 EventBus.dispatch 的原始循环
+class InstrumentedEventBus(EventBus):
+    def __init__(self):
+        super().__init__()
+        self.latencies = defaultdict(list)
+        self.component_times = defaultdict(int)
+        self.component_calls = defaultdict(int)
+        self.depths = []
+
+    def dispatch(self):
+        events = self._events
+        handlers = self._handlers
+        latencies = self.latencies
+        component_times = self.component_times
+        component_calls = self.component_calls
+        clock = time.perf_counter_ns
+        max_depth = len(events)
+        while events:
+            event = events.popleft()
+            if event is None:
+                continue
+            start = clock()
+            for handler in handlers.get(event.type, ()):
+                handler_start = clock()
+                handler(event)
+                component_times[handler] += clock() - handler_start
+                component_calls[handler] += 1
+            latencies[event.type].append(clock() - start)
+            if len(events) > max_depth:
+                max_depth = len(events)
+        self.depths.append(max_depth)
+
+
+@dataclass
+class InstrumentationReport:
+    bars: int
+    wall_time: float
+    feed_time: float
+    event_counts: Dict[str, int]
+    # 按事件类型：count, total, mean, p50, p90, p99, max（秒）
+    event_latency: pd.DataFrame
+    # 按组件（处理函数）：calls, total, mean（秒）及占回测总耗时的比例 share
+    component_timings: pd.DataFrame
+    # 每根K线分发过程中的最大队列深度
+    queue_depth: np.ndarray
+    profiler: Any = None
+
+    def profile_stats(self, sort: str = 'cumulative') -> Optional[pstats.Stats]:
+        if not isinstance(self.profiler, cProfile.Profile):
+            return None
+        return pstats.Stats(self.profiler).sort_stats(sort)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'bars': self.bars,
+            'wall_time': self.wall_time,
+            'bars_per_sec': self.bars / self.wall_time if self.wall_time > 0 else None,
+            'feed_time': self.feed_time,
+            'event_counts': dict(self.event_counts),
+            'event_latency': self.event_latency.to_dict(orient='index'),
+            'component_timings': self.component_timings.to_dict(orient='index'),
+            'queue_depth': {'max': int(self.queue_depth.max()) if len(self.queue_depth) else 0,
+                            'mean': float(self.queue_depth.mean()) if len(self.queue_depth) else 0.0},
+        }
+
+    def __str__(self):
+        return (f"{self.bars} bars in {self.wall_time:.3f}s (data feed {self.feed_time:.3f}s)\n"
+                f"Event latency:\n{self.event_latency.to_string()}\n"
+                f"Component timings:\n{self.component_timings.to_string()}")
+
+
+# 回测引擎的可选插桩：统计事件数量与延迟分位数、队列深度、各组件耗时，
+# 并可在 profile_bars=(start, stop) 指定的K线区间 [start, stop) 内挂载性能分析器。
+# profiler 为返回分析器对象的工厂，对象需提供 enable/disable 或 start/stop 方法（如 cProfile、pyinstrument）
+class Instrumentation:
+    def __init__(self, profile_bars: Optional[Tuple[int, int]] = None,
+                 profiler: Callable[[], Any] = cProfile.Profile):
+        self.profile_bars = profile_bars
+        self.profiler_factory = profiler
+        self.events = InstrumentedEventBus()
+        self.profiler = None
+        self.report: Optional[InstrumentationReport] = None
+        self.bars = 0
+        self.feed_time = 0
+        self._profiling = False
+        self._start = None
+
+    def start(self):
+        self._start = time.perf_counter()
+
+    def update_data(self, data):
+        # 记录数据推进耗时，并在进入/离开分析区间时开关分析器
+        if self.profile_bars is not None:
+            if self.bars == self.profile_bars[0] and not self._profiling:
+                self._toggle_profiler(True)
+            elif self.bars == self.profile_bars[1] and self._profiling:
+                self._toggle_profiler(False)
+        start = time.perf_counter_ns()
+        data.update_latest_data()
+        self.feed_time += time.perf_counter_ns() - start
+        if data.continue_backtest:
+            self.bars += 1
+
+    def _toggle_profiler(self, enable: bool):
+        if enable:
+            if self.profiler is None:
+                self.profiler = self.profiler_factory()
+            (getattr(self.profiler, 'enable', None) or self.profiler.start)()
+        else:
+            (getattr(self.profiler, 'disable', None) or self.profiler.stop)()
+        self._profiling = enable
+
+    def finish(self) -> InstrumentationReport:
+        if self._profiling:
+            self._toggle_profiler(False)
+        wall_time = time.perf_counter() - self._start
+        events = self.events
+
+        event_latency = summarize_latencies({event_type.name: np.asarray(samples, dtype=np.float64) / 1e9
+                                             for event_type, samples in events.latencies.items()})
+
+        rows = {'DataHandler.update_latest_data': {'calls': self.bars + 1, 'total': self.feed_time / 1e9}}
+        for handler, total in events.component_times.items():
+            rows[_component_name(handler)] = {'calls': events.component_calls[handler], 'total': total / 1e9}
+        component_timings = pd.DataFrame.from_dict(rows, orient='index')
+        component_timings['mean'] = component_timings['total'] / component_timings['calls']
+        component_timings['share'] = component_timings['total'] / wall_time if wall_time > 0 else np.nan
+
+        self.report = InstrumentationReport(
+            bars=self.bars,
+            wall_time=wall_time,
+            feed_time=self.feed_time / 1e9,
+            event_counts={name: int(row['count']) for name, row in event_latency.iterrows()},
+            event_latency=event_latency,
+            component_timings=component_timings,
+            queue_depth=np.asarray(events.depths, dtype=np.int64),
+            profiler=self.profiler,
+        )
+        return self.report
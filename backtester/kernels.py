@@ -0,0 +1,102 @@
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+# 路径相关策略（移动止损等）的逐K线内核。内核是只使用标量运算和 NumPy 数组的普通函数：
+#
+#     kernel(t, close, previous, cash, position, state, params, orders)
+#
+#   close     当根各品种的最新收盘价（停牌沿用最后一根，还没有K线时为 NaN）
+#   previous  各品种上一根自身K线的收盘价，与 get_latest_data(symbol, num=2)[0] 一致，没有时为 NaN
+#   cash      当根成交前的现金；position 为成交前的持仓，只读
+#   state     (品种 x k) 的 float64 策略状态，原地修改；params 为 float64 参数数组
+#   orders    输出：按品种写入带方向的下单股数，0 为不下单，以当根收盘价成交
+#
+# 引擎循环与内核一起在 numba 可用时编译为机器码，不可用时以纯 Python 运行，两者结果相同。
+# numba 只在第一次需要编译时导入
+
+_COMPILED: Dict[Callable, Callable] = {}
+
+
+def numba_available() -> bool:
+    try:
+        import numba  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compile_kernel(function: Callable, jit: Optional[bool] = None) -> Callable:
+    # jit=None：numba 可用时编译，否则原样返回；jit=True：必须编译；jit=False：不编译
+    if jit is False:
+        return function
+    compiled = _COMPILED.get(function)
+    if compiled is None:
+        try:
+            import numba
+        except ImportError:
+            if jit:
+                raise ImportError("The compiled kernel path requires numba") from None
+            return function
+        compiled = _COMPILED[function] = numba.njit(nogil=True)(function)
+    return compiled
+
+
+def kernel_inputs(data, field: str = 'close'):
+    # (时间戳, close, previous)，按并集日历对齐，含义见文件开头
+    dates, raw = data.get_field_matrix(field, forward_fill=False)
+    n_bars, n_symbols = raw.shape
+    has_bar = ~np.isnan(raw)
+    rows = np.arange(n_bars)[:, None]
+    columns = np.arange(n_symbols)
+    last = np.maximum.accumulate(np.where(has_bar, rows, -1), axis=0)  # 各品种最近一根K线所在的行
+    started = last >= 0
+    close = np.where(started, raw[np.maximum(last, 0), columns], np.nan)
+    before = np.vstack([np.full((1, n_symbols), np.nan), close[:-1]])
+    own_previous = np.where(has_bar, before, np.nan)
+    previous = np.where(started, own_previous[np.maximum(last, 0), columns], np.nan)
+    return dates, close, previous
+
+
+def _kernel_loop(kernel, close, previous, state, params, initial_capital, zero_cost_fills,
+                 positions, cash, commission):
+    # 与事件引擎逐K线的顺序一致：先按成交前的持仓和现金记账，再运行内核，最后按品种顺序以收盘价成交
+    n_bars, n_symbols = close.shape
+    position = np.zeros(n_symbols)
+    orders = np.zeros(n_symbols)
+    current_cash = initial_capital
+    paid = 0.0
+    for t in range(n_bars):
+        positions[t] = position
+        cash[t] = current_cash
+        commission[t] = paid
+        orders[:] = 0.0
+        kernel(t, close[t], previous[t], current_cash, position, state, params, orders)
+        for j in range(n_symbols):
+            quantity = orders[j]
+            price = close[t, j]
+            if quantity == 0.0 or np.isnan(price):
+                continue
+            fee = 0.0
+            if not zero_cost_fills:
+                # 与 FillEvent.calculate_ib_commission 相同，写在循环内以便整体编译
+                size = abs(quantity)
+                fee = min(max(1.3, (0.013 if size <= 500 else 0.008) * size), 0.005 * size * price)
+            position[j] += quantity
+            current_cash -= price * quantity + fee
+            paid += fee
+
+
+def run_kernel(kernel: Callable, close: np.ndarray, previous: np.ndarray, state: np.ndarray, params: np.ndarray,
+               initial_capital: float = 1.0, zero_cost_fills: bool = True, jit: Optional[bool] = None):
+    # 返回每根K线成交前的 (持仓矩阵, 现金, 累计佣金)；state 被原地更新为最后一根K线之后的状态
+    n_bars, n_symbols = close.shape
+    positions = np.zeros((n_bars, n_symbols))
+    cash = np.zeros(n_bars)
+    commission = np.zeros(n_bars)
+    compiled = compile_kernel(kernel, jit)
+    loop = _kernel_loop if compiled is kernel else compile_kernel(_kernel_loop, True)
+    loop(compiled, np.ascontiguousarray(close, dtype=np.float64), np.ascontiguousarray(previous, dtype=np.float64),
+         state, np.asarray(params, dtype=np.float64), float(initial_capital), bool(zero_cost_fills),
+         positions, cash, commission)
+    return positions, cash, commission
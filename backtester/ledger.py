@@ -0,0 +1,115 @@
+from collections.abc import MutableMapping
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+HOLDINGS_COLUMNS = ['cash', 'commission', 'total', 'returns', 'equity_curve']
+
+
+# 以品种名访问一维数组的字典视图，写入直接落到数组上
+class SymbolArray(MutableMapping):
+    def __init__(self, symbols: List[str], values: np.ndarray):
+        self._index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.values = values
+
+    def __getitem__(self, symbol):
+        return self.values[self._index[symbol]]
+
+    def __setitem__(self, symbol, value):
+        self.values[self._index[symbol]] = value
+
+    def __delitem__(self, symbol):
+        raise TypeError("SymbolArray does not support deleting symbols")
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __repr__(self):
+        return f"SymbolArray({dict(self)})"
+
+
+# 按块预分配的 (时间 x 品种) 账本：每根K线按行号写入一行持仓与市值，
+# holdings 矩阵的列依次为各品种市值和 HOLDINGS_COLUMNS，可直接零拷贝包装成 DataFrame
+class Ledger:
+    def __init__(self, symbols: List[str], chunk_size: int = 4096):
+        self.symbols = list(symbols)
+        self.chunk_size = chunk_size
+        self.size = 0
+        n = len(self.symbols)
+        self.timestamps = np.empty(chunk_size, dtype=np.int64)
+        self.positions = np.empty((chunk_size, n))
+        self.holdings = np.empty((chunk_size, n + len(HOLDINGS_COLUMNS)))
+        self._cash = n
+        self._commission = n + 1
+        self._total = n + 2
+
+    def _grow(self, rows: int = 0):
+        # 按几何级数扩容（至少一个 chunk_size、至少容纳 rows 行），逐行追加的总拷贝量与行数成线性关系；
+        # 只拷贝已写入的行
+        capacity = max(2 * len(self.timestamps), len(self.timestamps) + self.chunk_size, rows)
+        arrays = []
+        for values in (self.timestamps, self.positions, self.holdings):
+            grown = np.empty((capacity,) + values.shape[1:], dtype=values.dtype)
+            grown[:self.size] = values[:self.size]
+            arrays.append(grown)
+        self.timestamps, self.positions, self.holdings = arrays
+
+    def append(self, timestamp, positions: np.ndarray, prices: np.ndarray, cash: float, commission: float):
+        if self.size == len(self.timestamps):
+            self._grow()
+        row = self.size
+        n = len(self.symbols)
+        self.timestamps[row] = pd.Timestamp(timestamp).value
+        self.positions[row] = positions
+        market_value = self.holdings[row, :n]
+        np.multiply(positions, prices, out=market_value)
+        market_value[np.isnan(market_value)] = 0.0
+        self.holdings[row, self._cash] = cash
+        self.holdings[row, self._commission] = commission
+        self.holdings[row, self._total] = cash + market_value.sum()
+        self.size += 1
+
+    def load(self, timestamps: np.ndarray, positions: np.ndarray, holdings: np.ndarray):
+        # 用已保存的行恢复账本（断点续跑）
+        size = len(timestamps)
+        if len(self.timestamps) < size:
+            self._grow(size)
+        self.timestamps[:size] = timestamps
+        self.positions[:size] = positions
+        self.holdings[:size] = holdings
+        self.size = size
+
+    def clear(self):
+        # 已写出的行不再保留在内存中（流式输出），容量不变
+        self.size = 0
+
+    def _index(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.timestamps[:self.size].view('M8[ns]'), name='datetime')
+
+    def positions_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.positions[:self.size], index=self._index(), columns=self.symbols, copy=False)
+
+    def totals_dataframe(self) -> pd.DataFrame:
+        totals = self.holdings[:self.size, self._cash:self._total + 1]
+        return pd.DataFrame(totals, index=self._index(), columns=HOLDINGS_COLUMNS[:3], copy=False)
+
+    def equity_curve(self) -> pd.DataFrame:
+        holdings = self.holdings[:self.size]
+        total = holdings[:, self._total]
+        returns = holdings[:, self._total + 1]
+        equity_curve = holdings[:, self._total + 2]
+        if self.size:
+            returns[0] = np.nan
+            with np.errstate(divide='ignore', invalid='ignore'):
+                np.divide(total[1:], total[:-1], out=returns[1:])
+            returns[1:] -= 1.0
+            # 与 (1 + returns).cumprod() 一致：跳过 NaN 继续累乘
+            growth = 1.0 + returns
+            missing = np.isnan(growth)
+            np.cumprod(np.where(missing, 1.0, growth), out=equity_curve)
+            equity_curve[missing] = np.nan
+        return pd.DataFrame(holdings, index=self._index(), columns=self.symbols + HOLDINGS_COLUMNS, copy=False)
@@ -0,0 +1,345 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from backtester.bars import TIME_FIELD, BarStore
+from backtester.core import connect_components
+from backtester.data import ArrayDataHandler
+from backtester.event import EventType, MarketEvent
+from backtester.event_manager import EventBus
+from backtester.execution import ExecutionHandler
+from backtester.fetcher import BAR_FIELDS
+from backtester.instrumentation import summarize_latencies
+from backtester.portfolio import Portfolio
+from backtester.strategy import Strategy
+
+
+# 一个时间戳上到达的K线：bars 为 {品种: {字段: 值}}，只包含这一时刻有新K线的品种
+@dataclass(frozen=True, slots=True)
+class BarUpdate:
+    datetime: pd.Timestamp
+    bars: Dict[str, Dict[str, float]]
+
+
+# 实盘/模拟盘的数据处理类：K线由推送源逐根写入，接口与 ArrayDataHandler 相同，策略和组合无需修改。
+# 每个品种在存储中占一段定长区块，写满时整体换成容量翻倍的新存储（旧的 BarWindow/快照仍指向旧数组）；
+# 给定 max_history 时换存储只保留每个品种最近 max_history 根K线，长时间运行内存有界。
+# update_latest_data 依次推送 append 进来的K线，队列为空时结束，因此也可以直接交给 backtest 运行
+class LiveDataHandler(ArrayDataHandler):
+    def __init__(self, symbol_list: List[str], fields: Optional[Sequence[str]] = None, forward_fill: bool = True,
+                 capacity: int = 1024, max_history: Optional[int] = None):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.symbol_list = list(symbol_list)
+        self.fields = list(fields) if fields is not None else list(BAR_FIELDS)
+        self.forward_fill = forward_fill
+        self.max_history = max_history
+
+        self.time_col = "date"
+        self.price_col = "close"
+
+        self._symbol_index = {symbol: i for i, symbol in enumerate(self.symbol_list)}
+        self._capacity = capacity
+        self.store = self._allocate(capacity)
+        self._start = np.arange(len(self.symbol_list), dtype=np.int64) * capacity
+        self._limit = self._start + capacity  # 每个品种区块的末尾（不含）
+        self._cursors = self._start.copy()
+        self._end = self._cursors  # 已写入数据的结束行，与游标相同
+        self._calendar = np.empty(capacity, dtype=np.int64)
+        self.calendar = self._calendar[:0]
+        self._time_index = 0
+        self._continue_backtest = True
+        self.indicators = {symbol: {} for symbol in self.symbol_list}
+        self.pending = deque()
+
+    def _allocate(self, capacity: int) -> BarStore:
+        n = len(self.symbol_list)
+        columns = {TIME_FIELD: np.zeros(n * capacity, dtype=np.int64)}
+        for field in self.fields:
+            columns[field] = np.full(n * capacity, np.nan)
+        return BarStore(self.symbol_list, columns, np.arange(n + 1, dtype=np.int64) * capacity)
+
+    def _grow(self):
+        counts = self._cursors - self._start
+        if self.max_history is None:
+            keep, capacity = counts, self._capacity * 2
+        else:
+            keep, capacity = np.minimum(counts, self.max_history), max(self._capacity, 2 * self.max_history)
+        store = self._allocate(capacity)
+        start = np.arange(len(self.symbol_list), dtype=np.int64) * capacity
+        for i, (hi, n) in enumerate(zip(self._cursors.tolist(), keep.tolist())):
+            for name, column in self.store.columns.items():
+                store.columns[name][start[i]:start[i] + n] = column[hi - n:hi]
+        self.store = store
+        self._capacity = capacity
+        self._start = start
+        self._limit = start + capacity
+        self._cursors = start + keep
+        self._end = self._cursors
+
+    def append(self, update: BarUpdate):
+        self.pending.append(update)
+
+    def push(self, update: BarUpdate):
+        # 写入一个时间戳的K线，更新指标并推送 MarketEvent
+        timestamp = pd.Timestamp(update.datetime).value
+        if self._time_index and timestamp <= self.calendar[-1]:
+            raise ValueError(f"Bars must arrive in increasing time order, got {update.datetime}")
+        advanced = []
+        for symbol, bar in update.bars.items():
+            i = self._symbol_index.get(symbol)
+            if i is None:
+                continue
+            if self._cursors[i] == self._limit[i]:
+                self._grow()
+            row = int(self._cursors[i])
+            columns = self.store.columns
+            columns[TIME_FIELD][row] = timestamp
+            for field in self.fields:
+                columns[field][row] = bar.get(field, np.nan)
+            self._cursors[i] += 1
+            advanced.append(i)
+
+        if self._time_index == len(self._calendar):
+            self._calendar = np.resize(self._calendar, 2 * len(self._calendar))
+        self._calendar[self._time_index] = timestamp
+        self._time_index += 1
+        self.calendar = self._calendar[:self._time_index]
+        advanced = np.asarray(advanced, dtype=np.int64)
+        self._update_indicators(advanced)
+        self.put_event(MarketEvent(self.get_latest_datetime(), self.get_snapshot(advanced)))
+
+    def update_latest_data(self):
+        if not self.pending:
+            self._continue_backtest = False
+            return
+        self.push(self.pending.popleft())
+
+
+def replay_updates(data: ArrayDataHandler, fields: Optional[Sequence[str]] = None):
+    # 把已加载的K线按并集日历转换成 BarUpdate 序列，用于模拟推送源和回放
+    store = data.store
+    fields = list(fields) if fields is not None else [field for field in store.fields if field != TIME_FIELD]
+    columns = [store.columns[field] for field in fields]
+    for timestamp, advanced, rows in data.iter_rows():
+        bars = {}
+        for i, row in zip(advanced.tolist(), rows.tolist()):
+            bars[data.symbol_list[i]] = {field: float(column[row]) for field, column in zip(fields, columns)}
+        yield BarUpdate(pd.Timestamp(timestamp), bars)
+
+
+# 异步行情源：run(emit) 持续推送 BarUpdate，返回即表示行情结束。
+# 运行时每处理完一根K线（包括由它引发的下单）后调用 done，回放源可以借此与运行时同步节奏
+class AsyncFeed(ABC):
+    @abstractmethod
+    async def run(self, emit: Callable[[BarUpdate], None]):
+        pass
+
+    async def done(self, update: BarUpdate):
+        pass
+
+    async def close(self):
+        pass
+
+
+def _replay_delay(previous: Optional[int], timestamp: int, interval: float, speed: Optional[float]) -> float:
+    if speed is not None:
+        return 0.0 if previous is None else (timestamp - previous) / 1e9 / speed
+    return interval
+
+
+# 本地模拟行情：按日历回放已加载的K线。interval 为每根K线之间的固定间隔（秒），
+# speed 给出时改为按真实时间间隔除以 speed 等待（如 speed=3600 把一小时压缩成一秒）；
+# lockstep=True 时等运行时处理完上一根K线再推送下一根，结果与回测一致
+class ReplayFeed(AsyncFeed):
+    def __init__(self, data: ArrayDataHandler, interval: float = 0.0, speed: Optional[float] = None,
+                 lockstep: bool = True, fields: Optional[Sequence[str]] = None):
+        self.data = data
+        self.interval = interval
+        self.speed = speed
+        self.lockstep = lockstep
+        self.fields = fields
+        self._processed = asyncio.Event()
+
+    async def run(self, emit: Callable[[BarUpdate], None]):
+        previous = None
+        for update in replay_updates(self.data, self.fields):
+            timestamp = update.datetime.value
+            delay = _replay_delay(previous, timestamp, self.interval, self.speed)
+            previous = timestamp
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._processed.clear()
+            emit(update)
+            if self.lockstep:
+                await self._processed.wait()
+            elif delay <= 0:
+                await asyncio.sleep(0)
+
+    async def done(self, update: BarUpdate):
+        self._processed.set()
+
+
+# 异步执行端：下单在 execute_order 中同步发出（只写缓冲区，不等待回报），
+# 回报由 start 时传入的 submit 交给运行时，在事件循环中与行情按到达顺序处理
+class AsyncExecutionHandler(ExecutionHandler):
+    async def start(self, submit: Callable[[object], None]):
+        pass
+
+    async def stop(self):
+        pass
+
+    @property
+    def pending(self) -> int:
+        # 已发出但尚未得到确认的订单数，运行时结束前会等待其归零
+        return 0
+
+    def latencies(self) -> Dict[str, np.ndarray]:
+        return {}
+
+
+@dataclass
+class LatencyReport:
+    bars: int
+    orders: int
+    wall_time: float
+    # 按阶段：count, total, mean, p50, p90, p99, max（秒）
+    #   tick_to_dispatch  K线到达到开始处理（事件循环排队）
+    #   tick_to_order     K线到达到由它引发的订单交给执行端
+    #   以及执行端报告的阶段，如 order_round_trip（下单到经纪端确认）
+    latency: pd.DataFrame
+
+    def to_dict(self) -> Dict:
+        return {'bars': self.bars, 'orders': self.orders, 'wall_time': self.wall_time,
+                'latency': self.latency.to_dict(orient='index')}
+
+    def __str__(self):
+        return (f"{self.bars} bars, {self.orders} orders in {self.wall_time:.3f}s\n"
+                f"Latency:\n{self.latency.to_string()}")
+
+
+_BAR, _EVENT, _END = range(3)
+
+
+# 基于 asyncio 的实盘/模拟盘运行时，复用回测的 Strategy、Portfolio 和 ExecutionHandler。
+# 行情和执行端回报都进入同一个收件队列，按到达顺序逐个处理：K线写入 LiveDataHandler 并分发，
+# 回报放入事件总线后分发；分发本身是同步的，I/O 都在行情源和执行端各自的协程中完成。
+# 同步的执行端（SimulateExecutionHandler、SimulatedExchange）可以直接使用，在分发过程中就地成交
+class LiveRuntime:
+    def __init__(self, data: LiveDataHandler, portfolio: Portfolio, strategy: Strategy, broker: ExecutionHandler,
+                 feed: AsyncFeed, events: Optional[EventBus] = None, drain_timeout: float = 5.0,
+                 verbose: bool = False):
+        self.data = data
+        self.portfolio = portfolio
+        self.strategy = strategy
+        self.broker = broker
+        self.feed = feed
+        self.drain_timeout = drain_timeout
+        self.verbose = verbose
+        self.events = connect_components(data, portfolio, strategy, broker, events)
+        self.events.subscribe(EventType.ORDER, self._record_order)
+        self.events.subscribe(EventType.ORDER_BATCH, self._record_order)
+        self.report: Optional[LatencyReport] = None
+        self.bars = 0
+        self._inbox: Optional[asyncio.Queue] = None
+        self._tick = None
+        self._tick_to_dispatch = []
+        self._tick_to_order = []
+
+    def _record_order(self, event):
+        # 订阅在执行端之后：记录的是订单已经交给执行端（远程执行端已写出）的时刻
+        if self._tick is not None:
+            self._tick_to_order.append(time.perf_counter() - self._tick)
+
+    def _emit(self, update: BarUpdate):
+        self._inbox.put_nowait((_BAR, update, time.perf_counter()))
+
+    def submit(self, event):
+        # 执行端回报（FillEvent 等）进入收件队列
+        self._inbox.put_nowait((_EVENT, event, time.perf_counter()))
+
+    async def _run_feed(self):
+        try:
+            await self.feed.run(self._emit)
+        finally:
+            self._inbox.put_nowait((_END, None, time.perf_counter()))
+
+    def _handle(self, kind, item, received):
+        if kind == _BAR:
+            self._tick = received
+            self._tick_to_dispatch.append(time.perf_counter() - received)
+            self.data.push(item)
+            self.events.dispatch()
+            self._tick = None
+            self.bars += 1
+        else:
+            self.events.put(item)
+            self.events.dispatch()
+
+    async def _drain(self):
+        # 行情结束后继续处理执行端回报，直到没有未确认的订单或超时
+        inbox = self._inbox
+        deadline = time.perf_counter() + self.drain_timeout
+        while True:
+            while not inbox.empty():
+                kind, item, received = inbox.get_nowait()
+                if kind == _EVENT:
+                    self._handle(kind, item, received)
+            pending = self.broker.pending if isinstance(self.broker, AsyncExecutionHandler) else 0
+            remaining = deadline - time.perf_counter()
+            if pending == 0 or remaining <= 0:
+                return
+            try:
+                kind, item, received = await asyncio.wait_for(inbox.get(), remaining)
+            except asyncio.TimeoutError:
+                return
+            if kind == _EVENT:
+                self._handle(kind, item, received)
+
+    async def run(self, max_bars: Optional[int] = None) -> pd.DataFrame:
+        self._inbox = asyncio.Queue()
+        if isinstance(self.broker, AsyncExecutionHandler):
+            await self.broker.start(self.submit)
+        start = time.perf_counter()
+        feed_task = asyncio.create_task(self._run_feed())
+        try:
+            while max_bars is None or self.bars < max_bars:
+                kind, item, received = await self._inbox.get()
+                if kind == _END:
+                    break
+                self._handle(kind, item, received)
+                if kind == _BAR:
+                    await self.feed.done(item)
+            if feed_task.done() and not feed_task.cancelled() and feed_task.exception() is not None:
+                raise feed_task.exception()
+            await self._drain()
+        finally:
+            feed_task.cancel()
+            await asyncio.gather(feed_task, return_exceptions=True)
+            await self.feed.close()
+            if isinstance(self.broker, AsyncExecutionHandler):
+                await self.broker.stop()
+        wall_time = time.perf_counter() - start
+
+        samples = {'tick_to_dispatch': np.asarray(self._tick_to_dispatch),
+                   'tick_to_order': np.asarray(self._tick_to_order)}
+        if isinstance(self.broker, AsyncExecutionHandler):
+            samples.update(self.broker.latencies())
+        self.report = LatencyReport(self.bars, len(self._tick_to_order), wall_time, summarize_latencies(samples))
+        if self.verbose:
+            print(self.portfolio.summary_stats())
+            print(self.report)
+        return self.portfolio.create_equity_curve_dataframe()
+
+
+def run_live(data: LiveDataHandler, portfolio: Portfolio, strategy: Strategy, broker: ExecutionHandler,
+             feed: AsyncFeed, max_bars: Optional[int] = None, verbose: bool = True) -> pd.DataFrame:
+    # 在新的事件循环中运行到行情结束；已在事件循环中时直接 await LiveRuntime(...).run()
+    runtime = LiveRuntime(data, portfolio, strategy, broker, feed, verbose=verbose)
+    return asyncio.run(runtime.run(max_bars))
@@ -0,0 +1,344 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtester.bars import TIME_FIELD, BarStore
+from backtester.data import ArrayDataHandler
+from backtester.event import EventType, FillEvent, OrderDirection, OrderEvent, OrderType
+from backtester.event_manager import EventBus
+from backtester.exchange import SimulatedExchange
+from backtester.live import AsyncExecutionHandler, AsyncFeed, BarUpdate, _replay_delay
+
+# 模拟经纪端协议：TCP 上每行一个 JSON 对象。
+#   客户端 -> 服务端  {"type": "subscribe"}
+#                     {"type": "order", "id", "symbol", "order_type", "quantity", "direction", "price"}
+#                     {"type": "ack", "datetime"}            处理完一根K线（lockstep 时服务端据此推进）
+#   服务端 -> 客户端  {"type": "bar", "datetime", "bars": {品种: {字段: 值}}}
+#                     {"type": "fill", "id", "datetime", "symbol", "exchange", "quantity", "direction",
+#                      "fill_cost", "commission"}       id 为触发成交的订单号，挂单在后续K线上成交时为 null
+#                     {"type": "accepted", "id"}          订单已处理（立即成交的部分已先行回报）
+#                     {"type": "end"}
+# datetime 均为纳秒时间戳
+
+
+def encode(message: Dict) -> bytes:
+    return (json.dumps(message, separators=(',', ':')) + '\n').encode()
+
+
+def decode(line: bytes) -> Dict:
+    return json.loads(line)
+
+
+def _fill_messages(event, order_id=None) -> List[Dict]:
+    if event.type == EventType.FILL:
+        fills = [(event.symbol, event.quantity, event.direction, event.fill_cost, event.commission)]
+    elif event.type == EventType.FILL_BATCH:
+        fills = [(event.symbols[i], abs(event.quantities[i]),
+                  OrderDirection.BUY if event.quantities[i] > 0 else OrderDirection.SELL,
+                  event.fill_costs[i], event.commissions[i]) for i in np.flatnonzero(event.quantities).tolist()]
+    else:
+        return []
+    timestamp = pd.Timestamp(event.time_index).value
+    return [{'type': 'fill', 'id': order_id, 'datetime': timestamp, 'symbol': symbol, 'exchange': event.exchange,
+             'quantity': float(quantity), 'direction': direction.name, 'fill_cost': float(fill_cost),
+             'commission': float(commission)}
+            for symbol, quantity, direction, fill_cost, commission in fills]
+
+
+async def _wait_either(task: asyncio.Task, event: asyncio.Event):
+    # 等到事件被置位或任务结束（客户端断开）
+    waiter = asyncio.create_task(event.wait())
+    try:
+        await asyncio.wait([task, waiter], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        waiter.cancel()
+
+
+# 本地模拟经纪端：每个客户端连接是一个独立会话，从头回放 store 中的K线，
+# 订单交给 exchange_factory(data) 创建的执行端（默认 SimulatedExchange）撮合。
+# interval/speed 控制回放速度（同 ReplayFeed）；lockstep=True 时收到客户端对上一根K线的 ack 才推送下一根
+class PaperBrokerServer:
+    def __init__(self, store: BarStore, symbol_list: Optional[List[str]] = None, start=None, end=None,
+                 exchange_factory: Optional[Callable] = None, interval: float = 0.0, speed: Optional[float] = None,
+                 lockstep: bool = True, host: str = '127.0.0.1', port: int = 0):
+        self.store = store
+        self.symbol_list = list(symbol_list) if symbol_list is not None else list(store.symbols)
+        self.start = start
+        self.end = end
+        self.exchange_factory = exchange_factory if exchange_factory is not None else SimulatedExchange
+        self.interval = interval
+        self.speed = speed
+        self.lockstep = lockstep
+        self.host = host
+        self.port = port
+        self.server = None
+        self._sessions = {}
+
+    async def start_server(self):
+        self.server = await asyncio.start_server(self._session, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start_server()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        # 关闭监听并断开仍在进行的会话
+        if self.server is not None:
+            self.server.close()
+            for writer in self._sessions.values():
+                writer.close()
+            await asyncio.gather(*self._sessions, return_exceptions=True)
+            await self.server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start_server()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        data = ArrayDataHandler(self.store, self.symbol_list, start=self.start, end=self.end)
+        events = EventBus()
+        data.events = events
+        exchange = self.exchange_factory(data)
+        exchange.events = events
+        subscribed = asyncio.Event()
+        acked = asyncio.Event()
+
+        def send_fills(order_id=None):
+            while not events.empty():
+                for message in _fill_messages(events.get(), order_id):
+                    writer.write(encode(message))
+
+        async def receive():
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                message = decode(line)
+                kind = message.get('type')
+                if kind == 'subscribe':
+                    subscribed.set()
+                elif kind == 'ack':
+                    acked.set()
+                elif kind == 'order':
+                    order = OrderEvent(message['symbol'], OrderType[message['order_type']], message['quantity'],
+                                       OrderDirection[message['direction']], message.get('price'))
+                    exchange.execute_order(order)
+                    send_fills(message.get('id'))
+                    writer.write(encode({'type': 'accepted', 'id': message.get('id')}))
+
+        receiver = asyncio.create_task(receive())
+        session = asyncio.current_task()
+        self._sessions[session] = writer
+        try:
+            await _wait_either(receiver, subscribed)
+            if subscribed.is_set():
+                await self._stream(data, events, exchange, writer, acked, receiver, send_fills)
+                await receiver
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            del self._sessions[session]
+            receiver.cancel()
+            writer.close()
+
+    async def _stream(self, data, events, exchange, writer, acked, receiver, send_fills):
+        store = data.store
+        fields = [field for field in store.fields if field != TIME_FIELD]
+        previous = None
+        while True:
+            data.update_latest_data()
+            if not data.continue_backtest:
+                break
+            market = events.get()
+            timestamp = pd.Timestamp(market.datetime).value
+            delay = _replay_delay(previous, timestamp, self.interval, self.speed)
+            previous = timestamp
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # 与回测相同的顺序：先推送K线，再回报用这根K线撮合的挂单
+            exchange.on_market(market)
+            snapshot = market.bars
+            bars = {}
+            for i in np.flatnonzero(snapshot.updated).tolist():
+                row = int(snapshot.rows[i])
+                bars[snapshot.symbols[i]] = {field: float(store.columns[field][row]) for field in fields}
+            acked.clear()
+            writer.write(encode({'type': 'bar', 'datetime': timestamp, 'bars': bars}))
+            send_fills()
+            await writer.drain()
+            if self.lockstep:
+                await _wait_either(receiver, acked)
+                if receiver.done():
+                    return
+        writer.write(encode({'type': 'end'}))
+        await writer.drain()
+
+
+# 客户端连接：一个后台任务按到达顺序读取所有消息，K线交给 on_bar，回报交给 on_message；
+# 行情源 TCPFeed 和执行端 RemoteExecutionHandler 共用同一个连接，保证成交与K线的先后顺序不变
+class BrokerConnection:
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.on_bar: Optional[Callable[[Dict], None]] = None
+        self.on_message: Optional[Callable[[Dict], None]] = None
+        self.finished: Optional[asyncio.Future] = None
+        self._reader_task = None
+
+    async def connect(self):
+        if self.writer is not None:
+            return
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.finished = asyncio.get_running_loop().create_future()
+        self._reader_task = asyncio.create_task(self._read())
+
+    def send(self, message: Dict):
+        self.writer.write(encode(message))
+
+    async def _read(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                message = decode(line)
+                kind = message.get('type')
+                if kind == 'bar':
+                    if self.on_bar is not None:
+                        self.on_bar(message)
+                elif kind == 'end':
+                    # 行情结束，但仍继续读取之后到达的成交回报
+                    if not self.finished.done():
+                        self.finished.set_result(None)
+                elif self.on_message is not None:
+                    self.on_message(message)
+        finally:
+            if not self.finished.done():
+                self.finished.set_result(None)
+
+    async def close(self):
+        if self.writer is None:
+            return
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        self.writer = None
+
+
+class TCPFeed(AsyncFeed):
+    def __init__(self, connection: BrokerConnection):
+        self.connection = connection
+
+    async def run(self, emit: Callable[[BarUpdate], None]):
+        connection = self.connection
+        await connection.connect()
+        connection.on_bar = lambda message: emit(BarUpdate(pd.Timestamp(message['datetime']), message['bars']))
+        connection.send({'type': 'subscribe'})
+        await connection.finished
+
+    async def done(self, update: BarUpdate):
+        if self.connection.writer is not None:
+            self.connection.send({'type': 'ack', 'datetime': update.datetime.value})
+            await self.connection.writer.drain()
+
+    async def close(self):
+        await self.connection.close()
+
+
+# 通过 BrokerConnection 下单的执行端：execute_order 只把订单写进发送缓冲区，
+# 成交回报到达后生成 FillEvent 交给运行时；记录每个订单从发出到经纪端确认的往返耗时
+class RemoteExecutionHandler(AsyncExecutionHandler):
+    def __init__(self, connection: BrokerConnection, verbose: bool = False):
+        self.connection = connection
+        self.verbose = verbose
+        self._next_id = 0
+        self._sent: Dict[int, float] = {}
+        self._round_trips = []
+        self._submit = None
+
+    async def start(self, submit: Callable[[object], None]):
+        self._submit = submit
+        await self.connection.connect()
+        self.connection.on_message = self._on_message
+
+    async def stop(self):
+        await self.connection.close()
+
+    @property
+    def pending(self) -> int:
+        return len(self._sent)
+
+    def latencies(self) -> Dict[str, np.ndarray]:
+        return {'order_round_trip': np.asarray(self._round_trips)}
+
+    def _send(self, symbol: str, order_type: OrderType, quantity, direction: OrderDirection, price=None):
+        order_id = self._next_id
+        self._next_id += 1
+        self.connection.send({'type': 'order', 'id': order_id, 'symbol': symbol, 'order_type': order_type.name,
+                              'quantity': float(quantity), 'direction': direction.name,
+                              'price': None if price is None else float(price)})
+        self._sent[order_id] = time.perf_counter()
+
+    def execute_order(self, event):
+        if event.type == EventType.ORDER:
+            if self.verbose:
+                event.print_order()
+            self._send(event.symbol, event.order_type, event.quantity, event.direction, event.price)
+        elif event.type == EventType.ORDER_BATCH:
+            # 批量订单拆成逐个品种的订单发出
+            for i in np.flatnonzero(event.quantities).tolist():
+                quantity = event.quantities[i]
+                direction = OrderDirection.BUY if quantity > 0 else OrderDirection.SELL
+                self._send(event.symbols[i], event.order_type, abs(quantity), direction)
+
+    def _on_message(self, message: Dict):
+        kind = message.get('type')
+        if kind == 'fill':
+            quantity = message['quantity']
+            self._submit(FillEvent(pd.Timestamp(message['datetime']), message['symbol'], message['exchange'],
+                                   int(quantity) if float(quantity).is_integer() else quantity,
+                                   OrderDirection[message['direction']], message['fill_cost'],
+                                   message['commission']))
+        elif kind == 'accepted':
+            sent = self._sent.pop(message.get('id'), None)
+            if sent is not None:
+                self._round_trips.append(time.perf_counter() - sent)
+
+
+def main(argv=None):
+    from backtester.barfile import open_bar_file
+
+    parser = argparse.ArgumentParser(description="Serve a bar file as a simulated paper-trading broker.")
+    parser.add_argument('bars', help="bar file directory (see backtester.barfile)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--symbols', nargs='+', default=None)
+    parser.add_argument('--interval', type=float, default=0.0, help="seconds between bars")
+    parser.add_argument('--speed', type=float, default=None, help="replay at this multiple of real time")
+    parser.add_argument('--no-lockstep', action='store_true', help="do not wait for clients between bars")
+    args = parser.parse_args(argv)
+    server = PaperBrokerServer(open_bar_file(args.bars), args.symbols, interval=args.interval, speed=args.speed,
+                               lockstep=not args.no_lockstep, host=args.host, port=args.port)
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == '__main__':
+    main()
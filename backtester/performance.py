@@ -1,23 +1,287 @@
 import numpy as np
 import pandas as pd
 
+# 所有函数都接受一维序列或二维数组（时间 x 曲线），二维时按列独立计算，
+# 便于一次性评估参数扫描得到的多条权益曲线
+
+
+def _as_2d(values):
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        return values[:, None], True
+    return values, False
+
+
+def _result(values, one_dimensional):
+    return values[0] if one_dimensional else values
+
 
 def calculate_sharpe_ratio(returns, periods=252):
-    if np.std(returns) == 0:
-        return np.nan
-    return (np.sqrt(periods) * np.mean(returns)) / np.std(returns)
+    values, one_dimensional = _as_2d(returns)
+    std = np.nanstd(values, axis=0)
+    mean = np.nanmean(values, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std == 0, np.nan, np.sqrt(periods) * mean / std)
+    return _result(sharpe, one_dimensional)
+
+
+def calculate_sortino_ratio(returns, periods=252, target=0.0):
+    values, one_dimensional = _as_2d(returns)
+    excess = values - target
+    downside = np.sqrt(np.nanmean(np.minimum(excess, 0.0) ** 2, axis=0))
+    mean = np.nanmean(excess, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sortino = np.where(downside == 0, np.nan, np.sqrt(periods) * mean / downside)
+    return _result(sortino, one_dimensional)
+
+
+def _paired(returns, benchmark_returns):
+    # 策略收益（一维或 时间 x 曲线）与同一日历上的基准收益配对，任一方缺失的时点两边都剔除
+    values, one_dimensional = _as_2d(returns)
+    benchmark = np.asarray(benchmark_returns, dtype=np.float64)
+    if benchmark.ndim == 1:
+        benchmark = benchmark[:, None]
+    benchmark = np.broadcast_to(benchmark, values.shape)
+    missing = np.isnan(values) | np.isnan(benchmark)
+    return np.where(missing, np.nan, values), np.where(missing, np.nan, benchmark), one_dimensional
+
+
+def calculate_beta(returns, benchmark_returns):
+    values, benchmark, one_dimensional = _paired(returns, benchmark_returns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        excess = values - np.nanmean(values, axis=0)
+        benchmark_excess = benchmark - np.nanmean(benchmark, axis=0)
+        covariance = np.nanmean(excess * benchmark_excess, axis=0)
+        variance = np.nanmean(benchmark_excess ** 2, axis=0)
+        beta = np.where(variance == 0, np.nan, covariance / variance)
+    return _result(beta, one_dimensional)
+
+
+def calculate_alpha(returns, benchmark_returns, periods=252):
+    # 年化 Jensen alpha（无风险利率取 0）
+    values, benchmark, one_dimensional = _paired(returns, benchmark_returns)
+    beta = calculate_beta(values, benchmark)
+    alpha = (np.nanmean(values, axis=0) - beta * np.nanmean(benchmark, axis=0)) * periods
+    return _result(alpha, one_dimensional)
+
+
+def calculate_tracking_error(returns, benchmark_returns, periods=252):
+    values, benchmark, one_dimensional = _paired(returns, benchmark_returns)
+    return _result(np.nanstd(values - benchmark, axis=0) * np.sqrt(periods), one_dimensional)
+
+
+def calculate_information_ratio(returns, benchmark_returns, periods=252):
+    values, benchmark, one_dimensional = _paired(returns, benchmark_returns)
+    active = values - benchmark
+    std = np.nanstd(active, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(std == 0, np.nan, np.sqrt(periods) * np.nanmean(active, axis=0) / std)
+    return _result(ratio, one_dimensional)
+
+
+def calculate_drawdown_series(equity_curve):
+    # 与原逐行实现一致：高水位从 0 开始，第一行为 NaN，回撤为绝对值，
+    # 持续期为连续回撤的根数（在第一次回到高水位之前为 NaN）
+    values, one_dimensional = _as_2d(equity_curve)
+    n = len(values)
+    drawdown = np.full(values.shape, np.nan)
+    duration = np.full(values.shape, np.nan)
+    if n > 1:
+        tail = values[1:]
+        hwm = np.maximum.accumulate(np.maximum(np.nan_to_num(tail, nan=-np.inf), 0.0), axis=0)
+        drawdown[1:] = hwm - tail
+
+        rows = np.arange(n - 1)[:, None]
+        last_zero = np.maximum.accumulate(np.where(drawdown[1:] == 0, rows, -1), axis=0)
+        duration[1:] = np.where(last_zero >= 0, rows - last_zero, np.nan)
+
+    if one_dimensional:
+        return drawdown[:, 0], duration[:, 0]
+    return drawdown, duration
 
 
 def calculate_drawdowns(equity_curve):
-    hwm = [0]
-    eq_index = equity_curve.index
-    drawdown = pd.Series(index=eq_index)
-    duration = pd.Series(index=eq_index)
-
-    for i in range(1, len(eq_index)):
-        current_hwm = max(hwm[i - 1], equity_curve.iloc[i])
-        hwm.append(current_hwm)
-        drawdown.iloc[i] = hwm[i] - equity_curve.iloc[i]
-        duration.iloc[i] = 0 if drawdown.iloc[i] == 0 else duration.iloc[i - 1] + 1
-
-    return drawdown.max(), duration.max()
+    drawdown, duration = calculate_drawdown_series(equity_curve)
+    with np.errstate(invalid='ignore'):
+        if drawdown.ndim == 1:
+            if np.all(np.isnan(drawdown)):
+                return np.nan, np.nan
+            return np.nanmax(drawdown), np.nanmax(duration) if not np.all(np.isnan(duration)) else np.nan
+        max_dd = np.full(drawdown.shape[1], np.nan)
+        max_duration = np.full(drawdown.shape[1], np.nan)
+        for values, out in ((drawdown, max_dd), (duration, max_duration)):
+            valid = ~np.all(np.isnan(values), axis=0)
+            out[valid] = np.nanmax(values[:, valid], axis=0)
+        return max_dd, max_duration
+
+
+def calculate_underwater(equity_curve):
+    # 相对历史最高点的回撤百分比（<= 0）
+    values, one_dimensional = _as_2d(equity_curve)
+    peak = np.fmax.accumulate(values, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        underwater = values / peak - 1.0
+    return underwater[:, 0] if one_dimensional else underwater
+
+
+def calculate_max_drawdown_pct(equity_curve):
+    underwater, one_dimensional = _as_2d(calculate_underwater(equity_curve))
+    with np.errstate(invalid='ignore'):
+        worst = -np.nanmin(np.where(np.isnan(underwater), 0.0, underwater), axis=0)
+    return _result(worst, one_dimensional)
+
+
+def calculate_cagr(equity_curve, periods=252):
+    values, one_dimensional = _as_2d(equity_curve)
+    valid = ~np.isnan(values)
+    first = np.argmax(valid, axis=0)
+    last = len(values) - 1 - np.argmax(valid[::-1], axis=0)
+    columns = np.arange(values.shape[1])
+    n_periods = (last - first).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = values[last, columns] / values[first, columns]
+        cagr = np.where(n_periods > 0, growth ** (periods / n_periods) - 1.0, np.nan)
+    return _result(cagr, one_dimensional)
+
+
+def calculate_calmar_ratio(equity_curve, periods=252):
+    cagr = calculate_cagr(equity_curve, periods)
+    max_dd = calculate_max_drawdown_pct(equity_curve)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(max_dd == 0, np.nan, cagr / max_dd)[()]
+
+
+def calculate_rolling_volatility(returns, window, periods=252):
+    frame = pd.DataFrame(np.asarray(returns, dtype=np.float64))
+    volatility = frame.rolling(window, min_periods=window).std(ddof=0).to_numpy() * np.sqrt(periods)
+    return volatility[:, 0] if np.ndim(returns) == 1 else volatility
+
+
+def calculate_rolling_sharpe(returns, window, periods=252):
+    frame = pd.DataFrame(np.asarray(returns, dtype=np.float64))
+    rolling = frame.rolling(window, min_periods=window)
+    std = rolling.std(ddof=0).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std == 0, np.nan, np.sqrt(periods) * rolling.mean().to_numpy() / std)
+    return sharpe[:, 0] if np.ndim(returns) == 1 else sharpe
+
+
+def calculate_drawdown_periods(equity_curve) -> pd.DataFrame:
+    # 每一段回撤一行：开始（前一个高点）、谷底、恢复时间、深度和长度；未恢复的 end 为 NaT
+    values = pd.Series(equity_curve).astype(np.float64)
+    underwater = calculate_underwater(values.to_numpy())
+    in_drawdown = np.nan_to_num(underwater, nan=0.0) < 0
+    edges = np.diff(np.concatenate([[0], in_drawdown.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    index = values.index
+    rows = []
+    for start, end in zip(starts, ends):
+        trough = start + int(np.argmin(underwater[start:end]))
+        rows.append({'start': index[start - 1] if start > 0 else index[start],
+                     'trough': index[trough],
+                     'end': index[end] if end < len(index) else pd.NaT,
+                     'depth': -underwater[trough],
+                     'length': end - start,
+                     'recovery': end - trough if end < len(index) else np.nan})
+    columns = ['start', 'trough', 'end', 'depth', 'length', 'recovery']
+    return pd.DataFrame(rows, columns=columns).sort_values('depth', ascending=False, ignore_index=True)
+
+
+def calculate_turnover(positions, prices, total):
+    # 每期换手率：成交金额 / 当期总资产，positions/prices 为 (时间 x 品种)
+    positions = np.asarray(positions, dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    traded = np.abs(np.diff(positions, axis=0, prepend=0.0)) * prices
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.nansum(traded, axis=1) / np.asarray(total, dtype=np.float64)
+
+
+def calculate_trade_pnl(fills: pd.DataFrame) -> pd.DataFrame:
+    # fills 需要 datetime/symbol/quantity(带方向)/price/commission 列；持仓回到 0 视为一笔完整交易
+    columns = ['symbol', 'entry', 'exit', 'pnl']
+    if fills.empty:
+        return pd.DataFrame(columns=columns)
+    fills = fills.sort_values('datetime', kind='stable').reset_index(drop=True)
+    position = fills.groupby('symbol', sort=False)['quantity'].cumsum()
+    closed = position.to_numpy() == 0
+    # 每个品种内，从后往前累计平仓次数作为交易编号，平仓成交与其之前的开仓成交编号相同
+    reversed_closed = pd.Series(closed[::-1].astype(np.int64))
+    trade_id = reversed_closed.groupby(fills['symbol'].to_numpy()[::-1]).cumsum().to_numpy()[::-1]
+    cash_flow = -(fills['quantity'] * fills['price']) - fills['commission']
+    frame = pd.DataFrame({'symbol': fills['symbol'], 'trade': trade_id, 'datetime': fills['datetime'],
+                          'cash_flow': cash_flow, 'closed': closed})
+    grouped = frame.groupby(['symbol', 'trade'], sort=False)
+    trades = grouped.agg(entry=('datetime', 'first'), exit=('datetime', 'last'), pnl=('cash_flow', 'sum'),
+                         complete=('closed', 'any')).reset_index()
+    return trades.loc[trades['complete'], columns].reset_index(drop=True)
+
+
+def calculate_win_rate(fills: pd.DataFrame):
+    trades = calculate_trade_pnl(fills)
+    if trades.empty:
+        return np.nan
+    return float(np.mean(trades['pnl'].to_numpy() > 0))
+
+
+def calculate_metrics(equity_curves, periods=252) -> pd.DataFrame:
+    # equity_curves：一条曲线（Series）或多条曲线（DataFrame/二维数组，每列一条），每条曲线一行结果
+    frame = pd.DataFrame(equity_curves)
+    values = frame.to_numpy(dtype=np.float64)
+    returns = np.full(values.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = values[1:] / values[:-1] - 1.0
+    max_dd, dd_duration = calculate_drawdowns(values)
+    last = values[-1] if len(values) else np.full(values.shape[1], np.nan)
+    return pd.DataFrame({
+        "Total Return": last - 1.0,
+        "CAGR": calculate_cagr(values, periods),
+        "Volatility": np.nanstd(returns, axis=0) * np.sqrt(periods),
+        "Sharpe Ratio": calculate_sharpe_ratio(returns, periods),
+        "Sortino Ratio": calculate_sortino_ratio(returns, periods),
+        "Calmar Ratio": calculate_calmar_ratio(values, periods),
+        "Max Drawdown": max_dd,
+        "Max Drawdown %": calculate_max_drawdown_pct(values),
+        "Drawdown Duration": dd_duration,
+    }, index=frame.columns)
+
+
+def calculate_benchmark_metrics(equity_curves, benchmark, periods=252) -> pd.DataFrame:
+    # equity_curves 同 calculate_metrics；benchmark 为已对齐到同一日历的基准点位（一维），每条曲线一行结果
+    frame = pd.DataFrame(equity_curves)
+    values = frame.to_numpy(dtype=np.float64)
+    levels = np.asarray(benchmark, dtype=np.float64)
+    returns = np.full(values.shape, np.nan)
+    benchmark_returns = np.full(levels.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = values[1:] / values[:-1] - 1.0
+        benchmark_returns[1:] = levels[1:] / levels[:-1] - 1.0
+    return pd.DataFrame({
+        "Alpha": calculate_alpha(returns, benchmark_returns, periods),
+        "Beta": calculate_beta(returns, benchmark_returns),
+        "Tracking Error": calculate_tracking_error(returns, benchmark_returns, periods),
+        "Information Ratio": calculate_information_ratio(returns, benchmark_returns, periods),
+    }, index=frame.columns)
+
+
+def calculate_summary_metrics(equity_curve):
+    total_return = equity_curve['equity_curve'].iloc[-1]
+    returns = equity_curve['returns']
+    pnl = equity_curve['equity_curve']
+
+    sharpe_ratio = calculate_sharpe_ratio(returns)
+    max_dd, dd_duration = calculate_drawdowns(pnl)
+
+    return {"Total Return": total_return - 1.0,
+            "Sharpe Ratio": sharpe_ratio,
+            "Max Drawdown": max_dd,
+            "Drawdown Duration": dd_duration}
+
+
+def format_summary_metrics(metrics) -> pd.DataFrame:
+    stats = [("Total Return", "%0.2f%%" % (metrics["Total Return"] * 100.0)),
+             ("Sharpe Ratio", "%0.2f" % metrics["Sharpe Ratio"]),
+             ("Max Drawdown", "%0.2f%%" % (metrics["Max Drawdown"] * 100.0)),
+             ("Drawdown Duration", "%d" % metrics["Drawdown Duration"])]
+    return pd.DataFrame(stats, columns=['item', 'value'])
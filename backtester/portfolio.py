@@ -1,15 +1,17 @@
 from abc import ABC, abstractmethod
 
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-from matplotlib import style
 
-from backtester.event import EventType, SignalType, OrderType, OrderDirection, OrderEvent
-from backtester.performance import calculate_sharpe_ratio, calculate_drawdowns
-from backtester.event_manager import EventManager
+from backtester.event import EventType, SignalType, OrderType, OrderDirection, OrderEvent, OrderBatchEvent, TargetKind
+from backtester.performance import calculate_benchmark_metrics, calculate_summary_metrics, format_summary_metrics
+from backtester.event_manager import EventEmitter
+from backtester.ledger import Ledger, SymbolArray
 
+FILL_COLUMNS = ['datetime', 'symbol', 'quantity', 'price', 'commission']
 
-class Portfolio(ABC):
+
+class Portfolio(EventEmitter, ABC):
     @abstractmethod
     def update_signal(self, event):
         pass
@@ -34,16 +36,34 @@ class Portfolio(ABC):
     def create_equity_curve_dataframe(self):
         pass
 
+    def update_target(self, event):
+        raise NotImplementedError(f"{type(self).__name__} does not support target events.")
+
+    def get_state(self) -> dict:
+        raise NotImplementedError(f"{type(self).__name__} does not support checkpointing.")
+
+    def set_state(self, state: dict):
+        raise NotImplementedError(f"{type(self).__name__} does not support checkpointing.")
+
+    def journals(self) -> dict:
+        # 断点续跑用：只追加的记录列表，检查点每次只写入新增的条目，不放进 get_state
+        return {}
+
 
 class NaivePortfolio(Portfolio):
-    def __init__(self, data, strategy_name, initial_capital=1.0):
+    def __init__(self, data, strategy_name, initial_capital=1.0, chunk_size=4096, lot_size=1, writer=None):
         self.data = data
         self.symbol_list = self.data.symbol_list
         self.initial_capital = initial_capital
         self.strategy_name = strategy_name
-        self.all_positions = []
-        self.current_positions = {symbol: 0.0 for symbol in self.symbol_list}
-        self.all_holdings = []
+        self.lot_size = lot_size  # 按目标调仓时的最小交易单位，如 A 股 100 股一手
+        self.ledger = Ledger(self.symbol_list, chunk_size)
+        # 传入 ResultWriter 时账本和成交记录每满 chunk_size 行写出一次（equity/positions/fills 表），
+        # 内存占用与回测长度无关；结果通过 self.results（ResultReader）从磁盘读取
+        self.writer = writer
+        self.results = None
+        self.current_positions = SymbolArray(self.symbol_list, np.zeros(len(self.symbol_list)))
+        self.all_fills = []
         self.current_holdings = self.construct_current_holdings()
         self.equity_curve = pd.DataFrame()
         self.holdings_curve = pd.DataFrame()
@@ -56,34 +76,20 @@ class NaivePortfolio(Portfolio):
         return holdings
 
     def update_time_index(self, event):
-        latest_datetime = None
-        for symbol in self.symbol_list:
-            latest_data = self.data.get_latest_data(symbol, num=1)
-            if latest_data:
-                latest_datetime = latest_data[0]['date']
-                break
-
-        if latest_datetime is None:
-            return
-
-        positions = {symbol: self.current_positions[symbol] for symbol in self.symbol_list}
-        positions['datetime'] = latest_datetime
-        self.all_positions.append(positions)
-
-        holdings = {symbol: 0.0 for symbol in self.symbol_list}
-        holdings['datetime'] = latest_datetime
-        holdings['cash'] = self.current_holdings['cash']
-        holdings['commission'] = self.current_holdings['commission']
-        holdings['total'] = self.current_holdings['cash']
-
-        for symbol in self.symbol_list:
-            latest_data = self.data.get_latest_data(symbol, num=1)
-            if latest_data:
-                market_value = self.current_positions[symbol] * latest_data[0]['close']
-                holdings[symbol] = market_value
-                holdings['total'] += market_value
-
-        self.all_holdings.append(holdings)
+        bars = getattr(event, 'bars', None)
+        if bars is not None:
+            # 直接使用 MarketEvent 携带的快照，停牌等缺失K线的品种按最近价格估值
+            latest_datetime = event.datetime
+            prices = bars.filled(self.data.price_col)
+        else:
+            latest_datetime = self.data.get_latest_datetime()
+            if latest_datetime is None:
+                return
+            prices = self.data.get_latest_values(self.data.price_col, forward_fill=True)
+        self.ledger.append(latest_datetime, self.current_positions.values, prices,
+                           self.current_holdings['cash'], self.current_holdings['commission'])
+        if self.writer is not None and self.ledger.size >= self.ledger.chunk_size:
+            self._flush_ledger()
 
     def update_positions_from_fill(self, fill):
         fill_dir = 1 if fill.direction == OrderDirection.BUY else -1
@@ -93,73 +99,188 @@ class NaivePortfolio(Portfolio):
         fill_dir = 1 if fill.direction == OrderDirection.BUY else -1
         latest_data = self.data.get_latest_data(fill.symbol, num=1)
         if latest_data:
-            fill_cost = latest_data[0]['close']
+            # 执行端回报了成交价时按成交价结算，否则按最新收盘价
+            fill_cost = fill.fill_cost if fill.fill_cost > 0 else latest_data[0]['close']
             cost = fill_cost * fill_dir * fill.quantity
             self.current_holdings[fill.symbol] += cost
             self.current_holdings['commission'] += fill.commission
             self.current_holdings['cash'] -= (cost + fill.commission)
             self.current_holdings['total'] -= (cost + fill.commission)
+            self._record_fill((latest_data[0]['date'], fill.symbol, fill_dir * fill.quantity, fill_cost,
+                               fill.commission))
+
+    def update_from_fill_batch(self, fill):
+        # 批量成交：持仓整体更新，资金按各品种最新收盘价一次性结算
+        quantities = np.asarray(fill.quantities, dtype=np.float64)
+        traded = np.flatnonzero(quantities)
+        if len(traded) == 0:
+            return
+        prices = self.data.get_latest_values(self.data.price_col, forward_fill=True)[traded]
+        fill_costs = np.asarray(fill.fill_costs, dtype=np.float64)[traded]
+        prices = np.where(fill_costs > 0, fill_costs, prices)
+        # 没有价格（尚无K线）的品种无法结算，持仓、资金和成交记录都跳过，保持账目一致
+        priced = ~np.isnan(prices)
+        traded, prices = traded[priced], prices[priced]
+        self.current_positions.values[traded] += quantities[traded]
+        costs = prices * quantities[traded]
+        commissions = np.asarray(fill.commissions, dtype=np.float64)[traded]
+        latest_datetime = self.data.get_latest_datetime()
+        for i, cost, price, commission in zip(traded.tolist(), costs.tolist(), prices.tolist(),
+                                              commissions.tolist()):
+            symbol = self.symbol_list[i]
+            self.current_holdings[symbol] += cost
+            self._record_fill((latest_datetime, symbol, quantities[i], price, commission))
+        spent = costs.sum() + commissions.sum()
+        self.current_holdings['commission'] += commissions.sum()
+        self.current_holdings['cash'] -= spent
+        self.current_holdings['total'] -= spent
+
+    def _record_fill(self, fill):
+        if self.writer is not None:
+            self.writer.append('fills', fill, FILL_COLUMNS)
+        else:
+            self.all_fills.append(fill)
+
+    def _flush_ledger(self):
+        if self.ledger.size:
+            self.writer.write_frame('equity', self.ledger.totals_dataframe().reset_index())
+            self.writer.write_frame('positions', self.ledger.positions_dataframe().reset_index())
+            self.ledger.clear()
+
+    def flush_results(self):
+        # 写出剩余的账本行和所有缓冲中的表，返回读取这些结果的 ResultReader
+        if self.writer is None:
+            raise ValueError("flush_results requires a portfolio created with a ResultWriter")
+        self._flush_ledger()
+        self.writer.flush()
+        self.results = self.writer.reader()
+        return self.results
 
     def update_fill(self, event):
         if event.type == EventType.FILL:
             self.update_positions_from_fill(event)
             self.update_holdings_from_fill(event)
+        elif event.type == EventType.FILL_BATCH:
+            self._check_universe(event.symbols)
+            self.update_from_fill_batch(event)
+
+    def _check_universe(self, symbols):
+        if symbols is not self.symbol_list and list(symbols) != self.symbol_list:
+            raise ValueError("Batch events must be aligned with the portfolio's symbol list")
 
     def generate_naive_order(self, signal):
         order = None
         symbol = signal.symbol
         direction = signal.signal_type
         quantity = signal.quantity
-        order_type = OrderType.MARKET
+        order_type = signal.order_type
 
         if direction == SignalType.LONG:
-            order = OrderEvent(symbol, order_type, quantity, OrderDirection.BUY)
+            order = OrderEvent(symbol, order_type, quantity, OrderDirection.BUY, signal.price)
         elif direction == SignalType.SHORT:
-            order = OrderEvent(symbol, order_type, quantity, OrderDirection.SELL)
+            order = OrderEvent(symbol, order_type, quantity, OrderDirection.SELL, signal.price)
         elif direction == SignalType.EXIT:
             current_quantity = self.current_positions[symbol]
             if current_quantity > 0:
-                order = OrderEvent(symbol, order_type, abs(int(current_quantity)), OrderDirection.SELL)
+                order = OrderEvent(symbol, order_type, abs(int(current_quantity)), OrderDirection.SELL, signal.price)
             elif current_quantity < 0:
-                order = OrderEvent(symbol, order_type, abs(int(current_quantity)), OrderDirection.BUY)
+                order = OrderEvent(symbol, order_type, abs(int(current_quantity)), OrderDirection.BUY, signal.price)
 
         return order
 
+    def generate_batch_order(self, signal):
+        # generate_naive_order 的向量化版本：LONG 买入、SHORT 卖出 quantity，EXIT 平掉当前持仓
+        signal_types = np.asarray(signal.signal_types)
+        quantities = np.asarray(signal.quantities, dtype=np.float64)
+        orders = np.where(signal_types == SignalType.LONG.value, quantities, 0.0)
+        orders -= np.where(signal_types == SignalType.SHORT.value, quantities, 0.0)
+        exit_ = signal_types == SignalType.EXIT.value
+        orders[exit_] = -np.trunc(self.current_positions.values[exit_])
+        if not orders.any():
+            return None
+        return OrderBatchEvent(signal.symbols, OrderType.MARKET, orders)
+
     def update_signal(self, event):
         if event.type == EventType.SIGNAL:
             order_event = self.generate_naive_order(event)
-            EventManager().put(order_event)
+            self.put_event(order_event)
+        elif event.type == EventType.SIGNAL_BATCH:
+            self._check_universe(event.symbols)
+            self.put_event(self.generate_batch_order(event))
+
+    def generate_target_order(self, target):
+        # 一次性把目标换算成整个品种池的订单：权重按当前总权益和最新收盘价折算成股数，
+        # 调仓量按 lot_size 向零取整，目标为 0 时全部平仓；停牌或没有价格的品种不下单
+        bars = self.data.get_snapshot()
+        prices = bars.filled(self.data.price_col)
+        current = self.current_positions.values
+        targets = np.asarray(target.targets, dtype=np.float64)
+        if target.kind == TargetKind.WEIGHTS:
+            equity = self.current_holdings['cash'] + np.nansum(current * prices)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                targets = targets * equity / prices
+        with np.errstate(invalid='ignore'):
+            orders = np.trunc((targets - current) / self.lot_size) * self.lot_size
+        orders = np.where(targets == 0, -current, orders)
+        orders[~(bars.updated & np.isfinite(orders))] = 0.0
+        if not orders.any():
+            return None
+        return OrderBatchEvent(target.symbols, OrderType.MARKET, orders)
+
+    def update_target(self, event):
+        if event.type == EventType.TARGET:
+            self._check_universe(event.symbols)
+            self.put_event(self.generate_target_order(event))
 
     def create_equity_curve_dataframe(self):
-        curve = pd.DataFrame(self.all_holdings)
-        curve.set_index(keys='datetime', inplace=True)
-        curve['returns'] = curve['total'].pct_change()
-        curve['equity_curve'] = (1.0 + curve['returns']).cumprod()
+        curve = self.flush_results().equity_curve() if self.writer is not None else self.ledger.equity_curve()
         self.equity_curve = curve
         self.holdings_curve = curve['total']
         return curve
 
-    def summary_stats(self) -> pd.DataFrame:
-        self.create_equity_curve_dataframe()
-        total_return = self.equity_curve['equity_curve'].iloc[-1]
-        returns = self.equity_curve['returns']
-        pnl = self.equity_curve['equity_curve']
+    def get_state(self) -> dict:
+        # 账本和成交记录都按行增量保存，由 Checkpointer 单独处理，这里只记录行数
+        return {'positions': self.current_positions.values.copy(), 'holdings': dict(self.current_holdings),
+                'ledger_size': self.ledger.size}
+
+    def set_state(self, state: dict):
+        self.current_positions.values[:] = state['positions']
+        self.current_holdings = dict(state['holdings'])
+
+    def journals(self) -> dict:
+        return {'fills': self.all_fills}
+
+    def create_positions_dataframe(self):
+        if self.writer is not None:
+            return self.flush_results().positions()
+        return self.ledger.positions_dataframe()
 
-        sharpe_ratio = calculate_sharpe_ratio(returns)
-        max_dd, dd_duration = calculate_drawdowns(pnl)
+    def create_fills_dataframe(self) -> pd.DataFrame:
+        if self.writer is not None:
+            return self.flush_results().fills()
+        return pd.DataFrame(self.all_fills, columns=FILL_COLUMNS)
 
-        stats = [("Total Return", "%0.2f%%" % ((total_return - 1.0) * 100.0)),
-                 ("Sharpe Ratio", "%0.2f" % sharpe_ratio),
-                 ("Max Drawdown", "%0.2f%%" % (max_dd * 100.0)),
-                 ("Drawdown Duration", "%d" % dd_duration)]
+    def summary_stats(self) -> pd.DataFrame:
+        if self.writer is not None:
+            return format_summary_metrics(self.flush_results().summary_metrics())
+        self.create_equity_curve_dataframe()
+        return format_summary_metrics(calculate_summary_metrics(self.equity_curve))
 
-        temp_df = pd.DataFrame(stats, columns=['item', 'value'])
-        return temp_df
+    def benchmark_metrics(self, benchmark=None) -> pd.DataFrame:
+        # 相对基准的 alpha/beta/跟踪误差/信息比率；benchmark 为 Benchmark，缺省用数据处理器配置的基准
+        self.create_equity_curve_dataframe()
+        benchmark = benchmark if benchmark is not None else self.data.benchmark
+        if benchmark is None:
+            raise ValueError("No benchmark configured for benchmark-relative metrics.")
+        levels = benchmark.align(self.equity_curve.index)
+        return calculate_benchmark_metrics({self.strategy_name: self.equity_curve['equity_curve']}, levels)
 
     def curve_df(self):
         return self.equity_curve
 
     def plot_holdings(self):
+        import matplotlib.pyplot as plt  # 绘图库只在绘图时导入
+
         holdings_fig, holdings_ax = plt.subplots()
         self.holdings_curve.plot(ax=holdings_ax)
         holdings_ax.set_title('Holdings')
@@ -167,9 +288,11 @@ class NaivePortfolio(Portfolio):
         holdings_ax.set_ylabel('Total')
 
     def plot_performance(self):
-        performance_df = self.data.create_baseline_dataframe()
+        performance_df = self.data.create_baseline_dataframe(self.equity_curve.index)
         performance_df[self.strategy_name] = self.equity_curve['equity_curve']
         performance_df = (performance_df * 100) - 100
+        import matplotlib.pyplot as plt
+
         performance_fig, performance_ax = plt.subplots()
         performance_df.plot(ax=performance_ax)
         performance_ax.set_title('Performance')
@@ -177,6 +300,9 @@ class NaivePortfolio(Portfolio):
         performance_ax.set_ylabel('Return (%)')
 
     def plot_all(self):
+        import matplotlib.pyplot as plt
+        from matplotlib import style
+
         style.use('ggplot')
         self.create_equity_curve_dataframe()
         self.plot_holdings()
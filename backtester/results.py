@@ -0,0 +1,244 @@
+import glob
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from backtester.performance import format_summary_metrics
+
+META_FILE = 'meta.json'
+TIME_COLUMN = 'datetime'
+
+
+def _parquet():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def _dtype_name(series: pd.Series) -> str:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return str(series.dtype)
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return str(series.dtype)
+    return 'str'
+
+
+# 分块写出回测结果：每张表（equity、positions、fills、signals 等）一个目录，
+# 每次写入一个 part 文件，pyarrow 可用时为 Parquet，否则为 CSV。
+# append 按行缓冲，满 chunk_size 行自动落盘，内存占用与回测长度无关
+class ResultWriter:
+    def __init__(self, path: str, format: str = 'auto', chunk_size: int = 4096):
+        if format == 'auto':
+            format = 'parquet' if _parquet() is not None else 'csv'
+        if format not in ('csv', 'parquet'):
+            raise ValueError(f"Unsupported result format {format!r}")
+        if format == 'parquet' and _parquet() is None:
+            raise ImportError("Writing Parquet results requires pyarrow")
+        self.path = path
+        self.format = format
+        self.chunk_size = chunk_size
+        self.tables: Dict[str, Dict] = {}
+        self._buffers: Dict[str, List[tuple]] = {}
+        self.closed = False
+        os.makedirs(path, exist_ok=True)
+        self._write_meta()
+
+    def append(self, table: str, row: Sequence, columns: Sequence[str]):
+        buffer = self._buffers.get(table)
+        if buffer is None:
+            buffer = self._buffers[table] = []
+            self.tables.setdefault(table, {'columns': list(columns), 'parts': 0})
+        buffer.append(tuple(row))
+        if len(buffer) >= self.chunk_size:
+            self.flush(table)
+
+    def flush(self, table: Optional[str] = None):
+        for name in [table] if table is not None else list(self._buffers):
+            rows = self._buffers.get(name)
+            if rows:
+                self.write_frame(name, pd.DataFrame(rows, columns=self.tables[name]['columns']))
+                rows.clear()
+
+    def write_frame(self, table: str, frame: pd.DataFrame):
+        if len(frame) == 0:
+            return
+        info = self.tables.setdefault(table, {'columns': list(frame.columns), 'parts': 0})
+        if 'dtypes' not in info:
+            info['dtypes'] = {str(column): _dtype_name(frame[column]) for column in frame.columns}
+        directory = os.path.join(self.path, table)
+        os.makedirs(directory, exist_ok=True)
+        part = os.path.join(directory, f"part-{info['parts']:06d}.{self.format}")
+        frame = frame.rename(columns=str)
+        if self.format == 'parquet':
+            pyarrow = _parquet()
+            pyarrow.parquet.write_table(pyarrow.Table.from_pandas(frame, preserve_index=False), part)
+        else:
+            frame.to_csv(part, index=False)
+        info['parts'] += 1
+        self._write_meta()
+
+    def _write_meta(self):
+        tmp = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'format': self.format, 'tables': self.tables}, f)
+        os.replace(tmp, os.path.join(self.path, META_FILE))
+
+    def close(self):
+        if not self.closed:
+            self.flush()
+            self._write_meta()
+            self.closed = True
+
+    def reader(self) -> 'ResultReader':
+        return ResultReader(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# 以只读方式按块读取 ResultWriter 的输出；summary_metrics 逐块流式计算，不需要把整条曲线读进内存
+class ResultReader:
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.format = meta['format']
+        self.tables: Dict[str, Dict] = meta['tables']
+
+    def parts(self, table: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.path, table, f"part-*.{self.format}")))
+
+    def _read_part(self, table: str, part: str, columns: Optional[List[str]]) -> pd.DataFrame:
+        if self.format == 'parquet':
+            pyarrow = _parquet()
+            if pyarrow is None:
+                raise ImportError("Reading Parquet results requires pyarrow")
+            return pyarrow.parquet.read_table(part, columns=columns).to_pandas()
+        dtypes = self.tables[table].get('dtypes', {})
+        wanted = columns if columns is not None else list(dtypes)
+        parse_dates = [column for column in wanted if dtypes.get(column, '').startswith('datetime64')]
+        dtype = {column: (str if dtypes.get(column) == 'str' else dtypes[column]) for column in wanted
+                 if column in dtypes and column not in parse_dates}
+        frame = pd.read_csv(part, usecols=columns, dtype=dtype, parse_dates=parse_dates, float_precision='round_trip')
+        # CSV 解析出的时间精度随 pandas 版本而定，按写入时记录的类型还原
+        for column in parse_dates:
+            frame[column] = frame[column].astype(dtypes[column])
+        return frame
+
+    def iter_chunks(self, table: str, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        for part in self.parts(table):
+            yield self._read_part(table, part, columns)
+
+    def read(self, table: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        chunks = list(self.iter_chunks(table, columns))
+        if not chunks:
+            return pd.DataFrame(columns=columns if columns is not None else self.tables.get(table, {}).get('columns'))
+        return pd.concat(chunks, ignore_index=True)
+
+    def _indexed(self, frame: pd.DataFrame) -> pd.DataFrame:
+        if TIME_COLUMN in frame.columns:
+            frame = frame.set_index(TIME_COLUMN)
+        return frame
+
+    def positions(self) -> pd.DataFrame:
+        return self._indexed(self.read('positions'))
+
+    def fills(self) -> pd.DataFrame:
+        return self.read('fills')
+
+    def signals(self, symbol: Optional[str] = None) -> pd.DataFrame:
+        if symbol is None:
+            return self.read('signals')
+        chunks = [chunk[chunk['symbol'] == symbol] for chunk in self.iter_chunks('signals')]
+        return pd.concat(chunks, ignore_index=True) if chunks else self.read('signals')
+
+    def iter_equity(self, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        # 逐块补上 returns 和 equity_curve 列，跨块延续上一块的 total 和累计净值，
+        # 结果与 Ledger.equity_curve 一致
+        previous_total = None
+        growth = 1.0
+        for chunk in self.iter_chunks('equity', columns):
+            total = chunk['total'].to_numpy(dtype=np.float64)
+            shifted = np.empty_like(total)
+            if len(total):
+                shifted[0] = np.nan if previous_total is None else previous_total
+                shifted[1:] = total[:-1]
+                previous_total = total[-1]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                returns = total / shifted - 1.0
+            factors = np.where(np.isnan(returns), 1.0, 1.0 + returns)
+            equity_curve = growth * np.cumprod(factors)
+            if len(equity_curve):
+                growth = equity_curve[-1]
+            equity_curve[np.isnan(returns)] = np.nan
+            chunk['returns'] = returns
+            chunk['equity_curve'] = equity_curve
+            yield self._indexed(chunk)
+
+    def equity_curve(self) -> pd.DataFrame:
+        chunks = list(self.iter_equity())
+        return pd.concat(chunks) if chunks else pd.DataFrame()
+
+    def summary_metrics(self, periods: int = 252) -> Dict[str, float]:
+        # 与 calculate_summary_metrics 相同的口径，逐块合并收益率的均值/方差（Chan 算法）和回撤状态
+        count, mean, m2 = 0, 0.0, 0.0
+        row = -1
+        hwm = 0.0
+        last_zero = None
+        max_dd = np.nan
+        max_duration = np.nan
+        last_equity = np.nan
+        for chunk in self.iter_equity(columns=[TIME_COLUMN, 'total']):
+            returns = chunk['returns'].to_numpy()
+            returns = returns[~np.isnan(returns)]
+            if len(returns):
+                n = len(returns)
+                chunk_mean = returns.mean()
+                chunk_m2 = ((returns - chunk_mean) ** 2).sum()
+                delta = chunk_mean - mean
+                total = count + n
+                mean += delta * n / total
+                m2 += chunk_m2 + delta ** 2 * count * n / total
+                count = total
+
+            equity = chunk['equity_curve'].to_numpy()
+            if len(equity):
+                last_equity = equity[-1]
+            rows = np.arange(row + 1, row + 1 + len(equity))
+            row += len(equity)
+            tail = rows > 0  # 第一行不参与回撤计算
+            equity, rows = equity[tail], rows[tail]
+            if len(equity) == 0:
+                continue
+            peaks = np.maximum.accumulate(np.maximum(np.nan_to_num(equity, nan=-np.inf), 0.0))
+            peaks = np.maximum(peaks, hwm)
+            hwm = peaks[-1]
+            drawdown = peaks - equity
+            with np.errstate(invalid='ignore'):
+                zeros = np.where(drawdown == 0, rows, -1)
+            last_zeros = np.maximum.accumulate(np.maximum(zeros, -1 if last_zero is None else last_zero))
+            last_zero = int(last_zeros[-1]) if last_zeros[-1] >= 0 else None
+            duration = np.where(last_zeros >= 0, rows - last_zeros, np.nan)
+            if not np.all(np.isnan(drawdown)):
+                max_dd = np.nanmax([max_dd, np.nanmax(drawdown)])
+            if not np.all(np.isnan(duration)):
+                max_duration = np.nanmax([max_duration, np.nanmax(duration)])
+
+        std = np.sqrt(m2 / count) if count else np.nan
+        sharpe = np.sqrt(periods) * mean / std if count and std != 0 else np.nan
+        return {"Total Return": last_equity - 1.0,
+                "Sharpe Ratio": sharpe,
+                "Max Drawdown": max_dd,
+                "Drawdown Duration": max_duration}
+
+    def summary_stats(self) -> pd.DataFrame:
+        return format_summary_metrics(self.summary_metrics())
@@ -0,0 +1,147 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtester.performance import calculate_max_drawdown_pct, calculate_sharpe_ratio, calculate_trade_pnl
+
+# 稳健性分析：对一次回测的结果重采样出成千上万条路径，看 Sharpe、最大回撤和最终收益的分布。
+# 路径按块（chunk_size 条一块）生成为 (时间 x 路径) 的二维数组一次性计算指标，内存只与块大小有关；
+# 每块使用由 seed 派生的独立随机流，所以结果与 max_workers、块的执行顺序无关，可复现
+METHODS = ('bootstrap', 'noise', 'shuffle')
+METRICS = ['Sharpe Ratio', 'Max Drawdown %', 'Total Return']
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def bootstrap_returns(returns: np.ndarray, n_paths: int, block_size: int, rng: np.random.Generator) -> np.ndarray:
+    # 循环块自助法：随机起点取连续 block_size 根收益拼接（越过末尾绕回开头），保留短期自相关和波动聚集
+    n = len(returns)
+    block_size = max(1, min(block_size, n))
+    n_blocks = -(-n // block_size)
+    starts = rng.integers(0, n, size=(n_blocks, 1, n_paths))
+    rows = (starts + np.arange(block_size)[None, :, None]) % n
+    return returns[rows.reshape(n_blocks * block_size, n_paths)[:n]]
+
+
+def noisy_returns(returns: np.ndarray, n_paths: int, noise_scale: float, rng: np.random.Generator) -> np.ndarray:
+    # 收益扰动：每根收益加上标准差为 noise_scale 倍收益标准差的高斯噪声，单期亏损不超过 100%
+    noise = rng.normal(0.0, noise_scale * np.std(returns), size=(len(returns), n_paths))
+    return np.maximum(returns[:, None] + noise, -1.0)
+
+
+def shuffled_trades(pnl: np.ndarray, n_paths: int, initial_capital: float, rng: np.random.Generator) -> np.ndarray:
+    # 交易顺序重排：逐笔盈亏不变、只打乱先后，最终收益不变，回撤和逐笔收益的分布随顺序变化。
+    # 返回每笔交易后的收益率，首行相对初始资金
+    order = rng.permuted(np.tile(pnl[:, None], (1, n_paths)), axis=0)
+    equity = initial_capital + np.cumsum(order, axis=0)
+    previous = np.vstack([np.full((1, n_paths), initial_capital), equity[:-1]])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return order / previous
+
+
+def path_metrics(returns: np.ndarray, periods: int = 252) -> Dict[str, np.ndarray]:
+    # returns 为 (时间 x 路径)，净值从 1 开始
+    equity = np.vstack([np.ones((1, returns.shape[1])), np.cumprod(1.0 + returns, axis=0)])
+    return {'Sharpe Ratio': calculate_sharpe_ratio(returns, periods),
+            'Max Drawdown %': calculate_max_drawdown_pct(equity),
+            'Total Return': equity[-1] - 1.0}
+
+
+def _simulate_chunk(method: str, source: np.ndarray, n_paths: int, seed, options: Dict) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    if method == 'bootstrap':
+        returns = bootstrap_returns(source, n_paths, options['block_size'], rng)
+    elif method == 'noise':
+        returns = noisy_returns(source, n_paths, options['noise_scale'], rng)
+    else:
+        returns = shuffled_trades(source, n_paths, options['initial_capital'], rng)
+    return path_metrics(returns, options['periods'])
+
+
+def _source(method: str, equity_curve: Optional[pd.DataFrame], fills: Optional[pd.DataFrame]) -> np.ndarray:
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+    if method == 'shuffle':
+        if fills is None:
+            raise ValueError("Trade shuffling needs the fills of the backtest.")
+        source = calculate_trade_pnl(fills)['pnl'].to_numpy(dtype=np.float64)
+    else:
+        if equity_curve is None:
+            raise ValueError(f"{method!r} resampling needs the equity curve of the backtest.")
+        source = np.asarray(equity_curve['returns'], dtype=np.float64)
+    source = source[np.isfinite(source)]
+    if len(source) < 2:
+        raise ValueError(f"Not enough observations for {method!r} resampling.")
+    return source
+
+
+def simulate(equity_curve: Optional[pd.DataFrame] = None, fills: Optional[pd.DataFrame] = None,
+             method: str = 'bootstrap', n_paths: int = 1000, chunk_size: int = 256, block_size: int = 20,
+             noise_scale: float = 0.5, initial_capital: float = 1.0, periods: int = 252, seed=None,
+             max_workers: Optional[int] = 1) -> pd.DataFrame:
+    # 每条路径一行：Sharpe Ratio / Max Drawdown % / Total Return。
+    # equity_curve 为 create_equity_curve_dataframe 的结果（用 returns 列），fills 为 create_fills_dataframe 的结果；
+    # shuffle 的 Sharpe 按逐笔收益计算、不年化。max_workers 不为 1 时各块分发到进程池
+    source = _source(method, equity_curve, fills)
+    options = {'block_size': block_size, 'noise_scale': noise_scale, 'initial_capital': initial_capital,
+               'periods': 1 if method == 'shuffle' else periods}
+    sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if max_workers == 1 or len(sizes) == 1:
+        chunks = [_simulate_chunk(method, source, size, chunk_seed, options) for size, chunk_seed in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            chunks = list(executor.map(_simulate_chunk, [method] * len(sizes), [source] * len(sizes), sizes, seeds,
+                                       [options] * len(sizes)))
+
+    frame = pd.DataFrame({metric: np.concatenate([chunk[metric] for chunk in chunks]) for metric in METRICS}
+                         if chunks else {metric: np.empty(0) for metric in METRICS})
+    frame.index.name = 'path'
+    return frame
+
+
+def observed_metrics(equity_curve: Optional[pd.DataFrame] = None, fills: Optional[pd.DataFrame] = None,
+                     method: str = 'bootstrap', initial_capital: float = 1.0, periods: int = 252) -> Dict[str, float]:
+    # 原始回测在与 simulate 相同口径下的指标，作为分布中的参照点
+    source = _source(method, equity_curve, fills)
+    if method == 'shuffle':
+        returns = (source / (initial_capital + np.concatenate([[0.0], np.cumsum(source)[:-1]])))[:, None]
+        periods = 1
+    else:
+        returns = source[:, None]
+    return {metric: float(values[0]) for metric, values in path_metrics(returns, periods).items()}
+
+
+def summarize_paths(paths: pd.DataFrame, observed: Optional[Dict[str, float]] = None,
+                    quantiles: Iterable[float] = QUANTILES) -> pd.DataFrame:
+    # 每个指标一行：均值、标准差、分位数；给出 observed 时附带原始值及其在分布中的分位（<= 原始值的路径占比）
+    values = paths.to_numpy(dtype=np.float64)
+    quantiles = list(quantiles)
+    summary = pd.DataFrame(index=pd.Index(paths.columns, name='metric'))
+    summary['mean'] = np.nanmean(values, axis=0)
+    summary['std'] = np.nanstd(values, axis=0)
+    for q, row in zip(quantiles, np.nanquantile(values, quantiles, axis=0)):
+        summary[f'{q:.0%}'] = row
+    if observed is not None:
+        reference = np.array([observed[metric] for metric in paths.columns])
+        summary['observed'] = reference
+        summary['percentile'] = np.nanmean(values <= reference, axis=0)
+    return summary
+
+
+def robustness_report(equity_curve: Optional[pd.DataFrame] = None, fills: Optional[pd.DataFrame] = None,
+                      methods: Iterable[str] = METHODS, initial_capital: float = 1.0, periods: int = 252,
+                      **kwargs) -> pd.DataFrame:
+    # 依次运行各方法并汇总为 (方法, 指标) 为索引的分布表；缺少 fills 时跳过 shuffle。
+    # 其余参数（n_paths、chunk_size、seed、max_workers 等）传给 simulate
+    frames = {}
+    for method in methods:
+        if method == 'shuffle' and fills is None:
+            continue
+        paths = simulate(equity_curve, fills, method, initial_capital=initial_capital, periods=periods, **kwargs)
+        observed = observed_metrics(equity_curve, fills, method, initial_capital, periods)
+        frames[method] = summarize_paths(paths, observed)
+    return pd.concat(frames, names=['method'])
@@ -1,16 +1,111 @@
 from abc import ABC, abstractmethod
+from typing import Optional, Sequence
 
-from backtester.event_manager import EventManager
+import numpy as np
 
+from backtester.event import EventType, TargetEvent, TargetKind
+from backtester.event_manager import EventEmitter
 
-class Strategy(ABC):
+
+class Strategy(EventEmitter, ABC):
     @abstractmethod
     def calculate_signals(self, event):
         pass
 
-    @staticmethod
-    def put_event(event):
-        EventManager().put(event)
+    def calculate_vectorized_signals(self, close):
+        # 向量化引擎使用：输入 (时间 x 品种) 的收盘价矩阵，返回同形状的目标方向 1/0/-1
+        raise NotImplementedError(f"{type(self).__name__} does not support the vectorized engine.")
+
+    def bar_kernel(self):
+        # 编译执行路径使用：返回 (内核函数, float64 参数数组, (品种 x k) 初始状态矩阵)，内核签名见 backtester.kernels
+        raise NotImplementedError(f"{type(self).__name__} does not support the kernel engine.")
 
     def plot(self):
         pass
+
+    def get_state(self) -> dict:
+        # 断点续跑的策略状态钩子：默认保存除数据、组合、事件总线和 journals() 之外的全部属性，
+        # 含有无法序列化对象的策略应重写 get_state/set_state
+        journaled = {id(entries) for entries in self.journals().values()}
+        return {key: value for key, value in vars(self).items()
+                if key not in ('data', 'portfolio', 'events', 'symbol_list') and id(value) not in journaled}
+
+    def set_state(self, state: dict):
+        self.__dict__.update(state)
+
+    def journals(self) -> dict:
+        # 只追加的记录列表（如逐根K线的信号），检查点每次只写入新增的条目
+        return {}
+
+
+# 某个时间戳的横截面数据：current 为 (品种 x 字段) 矩阵，history[field] 为最近 lookback 根K线的
+# (时间 x 品种) 矩阵（最后一行是当前K线，不足 lookback 时前面为 NaN），tradable 标记本时间戳有K线的品种
+class CrossSection:
+    __slots__ = ('datetime', 'symbols', 'fields', 'current', 'history', 'tradable', 'bars')
+
+    def __init__(self, datetime, symbols, fields, current, history, tradable, bars):
+        self.datetime = datetime
+        self.symbols = symbols
+        self.fields = fields
+        self.current = current
+        self.history = history
+        self.tradable = tradable
+        self.bars = bars
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.current[:, self.fields.index(field)]
+
+
+# 最近 lookback 行的滚动窗口：数据写两份到 2 * lookback 行的缓冲区，任意时刻的窗口都是连续的零拷贝视图
+class RollingMatrix:
+    def __init__(self, lookback: int, width: int):
+        self.lookback = lookback
+        self._buffer = np.full((2 * lookback, width), np.nan)
+        self._position = 0
+        self.count = 0
+
+    def append(self, row: np.ndarray):
+        i = self._position
+        self._buffer[i] = row
+        self._buffer[i + self.lookback] = row
+        self._position = (i + 1) % self.lookback
+        self.count += 1
+
+    def view(self) -> np.ndarray:
+        return self._buffer[self._position:self._position + self.lookback]
+
+
+# 横截面策略：每根K线把整个品种池的数据作为数组交给 calculate_targets，返回与 symbol_list 对齐的
+# 目标权重（kind=WEIGHTS）或目标持股数（kind=POSITIONS），NaN 表示不调整，返回 None 表示本K线不调仓。
+# 每根K线只发出一个 TargetEvent，由组合一次性向量化生成订单
+class CrossSectionalStrategy(Strategy):
+    def __init__(self, data, portfolio, fields: Sequence[str] = ('close',), lookback: int = 1,
+                 kind: TargetKind = TargetKind.WEIGHTS):
+        self.data = data
+        self.symbol_list = self.data.symbol_list
+        self.portfolio = portfolio
+        self.fields = list(fields)
+        self.lookback = max(1, lookback)
+        self.kind = kind
+        self.history = {field: RollingMatrix(self.lookback, len(self.symbol_list)) for field in self.fields}
+
+    @abstractmethod
+    def calculate_targets(self, cross_section: CrossSection) -> Optional[np.ndarray]:
+        pass
+
+    def calculate_signals(self, event):
+        if event.type != EventType.MARKET:
+            return
+        bars = event.bars if getattr(event, 'bars', None) is not None else self.data.get_snapshot()
+        current = np.empty((len(self.symbol_list), len(self.fields)))
+        for j, field in enumerate(self.fields):
+            values = bars[field]
+            current[:, j] = values
+            self.history[field].append(bars.filled(field))
+        cross_section = CrossSection(event.datetime, self.symbol_list, self.fields, current,
+                                     {field: matrix.view() for field, matrix in self.history.items()},
+                                     bars.updated, bars)
+        targets = self.calculate_targets(cross_section)
+        if targets is not None:
+            self.put_event(TargetEvent(self.symbol_list, event.datetime,
+                                       np.asarray(targets, dtype=np.float64), self.kind))
@@ -0,0 +1,187 @@
+import itertools
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from backtester.bars import BarStore
+from backtester.baseline import Benchmark
+from backtester.core import backtest, kernel_backtest
+from backtester.data import ArrayDataHandler
+from backtester.execution import SimulateExecutionHandler
+from backtester.performance import calculate_benchmark_metrics, calculate_summary_metrics
+from backtester.portfolio import NaivePortfolio
+
+
+def parameter_grid(grid: Union[Dict[str, Iterable], List[Dict]]) -> List[Dict]:
+    if isinstance(grid, dict):
+        names = list(grid)
+        return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    return [dict(params) for params in grid]
+
+
+# 把 BarStore 的各列拷贝进一块共享内存，子进程根据 spec 重新挂载成零拷贝视图
+class SharedBarStore:
+    def __init__(self, store: BarStore):
+        layout = []
+        size = 0
+        for name, column in store.columns.items():
+            layout.append((name, column.dtype.str, len(column), size))
+            size += column.nbytes
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for name, dtype, length, start in layout:
+            np.ndarray(length, dtype=dtype, buffer=self.shm.buf, offset=start)[:] = store.columns[name]
+        self.spec = (self.shm.name, list(store.symbols), np.asarray(store.offsets), layout)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_bar_store(spec):
+    name, symbols, offsets, layout = spec
+    shm = shared_memory.SharedMemory(name=name)
+    columns = {column: np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=start)
+               for column, dtype, length, start in layout}
+    for values in columns.values():
+        values.flags.writeable = False
+    return shm, BarStore(symbols, columns, offsets)
+
+
+_worker_shm = None
+_worker_store = None
+
+
+def _init_worker(spec, quiet):
+    global _worker_shm, _worker_store
+    _worker_shm, _worker_store = attach_bar_store(spec)
+    if quiet:
+        sys.stdout = open(os.devnull, 'w')
+
+
+def run_window(store: BarStore, symbol_list: List[str], strategy_cls, params: Dict, initial_capital: float = 1.0,
+               start=None, end=None, benchmark: Optional[pd.Series] = None,
+               engine: str = 'event', forward_fill: bool = True) -> Tuple[Dict, pd.DataFrame]:
+    # 在 [start, end] 时间段上运行一次回测，返回 (指标, 净值曲线的 total/returns/equity_curve 列)；
+    # benchmark 为已对齐到回测日历的基准点位，给出时指标中附带相对基准的 alpha/beta 等。
+    # engine='kernel' 时用策略的逐K线内核（kernel_backtest）代替事件引擎，结果相同；
+    # forward_fill 与 ArrayDataHandler 的同名参数含义相同
+    data = ArrayDataHandler(store, symbol_list, forward_fill=forward_fill, start=start, end=end)
+    portfolio = NaivePortfolio(data=data, strategy_name=strategy_cls.__name__, initial_capital=initial_capital)
+    strategy = strategy_cls(data=data, portfolio=portfolio, **params)
+    if engine == 'kernel':
+        equity_curve = kernel_backtest(data, strategy, initial_capital)
+    else:
+        equity_curve = backtest(data, portfolio, strategy, SimulateExecutionHandler(), verbose=False)
+    metrics = calculate_summary_metrics(equity_curve)
+    if benchmark is not None:
+        relative = calculate_benchmark_metrics(equity_curve[['equity_curve']], benchmark.reindex(equity_curve.index))
+        metrics.update(relative.iloc[0].to_dict())
+    return metrics, equity_curve[['total', 'returns', 'equity_curve']].copy()
+
+
+def run_single(store: BarStore, symbol_list: List[str], strategy_cls, params: Dict,
+               initial_capital: float = 1.0, start=None, end=None, benchmark: Optional[pd.Series] = None,
+               engine: str = 'event', forward_fill: bool = True) -> Dict:
+    return run_window(store, symbol_list, strategy_cls, params, initial_capital, start, end, benchmark, engine,
+                      forward_fill)[0]
+
+
+def _run_in_worker(strategy_cls, params, symbol_list, initial_capital, start, end, benchmark, engine, forward_fill):
+    return run_single(_worker_store, symbol_list, strategy_cls, params, initial_capital, start, end, benchmark, engine,
+                      forward_fill)
+
+
+def _run_window_in_worker(strategy_cls, params, symbol_list, initial_capital, start, end, forward_fill):
+    return run_window(_worker_store, symbol_list, strategy_cls, params, initial_capital, start, end,
+                      forward_fill=forward_fill)
+
+
+def _terminate_workers(executor: ProcessPoolExecutor):
+    terminate = getattr(executor, 'terminate_workers', None)  # Python 3.14+
+    if terminate is not None:
+        terminate()
+        return
+    for process in list((getattr(executor, '_processes', None) or {}).values()):
+        process.terminate()
+
+
+def run_sweep(
+    data: ArrayDataHandler,
+    strategy_cls,
+    param_grid: Union[Dict[str, Iterable], List[Dict]],
+    initial_capital: float = 1.0,
+    max_workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int, Dict, Dict], None]] = None,
+    stop_event=None,
+    quiet: bool = True,
+    benchmark: Union[Benchmark, pd.Series, None] = None,
+    engine: str = 'event',
+    poll_interval: float = 0.1
+) -> pd.DataFrame:
+    # 数据只加载一次并放进共享内存，每个参数组合在独立进程中运行一次完整的事件驱动回测，
+    # 回测区间（start/end）和 forward_fill 与 data 相同；
+    # stop_event（如 threading.Event）每 poll_interval 秒检查一次，置位后取消排队的任务、终止正在运行的进程，
+    # 返回已完成的结果。单个参数组合出错不影响其余组合，异常信息记录在 error 列中。
+    # benchmark 在主进程中按回测日历对齐一次，各任务只拿到对齐好的点位序列。
+    # engine='kernel' 对提供 bar_kernel 的路径相关策略使用编译的逐K线内核
+    grid = parameter_grid(param_grid)
+    symbol_list = list(data.symbol_list)
+    if isinstance(benchmark, Benchmark):
+        benchmark = benchmark.align(pd.DatetimeIndex(data.calendar.view('M8[ns]')))
+    results: Dict[int, Dict] = {}
+
+    def stopped():
+        return stop_event is not None and stop_event.is_set()
+
+    def report(i, metrics):
+        results[i] = metrics
+        if progress is not None:
+            progress(len(results), len(grid), grid[i], metrics)
+
+    if max_workers == 1:
+        for i, params in enumerate(grid):
+            if stopped():
+                break
+            try:
+                metrics = run_single(data.store, symbol_list, strategy_cls, params, initial_capital, data.start,
+                                     data.end, benchmark, engine, data.forward_fill)
+            except Exception as error:
+                metrics = {'error': repr(error)}
+            report(i, metrics)
+    else:
+        with SharedBarStore(data.store) as shared:
+            executor = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                                           initializer=_init_worker, initargs=(shared.spec, quiet))
+            pending = set()
+            try:
+                futures = {executor.submit(_run_in_worker, strategy_cls, params, symbol_list, initial_capital,
+                                           data.start, data.end, benchmark, engine, data.forward_fill): i
+                           for i, params in enumerate(grid)}
+                pending = set(futures)
+                while pending and not stopped():
+                    done, pending = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        error = future.exception()
+                        report(futures[future], {'error': repr(error)} if error is not None else future.result())
+            finally:
+                if pending:
+                    # 提前停止：取消排队的任务并终止仍在运行的回测，不等待它们结束
+                    for future in pending:
+                        future.cancel()
+                    _terminate_workers(executor)
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    rows = [dict(grid[i], **results[i]) for i in sorted(results)]
+    return pd.DataFrame(rows, index=pd.Index(sorted(results), name='run'))
@@ -0,0 +1,66 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtester.bars import TIME_FIELD, BarStore
+from backtester.data import ArrayDataHandler
+from backtester.fetcher import BAR_FIELDS
+
+
+# 确定性的合成行情：几何布朗运动收盘价 + 随机开盘跳空、日内高低点和成交量。
+# gap_probability 为单根K线随机缺失的概率，suspension_probability 为每根K线开始一段
+# 长度为 suspension_length 的停牌的概率，listing_spread 让各品种在前若干根K线内随机上市
+def generate_bar_store(n_symbols: int = 10, n_bars: int = 1000, start: str = '2020-01-01', freq: str = 'B',
+                       mu: float = 0.05, sigma: float = 0.2, periods: int = 252, initial_price: float = 10.0,
+                       gap_probability: float = 0.0, suspension_probability: float = 0.0,
+                       suspension_length: int = 5, listing_spread: int = 0, seed: int = 0,
+                       symbols: Optional[List[str]] = None) -> BarStore:
+    rng = np.random.default_rng(seed)
+    symbols = list(symbols) if symbols is not None else [f"{i:06d}" for i in range(n_symbols)]
+    n_symbols = len(symbols)
+    dt = 1.0 / periods
+    shape = (n_bars, n_symbols)
+
+    log_returns = rng.normal((mu - 0.5 * sigma ** 2) * dt, sigma * np.sqrt(dt), shape)
+    close = initial_price * np.exp(np.cumsum(log_returns, axis=0))
+    previous_close = np.vstack([np.full((1, n_symbols), initial_price), close[:-1]])
+    open_ = previous_close * np.exp(rng.normal(0.0, 0.25 * sigma * np.sqrt(dt), shape))
+    spread = np.abs(rng.normal(0.0, 0.5 * sigma * np.sqrt(dt), shape))
+    high = np.maximum(open_, close) * (1.0 + spread)
+    low = np.minimum(open_, close) * (1.0 - np.abs(rng.normal(0.0, 0.5 * sigma * np.sqrt(dt), shape)))
+    volume = np.round(rng.lognormal(12.0, 0.5, shape))
+
+    available = np.ones(shape, dtype=bool)
+    if gap_probability > 0:
+        available &= rng.random(shape) >= gap_probability
+    if suspension_probability > 0:
+        starts = rng.random(shape) < suspension_probability
+        suspended = np.zeros(shape, dtype=bool)
+        for lag in range(suspension_length):
+            suspended[lag:] |= starts[:n_bars - lag]
+        available &= ~suspended
+    if listing_spread > 0:
+        listing = rng.integers(0, listing_spread + 1, n_symbols)
+        available &= np.arange(n_bars)[:, None] >= listing[None, :]
+
+    dates = pd.date_range(start, periods=n_bars, freq=freq).values.astype('M8[ns]').view('int64')
+    # 按列（品种）展开，得到与 BarStore 一致的品种连续布局
+    mask = available.T
+    offsets = np.zeros(n_symbols + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(mask.sum(axis=1))
+    columns = {TIME_FIELD: np.broadcast_to(dates, (n_symbols, n_bars))[mask]}
+    for field, values in zip(BAR_FIELDS, (open_, high, low, close, volume)):
+        columns[field] = values.T[mask]
+    return BarStore(symbols, columns, offsets)
+
+
+def generate_bars(**kwargs) -> Dict[str, pd.DataFrame]:
+    store = generate_bar_store(**kwargs)
+    return {symbol: store.frame(symbol) for symbol in store.symbols}
+
+
+class SyntheticDataHandler(ArrayDataHandler):
+    def __init__(self, n_symbols: int = 10, n_bars: int = 1000, forward_fill: bool = True, **kwargs):
+        super().__init__(generate_bar_store(n_symbols=n_symbols, n_bars=n_bars, **kwargs),
+                         forward_fill=forward_fill)
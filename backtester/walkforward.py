@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from backtester.bars import BarStore
+from backtester.data import ArrayDataHandler
+from backtester.performance import calculate_summary_metrics
+from backtester.sweep import SharedBarStore, _init_worker, _run_window_in_worker, parameter_grid, run_window
+
+
+@dataclass(frozen=True)
+class Fold:
+    index: int
+    train_start: pd.Timestamp
+    train_end: pd.Timestamp
+    test_start: pd.Timestamp
+    test_end: pd.Timestamp
+
+
+def walk_forward_folds(calendar: np.ndarray, train_size: int, test_size: int, step: Optional[int] = None,
+                       anchored: bool = False) -> List[Fold]:
+    # 按日历上的K线数划分折：训练窗口 train_size 根，紧接着测试窗口 test_size 根，每折向后移动 step 根；
+    # anchored=True 时训练窗口始终从第一根K线开始（扩张窗口）。区间均含两端
+    step = test_size if step is None else step
+    if train_size <= 0 or test_size <= 0:
+        raise ValueError("train_size and test_size must be positive")
+    if step < test_size:
+        raise ValueError("step must be at least test_size so out-of-sample windows do not overlap")
+    calendar = pd.DatetimeIndex(np.asarray(calendar).view('M8[ns]'))
+    folds = []
+    start = 0
+    while start + train_size + test_size <= len(calendar):
+        train_lo = 0 if anchored else start
+        train_hi = start + train_size
+        folds.append(Fold(len(folds), calendar[train_lo], calendar[train_hi - 1],
+                          calendar[train_hi], calendar[train_hi + test_size - 1]))
+        start += step
+    return folds
+
+
+def store_fingerprint(store: BarStore) -> str:
+    digest = hashlib.sha1()
+    digest.update(json.dumps(store.symbols).encode())
+    digest.update(np.ascontiguousarray(store.offsets).tobytes())
+    for name, column in store.columns.items():
+        digest.update(name.encode())
+        digest.update(memoryview(np.ascontiguousarray(column)).cast('B'))
+    return digest.hexdigest()
+
+
+# 按 (数据指纹, 策略, 参数, 品种, 时间窗口, 初始资金, forward_fill) 记忆单次回测的 (指标, 净值曲线)。
+# 给定 root 时每个结果另存为 <root>/<key>.pkl，重复运行同一个向前优化不会再回测
+class WalkForwardCache:
+    def __init__(self, root: Optional[str] = None):
+        self.root = root
+        self._results: Dict[str, Tuple[Dict, pd.DataFrame]] = {}
+        if root is not None:
+            os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(fingerprint: str, strategy_cls, params: Dict, symbol_list: List[str], start, end,
+            initial_capital: float, forward_fill: bool = True) -> str:
+        parts = [fingerprint, f"{strategy_cls.__module__}.{strategy_cls.__qualname__}",
+                 repr(sorted(params.items())), list(symbol_list), str(pd.Timestamp(start)),
+                 str(pd.Timestamp(end)), repr(float(initial_capital)), bool(forward_fill)]
+        return hashlib.sha1(json.dumps(parts).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[Tuple[Dict, pd.DataFrame]]:
+        if key in self._results:
+            return self._results[key]
+        if self.root is not None and os.path.exists(self._path(key)):
+            with open(self._path(key), 'rb') as f:
+                self._results[key] = pickle.load(f)
+            return self._results[key]
+        return None
+
+    def put(self, key: str, result: Tuple[Dict, pd.DataFrame]):
+        self._results[key] = result
+        if self.root is not None:
+            tmp = self._path(key) + '.tmp'
+            with open(tmp, 'wb') as f:
+                pickle.dump(result, f)
+            os.replace(tmp, self._path(key))
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._results)
+
+
+@dataclass
+class WalkForwardResult:
+    # 每折一行：训练/测试区间、选中的参数、样本内指标和样本外指标
+    folds: pd.DataFrame
+    # 每折每组参数的样本内指标
+    in_sample: pd.DataFrame
+    # 拼接后的样本外净值曲线：returns、equity_curve、total 和所属的 fold
+    equity_curve: pd.DataFrame
+    summary: Dict
+
+
+def _stitch(curves: List[pd.DataFrame], initial_capital: float) -> pd.DataFrame:
+    # 每折样本外回测都从初始资金开始，按收益率首尾相接；折与折之间的第一根K线收益记为 0
+    parts = []
+    for fold, curve in enumerate(curves):
+        returns = curve['returns'].copy()
+        if fold > 0:
+            returns.iloc[:1] = returns.iloc[:1].fillna(0.0)
+        parts.append(pd.DataFrame({'returns': returns, 'fold': fold}))
+    if not parts:
+        return pd.DataFrame(columns=['returns', 'equity_curve', 'total', 'fold'])
+    stitched = pd.concat(parts)
+    stitched['equity_curve'] = (1.0 + stitched['returns']).cumprod()
+    stitched['total'] = stitched['equity_curve'].fillna(1.0) * initial_capital
+    return stitched[['returns', 'equity_curve', 'total', 'fold']]
+
+
+def walk_forward(
+    data: ArrayDataHandler,
+    strategy_cls,
+    param_grid: Union[Dict[str, Iterable], List[Dict]],
+    train_size: int,
+    test_size: int,
+    step: Optional[int] = None,
+    anchored: bool = False,
+    metric: str = 'Sharpe Ratio',
+    maximize: bool = True,
+    initial_capital: float = 1.0,
+    max_workers: Optional[int] = None,
+    cache: Optional[WalkForwardCache] = None,
+    quiet: bool = True
+) -> WalkForwardResult:
+    # 在已加载的数据上做向前优化：每折在训练窗口上并行跑完整个参数网格，按 metric 选出最优参数，
+    # 再在紧随其后的测试窗口上做样本外回测，最后把各折样本外净值拼接成一条曲线。
+    # 所有单次回测都经 cache 记忆，重叠的窗口和重复运行只计算一次；各窗口的 forward_fill 与 data 相同
+    grid = parameter_grid(param_grid)
+    folds = walk_forward_folds(data.calendar, train_size, test_size, step, anchored)
+    symbol_list = list(data.symbol_list)
+    cache = cache if cache is not None else WalkForwardCache()
+    fingerprint = store_fingerprint(data.store)
+    forward_fill = data.forward_fill
+
+    def key(params, start, end):
+        return cache.key(fingerprint, strategy_cls, params, symbol_list, start, end, initial_capital, forward_fill)
+
+    executor = None
+    shared = None
+
+    def run_all(tasks: List[Tuple[Dict, pd.Timestamp, pd.Timestamp]]):
+        nonlocal executor, shared
+        pending = {}
+        for params, start, end in tasks:
+            task_key = key(params, start, end)
+            if task_key not in pending and task_key not in cache:
+                pending[task_key] = (params, start, end)
+        if not pending:
+            return
+        if max_workers == 1:
+            for task_key, (params, start, end) in pending.items():
+                cache.put(task_key, run_window(data.store, symbol_list, strategy_cls, params, initial_capital,
+                                               start, end, forward_fill=forward_fill))
+            return
+        if executor is None:
+            shared = SharedBarStore(data.store)
+            executor = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                                           initializer=_init_worker, initargs=(shared.spec, quiet))
+        futures = {executor.submit(_run_window_in_worker, strategy_cls, params, symbol_list, initial_capital,
+                                   start, end, forward_fill): task_key
+                   for task_key, (params, start, end) in pending.items()}
+        for future in as_completed(futures):
+            cache.put(futures[future], future.result())
+
+    try:
+        run_all([(params, fold.train_start, fold.train_end) for fold in folds for params in grid])
+
+        in_sample_rows = []
+        best = []
+        for fold in folds:
+            scores = []
+            for i, params in enumerate(grid):
+                metrics = cache.get(key(params, fold.train_start, fold.train_end))[0]
+                in_sample_rows.append(dict(fold=fold.index, **params, **metrics))
+                scores.append(metrics[metric])
+            scores = np.asarray(scores, dtype=np.float64)
+            if np.isnan(scores).all():
+                choice = 0
+            else:
+                choice = int(np.nanargmax(scores) if maximize else np.nanargmin(scores))
+            best.append((grid[choice], scores[choice]))
+
+        run_all([(params, fold.test_start, fold.test_end) for fold, (params, _) in zip(folds, best)])
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+            shared.close()
+
+    fold_rows = []
+    curves = []
+    for fold, (params, score) in zip(folds, best):
+        metrics, curve = cache.get(key(params, fold.test_start, fold.test_end))
+        curves.append(curve)
+        row = {'fold': fold.index, 'train_start': fold.train_start, 'train_end': fold.train_end,
+               'test_start': fold.test_start, 'test_end': fold.test_end, 'params': params,
+               f'in_sample {metric}': score}
+        row.update(metrics)
+        fold_rows.append(row)
+
+    equity_curve = _stitch(curves, initial_capital)
+    summary = calculate_summary_metrics(equity_curve) if len(equity_curve) else {}
+    return WalkForwardResult(
+        folds=pd.DataFrame(fold_rows).set_index('fold') if fold_rows else pd.DataFrame(),
+        in_sample=pd.DataFrame(in_sample_rows),
+        equity_curve=equity_curve,
+        summary=summary,
+    )
@@ -0,0 +1,223 @@
+# 端到端性能基准：在确定性的合成行情上运行示例策略，记录各阶段耗时、bars/sec、
+# events/sec 和峰值内存，结果写入 JSON 以便跟踪性能回归。
+#
+# 在仓库根目录运行：
+#     python -m benchmarks.run --preset quick
+#     python -m benchmarks.run --symbols 1 100 5000 --bars 500 --strategies ma hold
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from backtester.core import backtest, kernel_backtest, vectorized_backtest
+from backtester.data import ArrayDataHandler
+from backtester.event_manager import EventBus
+from backtester.execution import SimulateExecutionHandler
+from backtester.performance import calculate_summary_metrics
+from backtester.portfolio import NaivePortfolio
+from backtester.synthetic import generate_bar_store
+from examples.divide_conquer import DivideAndConquerStrategy
+from examples.hold import BuyAndHoldStrategy
+from examples.ma import MAStrategy
+from examples.momentum import MomentumStrategy
+from examples.stop_loss import StopLossStrategy
+
+STRATEGIES = {
+    'ma': (MAStrategy, {'short_period': 5, 'long_period': 20}),
+    'hold': (BuyAndHoldStrategy, {}),
+    'stop_loss': (StopLossStrategy, {'stop_loss_percentage': 0.95}),
+    'divide_conquer': (DivideAndConquerStrategy, {}),
+    'momentum': (MomentumStrategy, {'lookback': 20, 'top': 10, 'rebalance': 5}),
+}
+
+# divide_conquer 每根K线都按现金的一半反复加仓，品种多时仓位会发散，只适合单品种场景，默认不跑
+DEFAULT_STRATEGIES = ['hold', 'ma', 'momentum', 'stop_loss']
+
+# (品种数, K线数)
+PRESETS = {
+    'quick': [(1, 1000), (10, 1000), (100, 250)],
+    'full': [(1, 5000), (10, 5000), (100, 2500), (1000, 1000), (5000, 250)],
+}
+
+INITIAL_CAPITAL = 1000000.0
+
+
+class CountingEventBus(EventBus):
+    def __init__(self):
+        super().__init__()
+        self.counts = Counter()
+
+    def put(self, event):
+        if event is not None:
+            self.counts[event.type.name] += 1
+        super().put(event)
+
+
+def _event_run(store, strategy_cls, params):
+    stages = {}
+    start = time.perf_counter()
+    data = ArrayDataHandler(store)
+    portfolio = NaivePortfolio(data=data, strategy_name=strategy_cls.__name__, initial_capital=INITIAL_CAPITAL)
+    strategy = strategy_cls(data=data, portfolio=portfolio, **params)
+    broker = SimulateExecutionHandler()
+    stages['setup'] = time.perf_counter() - start
+
+    events = CountingEventBus()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        curve = backtest(data, portfolio, strategy, broker, verbose=False, events=events)
+    stages['run'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    calculate_summary_metrics(curve)
+    stages['stats'] = time.perf_counter() - start
+    return stages, events.counts, len(data.calendar)
+
+
+def _vectorized_run(store, strategy_cls, params):
+    stages = {}
+    start = time.perf_counter()
+    data = ArrayDataHandler(store)
+    strategy = strategy_cls(data=data, portfolio=None, **params)
+    stages['setup'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    curve = vectorized_backtest(data, strategy, INITIAL_CAPITAL)
+    stages['run'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    calculate_summary_metrics(curve)
+    stages['stats'] = time.perf_counter() - start
+    return stages, Counter(), len(data.calendar)
+
+
+def _kernel_run(store, strategy_cls, params):
+    stages = {}
+    start = time.perf_counter()
+    data = ArrayDataHandler(store)
+    strategy = strategy_cls(data=data, portfolio=None, **params)
+    stages['setup'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    curve = kernel_backtest(data, strategy, INITIAL_CAPITAL)
+    stages['run'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    calculate_summary_metrics(curve)
+    stages['stats'] = time.perf_counter() - start
+    return stages, Counter(), len(data.calendar)
+
+
+def _peak_memory(run, *args):
+    tracemalloc.start()
+    try:
+        run(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_scenario(n_symbols, n_bars, strategy_name, engine, seed=0, gaps=0.0, suspensions=0.0, memory=True):
+    strategy_cls, params = STRATEGIES[strategy_name]
+    start = time.perf_counter()
+    store = generate_bar_store(n_symbols=n_symbols, n_bars=n_bars, seed=seed, gap_probability=gaps,
+                               suspension_probability=suspensions)
+    generate_time = time.perf_counter() - start
+
+    run = {'event': _event_run, 'vectorized': _vectorized_run, 'kernel': _kernel_run}[engine]
+    stages, counts, timestamps = run(store, strategy_cls, params)
+    stages = dict(generate=generate_time, **stages)
+    total_events = sum(counts.values())
+    result = {
+        'strategy': strategy_name,
+        'engine': engine,
+        'symbols': n_symbols,
+        'bars_per_symbol': n_bars,
+        'bars': len(store),
+        'timestamps': timestamps,
+        'seed': seed,
+        'gap_probability': gaps,
+        'suspension_probability': suspensions,
+        'stages': stages,
+        'bars_per_sec': len(store) / stages['run'] if stages['run'] > 0 else None,
+        'events': dict(counts),
+        'events_per_sec': total_events / stages['run'] if stages['run'] > 0 and total_events else None,
+        'peak_memory_bytes': _peak_memory(run, store, strategy_cls, params) if memory else None,
+    }
+    return result
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run backtester performance benchmarks.")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick')
+    parser.add_argument('--symbols', type=int, nargs='+', help="override the preset symbol counts")
+    parser.add_argument('--bars', type=int, default=None, help="bars per symbol when --symbols is given")
+    parser.add_argument('--strategies', nargs='+', choices=sorted(STRATEGIES), default=DEFAULT_STRATEGIES)
+    parser.add_argument('--engines', nargs='+', choices=['event', 'vectorized', 'kernel'],
+                        default=['event', 'vectorized', 'kernel'])
+    parser.add_argument('--gaps', type=float, default=0.0, help="probability of a missing bar")
+    parser.add_argument('--suspensions', type=float, default=0.0, help="probability of a suspension starting")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc peak memory pass")
+    parser.add_argument('--output', default=None, help="JSON output path (default: benchmarks/results/)")
+    args = parser.parse_args(argv)
+
+    if args.symbols:
+        scenarios = [(n, args.bars or 1000) for n in args.symbols]
+    else:
+        scenarios = PRESETS[args.preset]
+
+    results = []
+    for n_symbols, n_bars in scenarios:
+        for strategy_name in args.strategies:
+            for engine in args.engines:
+                strategy_cls = STRATEGIES[strategy_name][0]
+                if engine == 'vectorized' and 'calculate_vectorized_signals' not in vars(strategy_cls):
+                    continue
+                if engine == 'kernel' and 'bar_kernel' not in vars(strategy_cls):
+                    continue
+                result = run_scenario(n_symbols, n_bars, strategy_name, engine, seed=args.seed, gaps=args.gaps,
+                                      suspensions=args.suspensions, memory=not args.no_memory)
+                results.append(result)
+                print(f"{strategy_name:>15} {engine:>10} {n_symbols:>5} x {n_bars:<6} "
+                      f"run={result['stages']['run']:.3f}s bars/s={result['bars_per_sec'] or 0:,.0f}")
+
+    output = args.output
+    if output is None:
+        directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+        os.makedirs(directory, exist_ok=True)
+        output = os.path.join(directory, datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ') + '.json')
+    with open(output, 'w') as f:
+        json.dump({'metadata': _metadata(), 'results': results}, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
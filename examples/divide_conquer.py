@@ -1,8 +1,7 @@
 import math
 
-import pandas as pd
-
 from backtester.event import SignalEvent, SignalType, EventType
+from backtester.indicators import RollingMean, Returns
 from backtester.strategy import Strategy
 
 
@@ -13,15 +12,16 @@ class DivideAndConquerStrategy(Strategy):
         self.portfolio = portfolio
         self.name = 'Divide And Conquer'
 
+        # 最近 7 根K线的 6 个收益率均值，与 pct_change().mean() 一致
+        self.data.register_indicator(
+            'mean_return_7', lambda: RollingMean(6, min_periods=1, source=Returns()))
+
     def calculate_signals(self, event):
         if event.type == EventType.MARKET:
             for symbol in self.symbol_list:
-                data = self.data.get_latest_data(symbol, num=7)
-                temp_df = pd.DataFrame(data, columns=['symbol', 'date', 'close'])
-                temp_df = temp_df.drop(labels=['symbol'], axis=1)
-                temp_df.set_index(keys='date', inplace=True)
+                data = self.data.get_latest_data(symbol, num=1)
                 if data is not None and len(data) > 0:
-                    mean = temp_df['close'].pct_change().mean()
+                    mean = self.data.get_indicator(symbol, 'mean_return_7').value
                     latest_close = data[-1][self.data.price_col]
                     if mean < 0:
                         quantity = math.floor(self.portfolio.current_holdings['cash'] / (2 * latest_close))
@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 from backtester.event import SignalEvent, SignalType, EventType
 from backtester.strategy import Strategy
 
@@ -20,6 +22,9 @@ class BuyAndHoldStrategy(Strategy):
 
         return bought
 
+    def calculate_vectorized_signals(self, close):
+        return np.ones_like(close, dtype=np.float64)
+
     def calculate_signals(self, event):
         if event.type == EventType.MARKET:
             for symbol in self.symbol_list:
@@ -48,6 +53,9 @@ class SellAndHoldStrategy(Strategy):
 
         return bought
 
+    def calculate_vectorized_signals(self, close):
+        return -np.ones_like(close, dtype=np.float64)
+
     def calculate_signals(self, event):
         if event.type == EventType.MARKET:
             for symbol in self.symbol_list:
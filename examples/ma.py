@@ -1,13 +1,17 @@
 import math
 
+import numpy as np
 import pandas as pd
 
 from backtester.event import SignalEvent, SignalType, EventType
+from backtester.indicators import EMA
 from backtester.strategy import Strategy
 
+SIGNAL_COLUMNS = ['symbol', 'date', 'short', 'long', 'signal']
+
 
 class MAStrategy(Strategy):
-    def __init__(self, data, portfolio, short_period, long_period, verbose=False):
+    def __init__(self, data, portfolio, short_period, long_period, verbose=False, writer=None):
         self.data = data
         self.symbol_list = self.data.symbol_list
         self.portfolio = portfolio
@@ -15,23 +19,26 @@ class MAStrategy(Strategy):
         self.long_period = long_period
         self.name = 'Moving Averages Long'
         self.verbose = verbose
+        # 传入 ResultWriter 时信号写入 signals 表，不在内存中累积
+        self.writer = writer
 
         self.signals = self._setup_signals()
-        self.strategy = self._setup_strategy()
+        self.indicator_names = self._setup_indicators()
         self.bought = self._setup_initial_bought()
 
     def _setup_signals(self):
         signals = {}
         for symbol in self.symbol_list:
-            signals[symbol] = pd.DataFrame(columns=['date', 'signal'])
+            signals[symbol] = []
         return signals
 
-    def _setup_strategy(self):
-        strategy = {}
-        for symbol in self.symbol_list:
-            strategy[symbol] = pd.DataFrame(columns=['date', 'short', 'long'])
-
-        return strategy
+    def _setup_indicators(self):
+        # 在数据处理器上为每个品种注册流式 EMA，每根K线 O(1) 更新
+        short_name = f"ema_{self.short_period}"
+        long_name = f"ema_{self.long_period}"
+        self.data.register_indicator(short_name, lambda: EMA(self.short_period))
+        self.data.register_indicator(long_name, lambda: EMA(self.long_period))
+        return short_name, long_name
 
     def _setup_initial_bought(self):
         bought = {}
@@ -40,61 +47,65 @@ class MAStrategy(Strategy):
 
         return bought
 
-    def calculate_long_short(self, df):
-        price_short = df['close'].ewm(span=self.short_period, min_periods=self.short_period, adjust=False).mean()
-        price_long = df['close'].ewm(span=self.long_period, min_periods=self.long_period, adjust=False).mean()
-
-        # 确保索引在有效范围内
-        if len(price_short) > self.short_period:
-            price_short = price_short.iloc[-1]
+    def _record_signal(self, symbol, row):
+        if self.writer is not None:
+            self.writer.append('signals', (symbol,) + row, SIGNAL_COLUMNS)
         else:
-            price_short = price_short.iloc[-1]  # 或者其他默认值
-
-        if len(price_long) > self.long_period:
-            price_long = price_long.iloc[-1]
-        else:
-            price_long = price_long.iloc[-1]  # 或者其他默认值
-
-        return price_short, price_long
+            self.signals[symbol].append(row)
+
+    def signals_dataframe(self, symbol):
+        if self.writer is not None:
+            self.writer.flush('signals')
+            signals = self.writer.reader().signals(symbol)
+            return signals[SIGNAL_COLUMNS[1:]].reset_index(drop=True)
+        return pd.DataFrame(self.signals[symbol], columns=SIGNAL_COLUMNS[1:])
+
+    def journals(self):
+        return {f"signals/{symbol}": rows for symbol, rows in self.signals.items()}
+
+    def get_state(self):
+        state = super().get_state()
+        del state['signals']
+        return state
+
+    def calculate_vectorized_signals(self, close):
+        prices = pd.DataFrame(close)
+        price_short = prices.ewm(span=self.short_period, min_periods=self.short_period, adjust=False).mean()
+        price_long = prices.ewm(span=self.long_period, min_periods=self.long_period, adjust=False).mean()
+        # 短均线上穿做多、下穿平仓，两者相等时保持原状态
+        state = np.where(price_short > price_long, 1.0, np.where(price_short < price_long, 0.0, np.nan))
+        return pd.DataFrame(state).ffill().fillna(0.0).to_numpy()
 
     def calculate_signals(self, event):
         if event.type == EventType.MARKET:
+            short_name, long_name = self.indicator_names
             for symbol in self.symbol_list:
-                data = self.data.get_latest_data(symbol, num=-1)
-                temp_df = pd.DataFrame(data, columns=['symbol', 'date', 'close'])
-                temp_df = temp_df.drop(labels=['symbol'], axis=1)
-                temp_df.set_index(keys='date', inplace=True)
-                if data is not None and len(data) >= self.long_period:
-                    price_short, price_long = self.calculate_long_short(temp_df)
-                    date = temp_df.index.values[-1]
-                    price = temp_df['close'].iloc[-1]
-                    self.signals[symbol] = pd.concat(
-                        objs=[self.signals[symbol],
-                              pd.DataFrame.from_dict(data={'date': date, "short": price_short, "long": price_long},
-                                                     orient="index").T],
-                        ignore_index=True)
-                    if self.bought[symbol] is False and price_short > price_long:
-                        quantity = math.floor(self.portfolio.current_holdings['cash'] / price)
-                        signal = SignalEvent(symbol, date, SignalType.LONG, quantity)
-                        self.put_event(signal)
-                        self.bought[symbol] = True
-                        self.signals[symbol] = pd.concat(
-                            objs=[self.signals[symbol],
-                                  pd.DataFrame.from_dict(data={'date': date, 'signal': quantity}, orient="index").T],
-                            ignore_index=True)
-                        if self.verbose:
-                            print("long", date, price)
-                    elif self.bought[symbol] is True and price_short < price_long:
-                        quantity = self.portfolio.current_positions[symbol]
-                        signal = SignalEvent(symbol, date, SignalType.EXIT, quantity)
-                        self.put_event(signal)
-                        self.bought[symbol] = False
-                        self.signals[symbol] = pd.concat(
-                            objs=[self.signals[symbol],
-                                  pd.DataFrame.from_dict(data={'date': date, 'signal': -quantity}, orient="index").T],
-                            ignore_index=True)
-                        if self.verbose:
-                            print("exit", date, price)
+                data = self.data.get_latest_data(symbol, num=1)
+                if data is None or len(data) == 0:
+                    continue
+                price_short = self.data.get_indicator(symbol, short_name).value
+                price_long = self.data.get_indicator(symbol, long_name).value
+                if math.isnan(price_long):
+                    continue
+                date = data[-1][self.data.time_col]
+                price = data[-1][self.data.price_col]
+                self._record_signal(symbol, (date, price_short, price_long, np.nan))
+                if self.bought[symbol] is False and price_short > price_long:
+                    quantity = math.floor(self.portfolio.current_holdings['cash'] / price)
+                    signal = SignalEvent(symbol, date, SignalType.LONG, quantity)
+                    self.put_event(signal)
+                    self.bought[symbol] = True
+                    self._record_signal(symbol, (date, np.nan, np.nan, quantity))
+                    if self.verbose:
+                        print("long", date, price)
+                elif self.bought[symbol] is True and price_short < price_long:
+                    quantity = self.portfolio.current_positions[symbol]
+                    signal = SignalEvent(symbol, date, SignalType.EXIT, quantity)
+                    self.put_event(signal)
+                    self.bought[symbol] = False
+                    self._record_signal(symbol, (date, np.nan, np.nan, -quantity))
+                    if self.verbose:
+                        print("exit", date, price)
 
 
 if __name__ == '__main__':
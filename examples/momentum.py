@@ -0,0 +1,51 @@
+import numpy as np
+
+from backtester.strategy import CrossSectionalStrategy
+
+
+class MomentumStrategy(CrossSectionalStrategy):
+    # 横截面动量：每 rebalance 根K线按过去 lookback 根K线的涨幅选出前 top 个品种等权持有
+    def __init__(self, data, portfolio, lookback=20, top=10, rebalance=5):
+        super().__init__(data, portfolio, fields=('close',), lookback=lookback + 1)
+        self.name = 'Momentum'
+        self.top = top
+        self.rebalance = rebalance
+        self.bars = 0
+
+    def calculate_targets(self, cross_section):
+        self.bars += 1
+        if self.bars <= self.lookback - 1 or (self.bars - self.lookback) % self.rebalance != 0:
+            return None
+        close = cross_section.history['close']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            momentum = close[-1] / close[0] - 1.0
+        momentum[~cross_section.tradable | np.isnan(momentum)] = -np.inf
+        ranked = np.argsort(-momentum, kind='stable')[:self.top]
+        ranked = ranked[np.isfinite(momentum[ranked])]
+        # 停牌的品种无法调仓，维持原有仓位，其余资金在选中的品种间等权分配
+        positions = self.portfolio.current_positions.values
+        value = np.nan_to_num(positions * cross_section.bars.filled('close'))
+        locked = value[~cross_section.tradable].sum() / (self.portfolio.current_holdings['cash'] + value.sum())
+        weights = np.zeros(len(cross_section.symbols))
+        if len(ranked):
+            weights[ranked] = max(0.0, 1.0 - locked) / len(ranked)
+        weights[~cross_section.tradable] = np.nan
+        return weights
+
+
+if __name__ == '__main__':
+    from backtester.data import AKShareDataHandler
+    from backtester.portfolio import NaivePortfolio
+    from backtester.execution import SimulateExecutionHandler
+    from backtester.core import backtest
+
+    start_date = '20200101'  # 设置回测开始日期
+    end_date = '20210201'  # 设置回测结束日期
+    my_data = AKShareDataHandler(symbol_list=['000001', '600000', '600036', '000002', '601318'],
+                                 start_date=start_date, end_date=end_date)
+    my_portfolio = NaivePortfolio(data=my_data, strategy_name='king', initial_capital=2000000, lot_size=100)
+    my_strategy = MomentumStrategy(data=my_data, portfolio=my_portfolio, lookback=20, top=2)
+    my_portfolio.strategy_name = my_strategy.name
+    my_broker = SimulateExecutionHandler()
+
+    df = backtest(my_data, my_portfolio, my_strategy, my_broker)
@@ -0,0 +1,25 @@
+import asyncio
+
+from backtester.live import LiveDataHandler, LiveRuntime
+from backtester.paper import BrokerConnection, PaperBrokerServer, RemoteExecutionHandler, TCPFeed
+from backtester.portfolio import NaivePortfolio
+from backtester.synthetic import generate_bar_store
+from examples.ma import MAStrategy
+
+
+# 离线模拟盘：本地启动模拟经纪端回放合成K线，策略通过 TCP 接收行情、下单并接收成交回报
+async def main(interval: float = 0.01):
+    store = generate_bar_store(n_symbols=5, n_bars=250, seed=1)
+    async with PaperBrokerServer(store, interval=interval) as server:
+        connection = BrokerConnection(port=server.port)
+        my_data = LiveDataHandler(store.symbols, max_history=500)
+        my_portfolio = NaivePortfolio(data=my_data, strategy_name='paper', initial_capital=2000000)
+        my_strategy = MAStrategy(data=my_data, portfolio=my_portfolio, short_period=5, long_period=20)
+        my_broker = RemoteExecutionHandler(connection)
+
+        runtime = LiveRuntime(my_data, my_portfolio, my_strategy, my_broker, TCPFeed(connection), verbose=True)
+        return await runtime.run()
+
+
+if __name__ == '__main__':
+    print(asyncio.run(main()))
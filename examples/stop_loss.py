@@ -1,9 +1,31 @@
 import math
 
+import numpy as np
+
 from backtester.event import SignalEvent, SignalType, EventType
 from backtester.strategy import Strategy
 
 
+# StopLossStrategy.calculate_signals 的逐K线内核版本，供 kernel_backtest 使用；
+# state 每个品种两列：是否持仓（0/1）和当前止损价，params[0] 为止损比例
+def stop_loss_kernel(t, close, previous, cash, position, state, params, orders):
+    stop_loss_percentage = params[0]
+    for j in range(len(close)):
+        latest_close = close[j]
+        if np.isnan(latest_close):
+            continue
+        if state[j, 0] == 0.0 and latest_close > state[j, 1] / stop_loss_percentage:
+            orders[j] = math.floor(cash / latest_close)
+            state[j, 0] = 1.0
+            state[j, 1] = stop_loss_percentage * latest_close
+        elif state[j, 0] == 1.0:
+            if latest_close <= state[j, 1]:
+                orders[j] = -math.trunc(position[j])
+                state[j, 0] = 0.0
+            elif latest_close > previous[j] and stop_loss_percentage * latest_close > state[j, 1]:
+                state[j, 1] = stop_loss_percentage * latest_close
+
+
 class StopLossStrategy(Strategy):
     def __init__(self, data, portfolio, stop_loss_percentage):
         self.data = data
@@ -29,6 +51,12 @@ class StopLossStrategy(Strategy):
 
         return stop_loss
 
+    def bar_kernel(self):
+        state = np.empty((len(self.symbol_list), 2))
+        state[:, 0] = [self.bought[symbol] for symbol in self.symbol_list]
+        state[:, 1] = [self.stop_loss[symbol] for symbol in self.symbol_list]
+        return stop_loss_kernel, np.array([self.stop_loss_percentage], dtype=np.float64), state
+
     def calculate_signals(self, event):
         if event.type == EventType.MARKET:
             for symbol in self.symbol_list:
@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from backtester.barfile import META_FILE, BarFileWriter, open_bar_file, write_bar_store
+from backtester.synthetic import generate_bar_store
+
+
+def test_round_trip(tmp_path):
+    store = generate_bar_store(n_symbols=3, n_bars=40, seed=0)
+    write_bar_store(str(tmp_path), store)
+    opened = open_bar_file(str(tmp_path))
+    assert opened.symbols == store.symbols
+    for field, column in store.columns.items():
+        assert (opened.columns[field] == column).all()
+
+
+def test_failed_write_is_not_complete(tmp_path):
+    store = generate_bar_store(n_symbols=2, n_bars=40, seed=0)
+    path = str(tmp_path)
+    write_bar_store(path, store)
+
+    # 覆盖一个已完成的文件，写入中途抛出异常：不能留下 meta.json
+    with pytest.raises(RuntimeError):
+        with BarFileWriter(path, store.fields) as writer:
+            writer.append(store.symbols[0], store.frame(store.symbols[0]))
+            raise RuntimeError("interrupted")
+    assert not os.path.exists(os.path.join(path, META_FILE))
+    with pytest.raises(FileNotFoundError):
+        open_bar_file(path)
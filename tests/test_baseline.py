@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.baseline import Benchmark, clear_benchmark_cache
+from backtester.cache import BarCache
+from backtester.fetcher import LocalFetcher
+
+INDEX = pd.DataFrame({'open': 1.0, 'high': 1.0, 'low': 1.0, 'close': [100.0, 102.0, 101.0, 105.0, 110.0],
+                      'volume': 1.0},
+                     index=pd.to_datetime(['2021-01-04', '2021-01-06', '2021-01-07', '2021-01-11', '2021-01-12']))
+
+
+@pytest.fixture(autouse=True)
+def _clear_loaded():
+    clear_benchmark_cache()
+    yield
+    clear_benchmark_cache()
+
+
+def test_align_carries_last_level_over_missing_days():
+    benchmark = Benchmark('idx', series=INDEX['close'])
+    calendar = pd.to_datetime(['2021-01-05', '2021-01-06', '2021-01-08', '2021-01-11', '2021-01-13'])
+    aligned = benchmark.align(calendar)
+
+    # 回测首日之前的点位（预热区间内）也会沿用；指数没有数据的日期沿用上一个点位
+    assert aligned.index.equals(pd.DatetimeIndex(calendar))
+    np.testing.assert_allclose(aligned.to_numpy(), [100.0, 102.0, 101.0, 105.0, 110.0])
+    np.testing.assert_allclose(benchmark.normalized(calendar).to_numpy(), [1.0, 1.02, 1.01, 1.05, 1.1])
+    np.testing.assert_allclose(benchmark.returns(calendar).to_numpy(), [np.nan, 0.02, 101 / 102 - 1, 105 / 101 - 1,
+                                                                        110 / 105 - 1])
+
+
+def test_align_before_first_level_and_duplicates():
+    series = pd.concat([INDEX['close'], pd.Series([111.0], index=pd.to_datetime(['2021-01-12']))])
+    benchmark = Benchmark('idx', series=series)
+    calendar = pd.to_datetime(['2020-12-01', '2021-01-04', '2021-01-12'])
+    aligned = benchmark.align(calendar)
+
+    # 重复日期取最后一个点位；在所有点位之前的K线为 NaN，归一化以第一个有效点位为 1
+    np.testing.assert_allclose(aligned.to_numpy(), [np.nan, 100.0, 111.0])
+    np.testing.assert_allclose(benchmark.normalized(calendar).to_numpy(), [np.nan, 1.0, 1.11])
+    assert len(benchmark.align(pd.DatetimeIndex([]))) == 0
+
+
+@pytest.mark.parametrize('use_cache', [False, True])
+def test_align_loads_each_range_once(tmp_path, use_cache):
+    fetcher = LocalFetcher({'idx': INDEX})
+    cache = BarCache(str(tmp_path)) if use_cache else None
+    calendar = pd.to_datetime(['2021-01-05', '2021-01-07', '2021-01-12'])
+    benchmark = Benchmark('idx', cache=cache, fetcher=fetcher)
+
+    aligned = benchmark.align(calendar)
+    assert benchmark.align(pd.DatetimeIndex(list(calendar))) is aligned
+    np.testing.assert_allclose(aligned.to_numpy(), [100.0, 101.0, 110.0])
+    # 同一区间的点位在进程内共享，另一个 Benchmark 实例不再取数
+    Benchmark('idx', cache=cache, fetcher=fetcher).align(calendar)
+    assert len(fetcher.calls) == 1
+
+    # 换一个日历对应另一个区间，清空进程内缓存后也要重新加载；有 BarCache 时都从本地读取
+    np.testing.assert_allclose(benchmark.align(calendar[1:]).to_numpy(), [101.0, 110.0])
+    clear_benchmark_cache()
+    np.testing.assert_allclose(Benchmark('idx', cache=cache, fetcher=fetcher).align(calendar).to_numpy(),
+                               aligned.to_numpy())
+    assert len(fetcher.calls) == (1 if use_cache else 3)
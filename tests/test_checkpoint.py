@@ -0,0 +1,155 @@
+import os
+
+import pandas as pd
+import pytest
+
+from backtester.checkpoint import Checkpointer
+from backtester.core import backtest
+from backtester.data import ArrayDataHandler
+from backtester.exchange import PercentCommission, PercentSlippage, SimulatedExchange
+from backtester.portfolio import NaivePortfolio
+from backtester.synthetic import generate_bar_store
+from examples.ma import MAStrategy
+from examples.stop_loss import StopLossStrategy
+
+STORE = generate_bar_store(n_symbols=6, n_bars=300, gap_probability=0.02, suspension_probability=0.005,
+                           listing_spread=20, seed=5)
+
+
+class Crash(Exception):
+    pass
+
+
+def _build(strategy_cls, params):
+    data = ArrayDataHandler(STORE)
+    portfolio = NaivePortfolio(data=data, strategy_name='test', initial_capital=1e6, chunk_size=32, lot_size=100)
+    strategy = strategy_cls(data=data, portfolio=portfolio, **params)
+    broker = SimulatedExchange(data, slippage=PercentSlippage(0.001), commission=PercentCommission(),
+                               participation=0.01)
+    return data, portfolio, strategy, broker
+
+
+def _crash_at(portfolio, bar):
+    # 第 bar 根K线记账时中断回测，模拟进程被杀掉
+    update_time_index = portfolio.update_time_index
+    seen = [0]
+
+    def update(event):
+        seen[0] += 1
+        if seen[0] == bar:
+            raise Crash
+        update_time_index(event)
+    portfolio.update_time_index = update
+
+
+@pytest.mark.parametrize('strategy_cls, params', [
+    (MAStrategy, {'short_period': 5, 'long_period': 20}),
+    (StopLossStrategy, {'stop_loss_percentage': 0.95}),
+])
+def test_resume_matches_uninterrupted_run(tmp_path, strategy_cls, params):
+    data, portfolio, uninterrupted, broker = _build(strategy_cls, params)
+    expected = backtest(data, portfolio, uninterrupted, broker, verbose=False)
+    expected_fills = portfolio.create_fills_dataframe()
+
+    path = str(tmp_path)
+    data, portfolio, strategy, broker = _build(strategy_cls, params)
+    _crash_at(portfolio, 237)
+    with pytest.raises(Crash):
+        backtest(data, portfolio, strategy, broker, verbose=False, checkpoint=Checkpointer(path, every=50))
+
+    data, portfolio, strategy, broker = _build(strategy_cls, params)
+    result = backtest(data, portfolio, strategy, broker, verbose=False, checkpoint=Checkpointer(path, every=50),
+                      resume=True)
+    pd.testing.assert_frame_equal(result, expected)
+    pd.testing.assert_frame_equal(portfolio.create_fills_dataframe(), expected_fills)
+    assert len(expected_fills) > 0
+    if strategy_cls is MAStrategy:
+        for symbol in data.symbol_list:
+            pd.testing.assert_frame_equal(strategy.signals_dataframe(symbol), uninterrupted.signals_dataframe(symbol))
+
+
+def test_saves_append_only_new_records(tmp_path):
+    data, portfolio, strategy, _ = _build(MAStrategy, {'short_period': 5, 'long_period': 20})
+    broker = SimulatedExchange(data)  # 不限成交量，没有越积越多的挂单
+    checkpoint = Checkpointer(str(tmp_path), every=30)
+    state_sizes = []
+    journal_sizes = []
+    save = checkpoint.save
+
+    def record(*args):
+        save(*args)
+        state_sizes.append(os.path.getsize(os.path.join(checkpoint.path, 'state.pkl')))
+        journal_sizes.append(os.path.getsize(os.path.join(checkpoint.path, 'strategy.journal')))
+    checkpoint.save = record
+    backtest(data, portfolio, strategy, broker, verbose=False, checkpoint=checkpoint)
+
+    # 信号和成交写入只追加的日志，state.pkl 不随已运行的K线数增长
+    assert checkpoint.saves == len(state_sizes) == len(data.calendar) // 30
+    assert journal_sizes == sorted(journal_sizes) and journal_sizes[-1] > journal_sizes[0]
+    assert max(state_sizes) < 1.5 * min(state_sizes)
+
+
+def test_crash_during_save_discards_unrecorded_appends(tmp_path, monkeypatch):
+    data, portfolio, uninterrupted, broker = _build(MAStrategy, {'short_period': 5, 'long_period': 20})
+    expected = backtest(data, portfolio, uninterrupted, broker, verbose=False)
+    expected_fills = portfolio.create_fills_dataframe()
+
+    # 第 3 次保存时账本和日志已经追加，但在替换 state.pkl 之前进程被杀掉
+    replace = os.replace
+    calls = [0]
+
+    def crash_on_third(src, dst):
+        calls[0] += 1
+        if calls[0] == 3:
+            raise Crash
+        replace(src, dst)
+    monkeypatch.setattr('backtester.checkpoint.os.replace', crash_on_third)
+    path = str(tmp_path)
+    data, portfolio, strategy, broker = _build(MAStrategy, {'short_period': 5, 'long_period': 20})
+    with pytest.raises(Crash):
+        backtest(data, portfolio, strategy, broker, verbose=False, checkpoint=Checkpointer(path, every=40))
+    monkeypatch.setattr('backtester.checkpoint.os.replace', replace)
+    sizes = {name: os.path.getsize(os.path.join(path, name)) for name in ('timestamps.bin', 'strategy.journal')}
+
+    data, portfolio, strategy, broker = _build(MAStrategy, {'short_period': 5, 'long_period': 20})
+    checkpoint = Checkpointer(path, every=40)
+    result = backtest(data, portfolio, strategy, broker, verbose=False, checkpoint=checkpoint, resume=True)
+    pd.testing.assert_frame_equal(result, expected)
+    pd.testing.assert_frame_equal(portfolio.create_fills_dataframe(), expected_fills)
+    for symbol in data.symbol_list:
+        pd.testing.assert_frame_equal(strategy.signals_dataframe(symbol), uninterrupted.signals_dataframe(symbol))
+    # 恢复时截掉了未记录在 state.pkl 中的行和日志，之后的保存紧接着有效部分追加，
+    # 所以从最后一个检查点再次恢复仍与不中断的回测一致
+    assert all(os.path.getsize(os.path.join(path, name)) > size for name, size in sizes.items())
+    data, portfolio, strategy, broker = _build(MAStrategy, {'short_period': 5, 'long_period': 20})
+    result = backtest(data, portfolio, strategy, broker, verbose=False, checkpoint=Checkpointer(path, every=40),
+                      resume=True)
+    pd.testing.assert_frame_equal(result, expected)
+    pd.testing.assert_frame_equal(portfolio.create_fills_dataframe(), expected_fills)
+    for symbol in data.symbol_list:
+        pd.testing.assert_frame_equal(strategy.signals_dataframe(symbol), uninterrupted.signals_dataframe(symbol))
+
+
+def test_restore_rejects_other_versions(tmp_path, monkeypatch):
+    data, portfolio, strategy, broker = _build(MAStrategy, {'short_period': 5, 'long_period': 20})
+    monkeypatch.setattr('backtester.checkpoint.CHECKPOINT_VERSION', 1)
+    backtest(data, portfolio, strategy, broker, verbose=False, checkpoint=Checkpointer(str(tmp_path), every=100))
+    monkeypatch.undo()
+
+    data, portfolio, strategy, broker = _build(MAStrategy, {'short_period': 5, 'long_period': 20})
+    with pytest.raises(ValueError, match='version'):
+        backtest(data, portfolio, strategy, broker, verbose=False, checkpoint=Checkpointer(str(tmp_path)),
+                 resume=True)
+
+
+def test_clear_removes_checkpoint_files(tmp_path):
+    data, portfolio, strategy, broker = _build(MAStrategy, {'short_period': 5, 'long_period': 20})
+    checkpoint = Checkpointer(str(tmp_path), every=100)
+    backtest(data, portfolio, strategy, broker, verbose=False, checkpoint=checkpoint)
+    assert checkpoint.exists() and len(os.listdir(tmp_path)) == 6
+
+    checkpoint.clear()
+    assert not checkpoint.exists() and os.listdir(tmp_path) == []
+    assert checkpoint.saved_rows == 0
+    with pytest.raises(ValueError):
+        Checkpointer(str(tmp_path), every=0)
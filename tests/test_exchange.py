@@ -0,0 +1,114 @@
+import pandas as pd
+import pytest
+
+from backtester.bars import BarStore
+from backtester.data import ArrayDataHandler
+from backtester.event import OrderDirection, OrderEvent, OrderType
+from backtester.event_manager import EventBus
+from backtester.exchange import (FixedSlippage, NoCommission, PercentCommission, PercentSlippage, PerShareCommission,
+                                 SimulatedExchange)
+from backtester.portfolio import NaivePortfolio
+
+COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def _exchange(bars, **kwargs):
+    frame = pd.DataFrame(bars, columns=COLUMNS, index=pd.date_range('2021-01-04', periods=len(bars), freq='B'))
+    data = ArrayDataHandler(BarStore.from_frames({'A': frame}))
+    data.events = EventBus()
+    kwargs.setdefault('commission', NoCommission())
+    exchange = SimulatedExchange(data, **kwargs)
+    exchange.events = data.events
+    return data, exchange
+
+
+def _fills(data):
+    fills = []
+    while not data.events.empty():
+        fills.append(data.events.get())
+    return fills
+
+
+def _next_bar(data, exchange):
+    # 推进一根K线并让交易所撮合挂单，返回本根K线上的成交
+    data.update_latest_data()
+    exchange.on_market(data.events.get())
+    return _fills(data)
+
+
+def _order(exchange, order_type, quantity, direction, price=None):
+    exchange.execute_order(OrderEvent('A', order_type, quantity, direction, price))
+    return _fills(exchange.data)
+
+
+@pytest.mark.parametrize('open_, expected', [(9.5, 9.0), (8.8, 8.8)])
+def test_limit_order_rests_then_fills_at_limit_or_better(open_, expected):
+    data, exchange = _exchange([(10.0, 10.5, 9.5, 10.0, 1000),
+                                (9.8, 10.2, 9.6, 10.0, 1000),
+                                (open_, 9.6, 8.7, 9.2, 1000)])
+    assert _next_bar(data, exchange) == []
+    assert _order(exchange, OrderType.LIMIT, 100, OrderDirection.BUY, 9.0) == []
+
+    # 最低价 9.6 没有触及限价，订单继续挂着
+    assert _next_bar(data, exchange) == []
+    assert [order.remaining for order in exchange.open_orders('A')] == [100]
+
+    # 开盘价在限价之上按限价成交，跳空低开时按更优的开盘价成交
+    fill, = _next_bar(data, exchange)
+    assert (fill.direction, fill.quantity, fill.fill_cost) == (OrderDirection.BUY, 100, pytest.approx(expected))
+    assert fill.time_index == data.get_latest_datetime()
+    assert exchange.open_orders() == []
+
+
+@pytest.mark.parametrize('direction, trigger, gap_bar', [
+    (OrderDirection.SELL, 9.5, (9.0, 9.3, 8.8, 9.1, 1000)),
+    (OrderDirection.BUY, 10.5, (11.0, 11.4, 10.9, 11.2, 1000)),
+])
+def test_stop_order_gaps_through_trigger_at_open(direction, trigger, gap_bar):
+    data, exchange = _exchange([(10.0, 10.2, 9.8, 10.0, 1000), (10.0, 10.3, 9.7, 10.1, 1000), gap_bar])
+    _next_bar(data, exchange)
+    assert _order(exchange, OrderType.STOP, 50, direction, trigger) == []
+    assert _next_bar(data, exchange) == []
+
+    fill, = _next_bar(data, exchange)
+    assert (fill.direction, fill.quantity, fill.fill_cost) == (direction, 50, gap_bar[0])
+
+
+def test_participation_cap_carries_remainder_to_next_bars():
+    data, exchange = _exchange([(10.0, 10.5, 9.5, 10.0, 1000),
+                                (10.2, 10.6, 10.0, 10.4, 1000),
+                                (10.3, 10.8, 10.1, 10.5, 600)], participation=0.1)
+    _next_bar(data, exchange)
+
+    # 每根K线最多成交该K线成交量的 10%：当根按收盘价成交 100 股，其余留到后续K线按开盘价成交
+    fill, = _order(exchange, OrderType.MARKET, 250, OrderDirection.BUY)
+    assert (fill.quantity, fill.fill_cost) == (100, 10.0)
+    assert [order.remaining for order in exchange.open_orders('A')] == [150]
+
+    fill, = _next_bar(data, exchange)
+    assert (fill.quantity, fill.fill_cost) == (100, 10.2)
+
+    fill, = _next_bar(data, exchange)
+    assert (fill.quantity, fill.fill_cost) == (50, 10.3)
+    assert exchange.open_orders() == []
+
+
+@pytest.mark.parametrize('direction, slippage, commission, price, fee', [
+    (OrderDirection.BUY, PercentSlippage(0.01), PercentCommission(rate=0.001, minimum=1.0), 10.1, 1.01),
+    (OrderDirection.BUY, PercentSlippage(0.01), PercentCommission(rate=0.001, minimum=5.0), 10.1, 5.0),
+    (OrderDirection.SELL, FixedSlippage(0.05), PerShareCommission(cost=0.01), 9.95, 1.0),
+    (OrderDirection.SELL, PercentSlippage(0.01), PercentCommission(rate=0.001, minimum=0.0), 9.9, 0.99),
+])
+def test_slippage_and_commission_models(direction, slippage, commission, price, fee):
+    data, exchange = _exchange([(10.0, 10.5, 9.5, 10.0, 1000)], slippage=slippage, commission=commission)
+    portfolio = NaivePortfolio(data=data, strategy_name='test', initial_capital=10000.0)
+    _next_bar(data, exchange)
+
+    fill, = _order(exchange, OrderType.MARKET, 100, direction)
+    assert fill.fill_cost == pytest.approx(price)
+    assert fill.commission == pytest.approx(fee)
+    # 组合按含滑点的成交价和模型佣金结算
+    portfolio.update_fill(fill)
+    sign = 1 if direction == OrderDirection.BUY else -1
+    assert portfolio.current_holdings['cash'] == pytest.approx(10000.0 - sign * 100 * price - fee)
+    assert portfolio.current_holdings['commission'] == pytest.approx(fee)
@@ -0,0 +1,57 @@
+import gc
+
+import numpy as np
+
+from backtester.core import backtest
+from backtester.data import ArrayDataHandler
+from backtester.execution import SimulateExecutionHandler
+from backtester.experiments import ExperimentStore
+from backtester.portfolio import NaivePortfolio
+from backtester.synthetic import generate_bar_store
+from backtester.walkforward import store_fingerprint
+from examples.divide_conquer import DivideAndConquerStrategy
+from examples.hold import BuyAndHoldStrategy
+
+
+def test_data_version_follows_store_content(tmp_path):
+    # 依次创建并丢弃多个 BarStore：回收后新对象可能复用同一个 id，指纹必须按内容重新计算
+    with ExperimentStore(str(tmp_path)) as experiments:
+        for seed in range(16):
+            store = generate_bar_store(n_symbols=2, n_bars=50, seed=seed)
+            assert experiments.data_version(ArrayDataHandler(store)) == store_fingerprint(store)
+            del store
+            gc.collect()
+        assert len(experiments._fingerprints) == 0
+
+
+def test_run_hits_only_for_same_data(tmp_path):
+    with ExperimentStore(str(tmp_path)) as experiments:
+        curves = []
+        for seed in range(4):
+            data = ArrayDataHandler(generate_bar_store(n_symbols=2, n_bars=60, seed=seed))
+            first = experiments.run(data, BuyAndHoldStrategy, initial_capital=1e6)
+            assert not first.cached
+            second = experiments.run(data, BuyAndHoldStrategy, initial_capital=1e6)
+            assert second.cached
+            np.testing.assert_array_equal(first.equity_curve.to_numpy(), second.equity_curve.to_numpy())
+            curves.append(first.equity_curve['total'].to_numpy())
+            del data
+            gc.collect()
+        assert len(experiments) == 4
+        assert not any(np.array_equal(curves[0], curve) for curve in curves[1:])
+
+
+def test_run_follows_handler_configuration(tmp_path):
+    store = generate_bar_store(n_symbols=3, n_bars=120, gap_probability=0.1, seed=4)
+    with ExperimentStore(str(tmp_path)) as experiments:
+        for forward_fill in (True, False):
+            data = ArrayDataHandler(store, forward_fill=forward_fill, start='2020-02-03', end='2020-05-29')
+            experiment = experiments.run(data, DivideAndConquerStrategy, initial_capital=1e6)
+            assert not experiment.cached
+
+            data = ArrayDataHandler(store, forward_fill=forward_fill, start='2020-02-03', end='2020-05-29')
+            portfolio = NaivePortfolio(data=data, strategy_name='test', initial_capital=1e6)
+            strategy = DivideAndConquerStrategy(data=data, portfolio=portfolio)
+            expected = backtest(data, portfolio, strategy, SimulateExecutionHandler(), verbose=False)
+            np.testing.assert_allclose(experiment.equity_curve['total'].to_numpy(), expected['total'].to_numpy())
+        assert len(experiments) == 2
@@ -0,0 +1,44 @@
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+# 导入耗时预算：在全新的解释器中导入模块，预先导入 numpy/pandas 后该模块自身的累计导入耗时
+# （-X importtime）不超过预算，且没有顺带导入绘图、网络等重型依赖
+BUDGET_MS = 100.0
+HEAVY_MODULES = ['akshare', 'matplotlib', 'IPython', 'pyarrow', 'numba']
+
+_CHECK = """
+import json, sys
+import numpy, pandas
+import {module}
+print(json.dumps(sorted({{name.split('.')[0] for name in sys.modules}} & set({heavy!r}))))
+"""
+
+
+def _import(module: str):
+    # 返回 (模块的累计导入耗时（毫秒）, 被导入的重型依赖)
+    code = _CHECK.format(module=module, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            check=True)
+    cumulative = None
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1]) / 1e3
+    return cumulative, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize('module', ['backtester', 'backtester.core', 'backtester.sweep'])
+def test_import_within_budget(module):
+    runs = [_import(module) for _ in range(3)]
+    assert all(heavy == [] for _, heavy in runs)
+    assert np.median([milliseconds for milliseconds, _ in runs]) < BUDGET_MS
+
+
+@pytest.mark.parametrize('module', ['backtester.data', 'backtester.portfolio', 'backtester.walkforward',
+                                    'backtester.experiments', 'backtester.live'])
+def test_import_skips_heavy_dependencies(module):
+    assert _import(module)[1] == []
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.core import backtest
+from backtester.data import ArrayDataHandler
+from backtester.event_manager import EventBus
+from backtester.execution import SimulateExecutionHandler
+from backtester.indicators import ATR, EMA, SMA, Returns, RollingMax, RollingMean, RollingMin, RollingStd
+from backtester.portfolio import NaivePortfolio
+from backtester.synthetic import generate_bar_store
+from examples.divide_conquer import DivideAndConquerStrategy
+from examples.ma import MAStrategy
+
+
+def _series(n=300, nan_fraction=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    values = 10.0 * np.exp(np.cumsum(rng.normal(0.0, 0.02, n)))
+    values[rng.random(n) < nan_fraction] = np.nan
+    return pd.Series(values)
+
+
+def _stream(indicator, values):
+    return np.array([indicator.update(value) for value in values])
+
+
+@pytest.mark.parametrize('period', [1, 5, 20])
+def test_ema_matches_pandas(period):
+    values = _series(nan_fraction=0.0)
+    expected = values.ewm(span=period, min_periods=period, adjust=False).mean()
+    np.testing.assert_allclose(_stream(EMA(period), values), expected, rtol=1e-12, equal_nan=True)
+
+
+def test_ema_skips_missing_values():
+    values = _series()
+    expected = values.ewm(span=10, min_periods=10, adjust=False, ignore_na=True).mean()
+    np.testing.assert_allclose(_stream(EMA(10), values), expected, rtol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize('window, min_periods', [(1, None), (7, None), (20, 5), (6, 1)])
+def test_rolling_mean_matches_pandas(window, min_periods):
+    values = _series()
+    expected = values.rolling(window, min_periods=min_periods or window).mean()
+    np.testing.assert_allclose(_stream(RollingMean(window, min_periods), values), expected, rtol=1e-10,
+                               equal_nan=True)
+    assert SMA is RollingMean
+
+
+@pytest.mark.parametrize('window, min_periods, ddof', [(2, None, 1), (10, None, 1), (20, 5, 0), (30, 3, 1)])
+def test_rolling_std_matches_pandas(window, min_periods, ddof):
+    values = _series()
+    expected = values.rolling(window, min_periods=min_periods or window).std(ddof=ddof)
+    np.testing.assert_allclose(_stream(RollingStd(window, min_periods, ddof), values), expected, rtol=1e-8,
+                               atol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize('window, min_periods', [(1, None), (5, None), (20, 3)])
+def test_rolling_min_max_match_pandas(window, min_periods):
+    values = _series()
+    rolling = values.rolling(window, min_periods=min_periods or window)
+    np.testing.assert_array_equal(_stream(RollingMin(window, min_periods), values), rolling.min())
+    np.testing.assert_array_equal(_stream(RollingMax(window, min_periods), values), rolling.max())
+
+
+@pytest.mark.parametrize('period', [1, 3])
+def test_returns_match_pandas(period):
+    values = _series(nan_fraction=0.0)
+    np.testing.assert_allclose(_stream(Returns(period), values), values.pct_change(period), rtol=1e-12,
+                               equal_nan=True)
+
+
+def test_atr_matches_wilder_smoothing():
+    frame = generate_bar_store(n_symbols=1, n_bars=200, seed=3).frame('000000')
+    period = 14
+    previous_close = frame['close'].shift(1)
+    true_range = pd.concat([frame['high'] - frame['low'], (frame['high'] - previous_close).abs(),
+                            (frame['low'] - previous_close).abs()], axis=1).max(axis=1)
+    # 第 period 根为前 period 根真实波幅的均值，之后等价于 alpha = 1 / period 的指数平滑
+    seeded = true_range.copy()
+    seeded.iloc[:period] = np.nan
+    seeded.iloc[period - 1] = true_range.iloc[:period].mean()
+    expected = seeded.ewm(alpha=1.0 / period, adjust=False, ignore_na=True).mean()
+
+    atr = ATR(period)
+    result = np.array([atr.update_ohlc(high, low, close)
+                       for high, low, close in zip(frame['high'], frame['low'], frame['close'])])
+    np.testing.assert_allclose(result, expected, rtol=1e-12, equal_nan=True)
+
+
+def _replay(data):
+    # 逐根推进数据处理器，给出每根K线上有数据的品种
+    data.events = EventBus()
+    while True:
+        data.update_latest_data()
+        if not data.continue_backtest:
+            return
+        for symbol in data.symbol_list:
+            window = data.get_latest_data(symbol, num=1)
+            if window is not None and len(window) > 0:
+                yield symbol
+
+
+def _gappy_store():
+    return generate_bar_store(n_symbols=4, n_bars=250, gap_probability=0.1, suspension_probability=0.01,
+                              listing_spread=20, seed=7)
+
+
+def test_ma_strategy_matches_dataframe_computation():
+    # 移植前的 MAStrategy：每根K线对全部历史重新计算 ewm，历史不少于 long_period 根时取最后一个值
+    data = ArrayDataHandler(_gappy_store())
+    strategy = MAStrategy(data=data, portfolio=None, short_period=5, long_period=20)
+    short_name, long_name = strategy.indicator_names
+    checked = 0
+    for symbol in _replay(data):
+        close = data.get_latest_data(symbol, num=-1).to_frame()['close']
+        short = data.get_indicator(symbol, short_name).value
+        long = data.get_indicator(symbol, long_name).value
+        if len(close) >= strategy.long_period:
+            expected_short = close.ewm(span=5, min_periods=5, adjust=False).mean().iloc[-1]
+            expected_long = close.ewm(span=20, min_periods=20, adjust=False).mean().iloc[-1]
+            assert short == pytest.approx(expected_short, rel=1e-12)
+            assert long == pytest.approx(expected_long, rel=1e-12)
+            checked += 1
+        else:
+            assert np.isnan(long)
+    assert checked > 0
+
+
+def test_ma_strategy_signals_match_dataframe_computation():
+    store = _gappy_store()
+    # 参照：移植前的判断逻辑，均线由 DataFrame 重新计算
+    data = ArrayDataHandler(store)
+    bought = {symbol: False for symbol in data.symbol_list}
+    expected = {symbol: [] for symbol in data.symbol_list}
+    for symbol in _replay(data):
+        bars = data.get_latest_data(symbol, num=-1).to_frame()
+        if len(bars) < 20:
+            continue
+        short = bars['close'].ewm(span=5, min_periods=5, adjust=False).mean().iloc[-1]
+        long = bars['close'].ewm(span=20, min_periods=20, adjust=False).mean().iloc[-1]
+        if (not bought[symbol] and short > long) or (bought[symbol] and short < long):
+            bought[symbol] = not bought[symbol]
+            expected[symbol].append(bars.index[-1])
+
+    data = ArrayDataHandler(store)
+    portfolio = NaivePortfolio(data=data, strategy_name='ma', initial_capital=1e6)
+    strategy = MAStrategy(data=data, portfolio=portfolio, short_period=5, long_period=20)
+    backtest(data, portfolio, strategy, SimulateExecutionHandler(), verbose=False)
+    # 开仓和平仓交替出现，逐个品种比较每次交易信号所在K线的日期
+    for symbol in data.symbol_list:
+        signals = strategy.signals_dataframe(symbol).dropna(subset=['signal'])
+        assert list(pd.to_datetime(signals['date'])) == expected[symbol]
+    assert any(expected.values())
+
+
+def test_divide_and_conquer_matches_dataframe_computation():
+    # 移植前的 DivideAndConquerStrategy：最近 7 根K线 pct_change().mean()
+    data = ArrayDataHandler(_gappy_store())
+    DivideAndConquerStrategy(data=data, portfolio=None)
+    checked = 0
+    for symbol in _replay(data):
+        close = data.get_latest_data(symbol, num=7).to_frame()['close']
+        expected = close.pct_change().mean()
+        value = data.get_indicator(symbol, 'mean_return_7').value
+        if np.isnan(expected):
+            assert np.isnan(value)
+        else:
+            assert value == pytest.approx(expected, rel=1e-10, abs=1e-15)
+            checked += 1
+    assert checked > 0
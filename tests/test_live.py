@@ -0,0 +1,82 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from backtester.core import backtest
+from backtester.data import ArrayDataHandler
+from backtester.exchange import PercentCommission, PercentSlippage, SimulatedExchange
+from backtester.execution import SimulateExecutionHandler
+from backtester.live import LiveDataHandler, LiveRuntime, ReplayFeed
+from backtester.paper import BrokerConnection, PaperBrokerServer, RemoteExecutionHandler, TCPFeed
+from backtester.portfolio import NaivePortfolio
+from backtester.synthetic import generate_bar_store
+from examples.ma import MAStrategy
+from examples.stop_loss import StopLossStrategy
+
+STORE = generate_bar_store(n_symbols=4, n_bars=200, gap_probability=0.05, listing_spread=10, seed=3)
+STRATEGIES = [
+    (MAStrategy, {'short_period': 5, 'long_period': 20}),
+    (StopLossStrategy, {'stop_loss_percentage': 0.95}),
+]
+
+
+def _exchange(data, participation=None):
+    return SimulatedExchange(data, slippage=PercentSlippage(0.001), commission=PercentCommission(),
+                             participation=participation)
+
+
+def _backtest(strategy_cls, params, broker_factory, forward_fill=True):
+    data = ArrayDataHandler(STORE, forward_fill=forward_fill)
+    portfolio = NaivePortfolio(data=data, strategy_name='test', initial_capital=1e6)
+    strategy = strategy_cls(data=data, portfolio=portfolio, **params)
+    equity_curve = backtest(data, portfolio, strategy, broker_factory(data), verbose=False)
+    return equity_curve, portfolio.create_fills_dataframe()
+
+
+@pytest.mark.parametrize('strategy_cls, params', STRATEGIES)
+@pytest.mark.parametrize('broker_factory', [
+    lambda data: SimulateExecutionHandler(),
+    lambda data: _exchange(data, participation=0.05),
+])
+@pytest.mark.parametrize('forward_fill', [True, False])
+def test_lockstep_replay_matches_backtest(strategy_cls, params, broker_factory, forward_fill):
+    expected, expected_fills = _backtest(strategy_cls, params, broker_factory, forward_fill)
+
+    # 容量很小的 LiveDataHandler，回放过程中多次扩容
+    data = LiveDataHandler(STORE.symbols, forward_fill=forward_fill, capacity=16)
+    portfolio = NaivePortfolio(data=data, strategy_name='test', initial_capital=1e6)
+    strategy = strategy_cls(data=data, portfolio=portfolio, **params)
+    runtime = LiveRuntime(data, portfolio, strategy, broker_factory(data), ReplayFeed(ArrayDataHandler(STORE)))
+    result = asyncio.run(runtime.run())
+
+    pd.testing.assert_frame_equal(result, expected)
+    pd.testing.assert_frame_equal(portfolio.create_fills_dataframe(), expected_fills)
+    assert runtime.bars == len(expected)
+
+
+async def _paper_run(strategy_cls, params):
+    async with PaperBrokerServer(STORE, exchange_factory=_exchange) as server:
+        connection = BrokerConnection(port=server.port)
+        data = LiveDataHandler(STORE.symbols)
+        portfolio = NaivePortfolio(data=data, strategy_name='test', initial_capital=1e6)
+        strategy = strategy_cls(data=data, portfolio=portfolio, **params)
+        broker = RemoteExecutionHandler(connection)
+        runtime = LiveRuntime(data, portfolio, strategy, broker, TCPFeed(connection))
+        result = await asyncio.wait_for(runtime.run(), timeout=60)
+        return result, portfolio.create_fills_dataframe(), runtime, broker
+
+
+@pytest.mark.parametrize('strategy_cls, params', STRATEGIES)
+def test_paper_broker_loopback_matches_backtest(strategy_cls, params):
+    # 不限成交量：订单在下单所在K线全部成交，回报在下一根K线之前到达，结果与回测一致。
+    # 有剩余挂单时远程回报晚于本地，在后续K线上的下单会看到不同的持仓
+    expected, expected_fills = _backtest(strategy_cls, params, _exchange)
+    result, fills, runtime, broker = asyncio.run(_paper_run(strategy_cls, params))
+
+    pd.testing.assert_frame_equal(result, expected)
+    pd.testing.assert_frame_equal(fills, expected_fills)
+    assert len(fills) > 0
+    assert runtime.report.orders > 0
+    assert broker.pending == 0
+    assert len(broker.latencies()['order_round_trip']) == runtime.report.orders
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.bars import BarStore
+from backtester.data import ArrayDataHandler
+from backtester.event import FillBatchEvent
+from backtester.event_manager import EventBus
+from backtester.ledger import Ledger
+from backtester.portfolio import NaivePortfolio
+
+
+def _late_listing_store():
+    # B 在第三个交易日才上市
+    dates = pd.date_range('2021-01-04', periods=5, freq='B')
+    frames = {'A': pd.DataFrame({'close': [10.0, 11.0, 12.0, 13.0, 14.0]}, index=dates),
+              'B': pd.DataFrame({'close': [20.0, 21.0, 22.0]}, index=dates[2:])}
+    return BarStore.from_frames(frames)
+
+
+def test_batch_fill_skips_symbols_without_price():
+    data = ArrayDataHandler(_late_listing_store())
+    data.events = EventBus()
+    portfolio = NaivePortfolio(data=data, strategy_name='test', initial_capital=1000.0)
+    data.update_latest_data()
+
+    quantities = np.array([10.0, 5.0])
+    portfolio.update_fill(FillBatchEvent(data.get_latest_datetime(), data.symbol_list, 'ARCA', quantities,
+                                         np.zeros(2), np.array([1.0, 1.0])))
+
+    assert portfolio.current_positions['A'] == 10.0
+    assert portfolio.current_positions['B'] == 0.0
+    assert portfolio.current_holdings['A'] == pytest.approx(100.0)
+    assert portfolio.current_holdings['B'] == 0.0
+    assert portfolio.current_holdings['cash'] == pytest.approx(1000.0 - 100.0 - 1.0)
+    assert portfolio.current_holdings['commission'] == pytest.approx(1.0)
+    assert [fill[1] for fill in portfolio.all_fills] == ['A']
+
+    # 账本按持仓和价格估值，与现金合计后等于扣除佣金后的初始资金
+    portfolio.update_time_index(None)
+    curve = portfolio.ledger.totals_dataframe()
+    assert curve['total'].iloc[-1] == pytest.approx(1000.0 - 1.0)
+
+
+def test_ledger_grows_geometrically_and_keeps_rows():
+    ledger = Ledger(['A', 'B'], chunk_size=4)
+    dates = pd.date_range('2020-01-01', periods=100, freq='D')
+    capacities = set()
+    for i, date in enumerate(dates):
+        ledger.append(date, np.array([i, -i], dtype=np.float64), np.array([2.0, np.nan]), 100.0 - i, float(i))
+        capacities.add(len(ledger.timestamps))
+    # 容量每次翻倍：4, 8, ..., 128
+    assert sorted(capacities) == [4 * 2 ** k for k in range(6)]
+
+    positions = ledger.positions_dataframe()
+    totals = ledger.totals_dataframe()
+    assert positions.index.equals(pd.DatetimeIndex(dates, name='datetime'))
+    np.testing.assert_array_equal(positions['B'], -np.arange(100))
+    np.testing.assert_allclose(totals['total'], 100.0 - np.arange(100) + 2.0 * np.arange(100))
+
+    restored = Ledger(['A', 'B'], chunk_size=4)
+    restored.load(ledger.timestamps[:100], ledger.positions[:100], ledger.holdings[:100])
+    assert len(restored.timestamps) >= 100
+    pd.testing.assert_frame_equal(restored.totals_dataframe(), totals)
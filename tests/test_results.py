@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.core import backtest
+from backtester.data import ArrayDataHandler
+from backtester.exchange import PercentCommission, PercentSlippage, SimulatedExchange
+from backtester.performance import calculate_summary_metrics
+from backtester.portfolio import NaivePortfolio
+from backtester.results import ResultReader, ResultWriter
+from backtester.synthetic import generate_bar_store
+from examples.stop_loss import StopLossStrategy
+
+STORE = generate_bar_store(n_symbols=4, n_bars=260, gap_probability=0.05, listing_spread=15, seed=8)
+
+
+def _run(writer=None, chunk_size=4096):
+    data = ArrayDataHandler(STORE)
+    portfolio = NaivePortfolio(data=data, strategy_name='test', initial_capital=1e6, chunk_size=chunk_size,
+                               writer=writer)
+    strategy = StopLossStrategy(data=data, portfolio=portfolio, stop_loss_percentage=0.95)
+    broker = SimulatedExchange(data, slippage=PercentSlippage(0.001), commission=PercentCommission())
+    return backtest(data, portfolio, strategy, broker, verbose=False), portfolio
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 50])
+def test_streamed_run_matches_in_memory_run(tmp_path, chunk_size):
+    expected, portfolio = _run()
+    expected_positions = portfolio.create_positions_dataframe()
+    expected_fills = portfolio.create_fills_dataframe()
+
+    # 账本每 chunk_size 行写出一块，结果分散在多个分块文件中
+    results, _ = _run(ResultWriter(str(tmp_path), format='csv', chunk_size=5), chunk_size=chunk_size)
+    assert isinstance(results, ResultReader)
+    assert len(results.parts('equity')) == -(-len(expected) // chunk_size)
+    assert len(results.parts('fills')) > 1
+
+    # 流式输出只写现金/佣金/总值三列，不含逐标的市值
+    curve = results.equity_curve()
+    pd.testing.assert_frame_equal(curve, expected[curve.columns], check_freq=False)
+    pd.testing.assert_frame_equal(results.positions(), expected_positions, check_freq=False)
+    pd.testing.assert_frame_equal(results.fills(), expected_fills)
+    assert results.summary_metrics() == pytest.approx(calculate_summary_metrics(expected), nan_ok=True)
+
+
+def _write_equity(path, totals, chunk_size):
+    index = pd.date_range('2020-01-01', periods=len(totals), freq='D', name='datetime')
+    frame = pd.DataFrame({'total': np.asarray(totals, dtype=np.float64)}, index=index)
+    with ResultWriter(path, format='csv') as writer:
+        for start in range(0, len(frame), chunk_size):
+            writer.write_frame('equity', frame.iloc[start:start + chunk_size].reset_index())
+    return ResultReader(path)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 10])
+def test_summary_metrics_merge_across_chunks(tmp_path, chunk_size):
+    # 回撤跨越多个分块才创出新高，均值/方差按块合并
+    rng = np.random.default_rng(0)
+    totals = 100.0 * np.cumprod(1.0 + rng.normal(0.0, 0.02, size=40))
+    totals[12:30] = np.linspace(totals[11] * 0.9, totals[11] * 0.95, 18)
+    reader = _write_equity(str(tmp_path), totals, chunk_size)
+    expected = reader.equity_curve()
+
+    assert len(reader.parts('equity')) == -(-len(totals) // chunk_size)
+    assert reader.summary_metrics() == pytest.approx(calculate_summary_metrics(expected), nan_ok=True)
+    assert reader.summary_metrics(periods=12)['Sharpe Ratio'] == \
+        pytest.approx(calculate_summary_metrics(expected)['Sharpe Ratio'] * np.sqrt(12 / 252))
+
+
+def test_equity_chunks_continue_returns_and_growth(tmp_path):
+    totals = [100.0, 110.0, 99.0, 121.0, 121.0]
+    reader = _write_equity(str(tmp_path), totals, 2)
+    curve = reader.equity_curve()
+
+    np.testing.assert_allclose(curve['returns'].to_numpy(), [np.nan, 0.1, -0.1, 121 / 99 - 1, 0.0])
+    np.testing.assert_allclose(curve['equity_curve'].to_numpy(), [np.nan, 1.1, 0.99, 1.21, 1.21])
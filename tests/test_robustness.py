@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.core import backtest
+from backtester.data import ArrayDataHandler
+from backtester.exchange import SimulatedExchange
+from backtester.performance import calculate_max_drawdown_pct, calculate_sharpe_ratio, calculate_trade_pnl
+from backtester.portfolio import NaivePortfolio
+from backtester.robustness import (METRICS, bootstrap_returns, observed_metrics, robustness_report,
+                                   shuffled_trades, simulate)
+from backtester.synthetic import generate_bar_store
+from examples.ma import MAStrategy
+
+RETURNS = np.random.default_rng(1).normal(0.0005, 0.01, size=120)
+
+
+@pytest.fixture(scope='module')
+def result():
+    data = ArrayDataHandler(generate_bar_store(n_symbols=3, n_bars=250, seed=2))
+    portfolio = NaivePortfolio(data=data, strategy_name='test', initial_capital=1e6)
+    strategy = MAStrategy(data=data, portfolio=portfolio, short_period=5, long_period=20)
+    equity_curve = backtest(data, portfolio, strategy, SimulatedExchange(data), verbose=False)
+    return equity_curve, portfolio.create_fills_dataframe()
+
+
+def test_bootstrap_blocks_wrap_around():
+    paths = bootstrap_returns(RETURNS, 50, len(RETURNS), np.random.default_rng(0))
+    # 一块覆盖整段收益时，每条路径都是原序列的一个循环移位
+    assert paths.shape == (len(RETURNS), 50)
+    for path in paths.T:
+        shift = int(np.flatnonzero(RETURNS == path[0])[0])
+        np.testing.assert_array_equal(path, np.roll(RETURNS, -shift))
+
+
+def test_shuffled_trades_keep_total_pnl():
+    pnl = np.array([500.0, -300.0, 1200.0, -800.0, 250.0])
+    returns = shuffled_trades(pnl, 40, 10000.0, np.random.default_rng(0))
+    equity = 10000.0 * np.cumprod(1.0 + returns, axis=0)
+    np.testing.assert_allclose(equity[-1], 10000.0 + pnl.sum())
+    # 每条路径的逐笔盈亏是原盈亏的一个排列
+    path_pnl = np.diff(np.vstack([np.full((1, 40), 10000.0), equity]), axis=0)
+    np.testing.assert_allclose(np.sort(path_pnl, axis=0), np.sort(np.tile(pnl[:, None], (1, 40)), axis=0))
+    assert len({tuple(np.round(path)) for path in path_pnl.T}) > 1
+
+
+def test_noise_free_paths_match_observed_metrics():
+    equity_curve = pd.DataFrame({'returns': np.concatenate([[np.nan], RETURNS])})
+    paths = simulate(equity_curve, method='noise', n_paths=10, noise_scale=0.0, seed=0)
+    observed = observed_metrics(equity_curve)
+    for metric in METRICS:
+        np.testing.assert_allclose(paths[metric], observed[metric])
+    # 与 performance 中的单条曲线口径一致
+    equity = np.concatenate([[1.0], np.cumprod(1.0 + RETURNS)])
+    assert observed['Sharpe Ratio'] == pytest.approx(calculate_sharpe_ratio(RETURNS))
+    assert observed['Max Drawdown %'] == pytest.approx(calculate_max_drawdown_pct(equity))
+    assert observed['Total Return'] == pytest.approx(equity[-1] - 1.0)
+
+
+@pytest.mark.parametrize('method', ['bootstrap', 'noise', 'shuffle'])
+def test_simulate_is_reproducible_across_workers(result, method):
+    equity_curve, fills = result
+    kwargs = dict(method=method, n_paths=300, chunk_size=64, seed=7, initial_capital=1e6)
+    serial = simulate(equity_curve, fills, max_workers=1, **kwargs)
+    parallel = simulate(equity_curve, fills, max_workers=2, **kwargs)
+
+    assert list(serial.columns) == METRICS and len(serial) == 300
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert not serial.equals(simulate(equity_curve, fills, max_workers=1, **dict(kwargs, seed=8)))
+    if method == 'shuffle':
+        total = calculate_trade_pnl(fills)['pnl'].sum() / 1e6
+        np.testing.assert_allclose(serial['Total Return'], total)
+
+
+def test_report_covers_methods_and_observed_percentile(result):
+    equity_curve, fills = result
+    report = robustness_report(equity_curve, fills, initial_capital=1e6, n_paths=200, seed=0)
+    assert report.index.names == ['method', 'metric']
+    assert list(report.index) == [(method, metric) for method in ('bootstrap', 'noise', 'shuffle')
+                                  for metric in METRICS]
+    assert ((report['percentile'] >= 0) & (report['percentile'] <= 1)).all()
+    assert (report['5%'] <= report['95%']).all()
+
+    # 没有成交记录时跳过交易重排
+    report = robustness_report(equity_curve, n_paths=50, seed=0)
+    assert list(report.index.get_level_values('method').unique()) == ['bootstrap', 'noise']
+
+
+def test_simulate_rejects_missing_inputs(result):
+    equity_curve, _ = result
+    with pytest.raises(ValueError):
+        simulate(equity_curve, method='jackknife')
+    with pytest.raises(ValueError):
+        simulate(equity_curve, method='shuffle')
+    with pytest.raises(ValueError):
+        simulate(method='bootstrap')
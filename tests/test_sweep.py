@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from backtester.core import backtest
+from backtester.data import ArrayDataHandler
+from backtester.execution import SimulateExecutionHandler
+from backtester.performance import calculate_summary_metrics
+from backtester.portfolio import NaivePortfolio
+from backtester.sweep import run_sweep
+from backtester.synthetic import generate_bar_store
+from examples.hold import BuyAndHoldStrategy
+from examples.ma import MAStrategy
+
+
+class FailingStrategy(BuyAndHoldStrategy):
+    def __init__(self, data, portfolio, fail=False):
+        if fail:
+            raise ValueError('bad params')
+        super().__init__(data, portfolio)
+
+
+class SlowStrategy(BuyAndHoldStrategy):
+    def __init__(self, data, portfolio, delay=0.0):
+        time.sleep(delay)
+        super().__init__(data, portfolio)
+
+
+def _data():
+    return ArrayDataHandler(generate_bar_store(n_symbols=2, n_bars=60, seed=0))
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_failing_run_keeps_other_results(max_workers):
+    result = run_sweep(_data(), FailingStrategy, {'fail': [False, True, False]}, initial_capital=1e6,
+                       max_workers=max_workers)
+    assert list(result.index) == [0, 1, 2]
+    assert 'bad params' in result.loc[1, 'error']
+    assert result.loc[[0, 2], 'error'].isna().all()
+    assert result.loc[[0, 2], 'Total Return'].notna().all()
+
+
+def test_stop_event_does_not_wait_for_running_tasks():
+    stop_event = threading.Event()
+    threading.Timer(1.0, stop_event.set).start()
+    # 第一个任务很快完成，其余任务各需 60 秒：停止后应立即返回已完成的结果
+    started = time.monotonic()
+    result = run_sweep(_data(), SlowStrategy, {'delay': [0.0, 60.0, 60.0, 60.0]}, initial_capital=1e6,
+                       max_workers=2, stop_event=stop_event)
+    assert time.monotonic() - started < 30.0
+    assert list(result.index) == [0]
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_sweep_uses_handler_window_and_fill(max_workers):
+    store = generate_bar_store(n_symbols=3, n_bars=200, gap_probability=0.1, seed=2)
+
+    def restricted():
+        return ArrayDataHandler(store, forward_fill=False, start='2020-03-02', end='2020-06-30')
+
+    result = run_sweep(restricted(), MAStrategy, {'short_period': [3, 5], 'long_period': [15]}, initial_capital=1e6,
+                       max_workers=max_workers)
+    for run, params in enumerate([{'short_period': 3}, {'short_period': 5}]):
+        data = restricted()
+        portfolio = NaivePortfolio(data=data, strategy_name='test', initial_capital=1e6)
+        strategy = MAStrategy(data=data, portfolio=portfolio, long_period=15, **params)
+        expected = calculate_summary_metrics(backtest(data, portfolio, strategy, SimulateExecutionHandler(),
+                                                      verbose=False))
+        for name, value in expected.items():
+            assert result.loc[run, name] == pytest.approx(value, nan_ok=True)
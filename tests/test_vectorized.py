@@ -0,0 +1,63 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.core import backtest, kernel_backtest, vectorized_backtest
+from backtester.data import ArrayDataHandler
+from backtester.exchange import IBCommission, SimulatedExchange
+from backtester.execution import SimulateExecutionHandler
+from backtester.portfolio import NaivePortfolio
+from backtester.synthetic import generate_bar_store
+from examples.hold import BuyAndHoldStrategy
+from examples.ma import MAStrategy
+from examples.stop_loss import StopLossStrategy
+
+
+@pytest.mark.parametrize('forward_fill', [True, False])
+@pytest.mark.parametrize('strategy_cls, params, gaps', [
+    (BuyAndHoldStrategy, {}, 0.1),
+    # 事件引擎的均线按各品种自身的K线计算，向量化引擎按日历向前填充后的价格计算，有缺失K线时两者本就不同
+    (MAStrategy, {'short_period': 5, 'long_period': 20}, 0.0),
+])
+def test_vectorized_matches_event_engine(forward_fill, strategy_cls, params, gaps):
+    store = generate_bar_store(n_symbols=3, n_bars=200, gap_probability=gaps, seed=1)
+
+    data = ArrayDataHandler(store, forward_fill=forward_fill)
+    vectorized = vectorized_backtest(data, strategy_cls(data=data, portfolio=None, **params), 1e6)
+
+    data = ArrayDataHandler(store, forward_fill=forward_fill)
+    portfolio = NaivePortfolio(data=data, strategy_name='test', initial_capital=1e6)
+    strategy = strategy_cls(data=data, portfolio=portfolio, **params)
+    with contextlib.redirect_stdout(io.StringIO()):
+        event = backtest(data, portfolio, strategy, SimulateExecutionHandler(), verbose=False)
+
+    assert not vectorized['total'].isna().any()
+    np.testing.assert_allclose(vectorized['total'].to_numpy(), event['total'].to_numpy())
+
+
+@pytest.mark.parametrize('forward_fill', [True, False])
+@pytest.mark.parametrize('gaps', [0.0, 0.1])
+# zero_cost_fills=False 对应按收盘价成交并收取 IB 佣金的执行端，用来核对内核中内联的佣金公式；
+# 低价股触及按成交额的上限，小资金触及最低收费
+@pytest.mark.parametrize('zero_cost_fills, initial_price, initial_capital', [
+    (True, 10.0, 1e6), (False, 10.0, 1e6), (False, 1.0, 1e6), (False, 10.0, 800.0)])
+def test_kernel_matches_event_engine(forward_fill, gaps, zero_cost_fills, initial_price, initial_capital):
+    store = generate_bar_store(n_symbols=4, n_bars=250, initial_price=initial_price, gap_probability=gaps,
+                               suspension_probability=0.01, listing_spread=15, seed=3)
+
+    data = ArrayDataHandler(store, forward_fill=forward_fill)
+    kernel = kernel_backtest(data, StopLossStrategy(data=data, portfolio=None, stop_loss_percentage=0.95),
+                             initial_capital, zero_cost_fills=zero_cost_fills, jit=False)
+
+    data = ArrayDataHandler(store, forward_fill=forward_fill)
+    portfolio = NaivePortfolio(data=data, strategy_name='test', initial_capital=initial_capital)
+    strategy = StopLossStrategy(data=data, portfolio=portfolio, stop_loss_percentage=0.95)
+    broker = SimulateExecutionHandler() if zero_cost_fills else SimulatedExchange(data, commission=IBCommission())
+    with contextlib.redirect_stdout(io.StringIO()):
+        event = backtest(data, portfolio, strategy, broker, verbose=False)
+
+    assert (event['commission'].iloc[-1] > 0) != zero_cost_fills
+    pd.testing.assert_frame_equal(kernel, event)
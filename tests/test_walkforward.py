@@ -0,0 +1,41 @@
+import pytest
+
+from backtester.core import backtest
+from backtester.data import ArrayDataHandler
+from backtester.execution import SimulateExecutionHandler
+from backtester.performance import calculate_summary_metrics
+from backtester.portfolio import NaivePortfolio
+from backtester.synthetic import generate_bar_store
+from backtester.walkforward import WalkForwardCache, walk_forward
+from examples.divide_conquer import DivideAndConquerStrategy
+from examples.ma import MAStrategy
+
+STORE = generate_bar_store(n_symbols=3, n_bars=240, gap_probability=0.1, seed=4)
+GRID = {'short_period': [3, 5], 'long_period': [15]}
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_folds_follow_handler_forward_fill(max_workers):
+    # DivideAndConquerStrategy 在缺失K线上的行为取决于 forward_fill
+    result = walk_forward(ArrayDataHandler(STORE, forward_fill=False), DivideAndConquerStrategy, [{}], train_size=80,
+                          test_size=40, initial_capital=1e6, max_workers=max_workers)
+    assert len(result.folds) > 1
+    for _, fold in result.folds.iterrows():
+        data = ArrayDataHandler(STORE, forward_fill=False, start=fold['test_start'], end=fold['test_end'])
+        portfolio = NaivePortfolio(data=data, strategy_name='test', initial_capital=1e6)
+        strategy = DivideAndConquerStrategy(data=data, portfolio=portfolio, **fold['params'])
+        expected = calculate_summary_metrics(backtest(data, portfolio, strategy, SimulateExecutionHandler(),
+                                                      verbose=False))
+        for name, value in expected.items():
+            assert fold[name] == pytest.approx(value, nan_ok=True)
+
+
+def test_cache_separates_forward_fill():
+    cache = WalkForwardCache()
+    sizes = []
+    for forward_fill in (True, False):
+        walk_forward(ArrayDataHandler(STORE, forward_fill=forward_fill), MAStrategy, GRID, train_size=80,
+                     test_size=40, initial_capital=1e6, max_workers=1, cache=cache)
+        sizes.append(len(cache))
+    # 两种设置的窗口和参数完全相同，但结果互不命中
+    assert sizes[1] == 2 * sizes[0]